@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks for pyt itself, these aren't part of the installed package
+
+Every benchmark is a module that can be run from the repo's base directory:
+
+    $ python -m benchmarks.discovery --output before.json
+    $ git checkout my-branch
+    $ python -m benchmarks.discovery --compare before.json
+
+The results are saved as json (see `save`) so they can be compared across
+commits
+"""
+import os
+import sys
+import json
+import platform
+import statistics
+import subprocess
+
+
+BASEDIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+"""The repo's base directory, this is put on the path of every subprocess so
+the pyt being benchmarked is always the pyt in this checkout"""
+
+
+def get_commit() -> str:
+    """Get the commit of the checkout being benchmarked, a `+` is appended
+    if the checkout has uncommitted changes"""
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "HEAD"],
+            cwd=BASEDIR,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+        dirty = subprocess.check_output(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=BASEDIR,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+        return commit + ("+" if dirty else "")
+
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def get_env(**kwargs) -> dict[str, str]:
+    """Get the environment of a benchmark subprocess
+
+    :param **kwargs: environment variables to add
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        p for p in [BASEDIR, env.get("PYTHONPATH", "")] if p
+    )
+    for k in list(env.keys()):
+        if k.startswith("PYT_"):
+            env.pop(k)
+
+    env.update(kwargs)
+    return env
+
+
+def summarize(results, metrics) -> dict[str, dict[str, float]]:
+    """Get the median of each metric of each benchmark
+
+    :param results: list[dict], every result has a "name" key and a key for
+        each metric
+    :param metrics: list[str]
+    :returns: the keys are the benchmark names
+    """
+    grouped = {}
+    for result in results:
+        grouped.setdefault(result["name"], []).append(result)
+
+    return {
+        name: {
+            metric: statistics.median(r[metric] for r in group)
+            for metric in metrics
+        }
+        for name, group in grouped.items()
+    }
+
+
+def save(path, benchmark, config, results, metrics):
+    """Write the results to path as json
+
+    :param path: str, "-" writes to stdout
+    :param benchmark: str, the benchmark's name
+    :param config: dict, the options the benchmark ran with
+    :param results: list[dict], every run of every benchmark
+    :param metrics: list[str], the keys of each result that are compared
+    """
+    doc = {
+        "benchmark": benchmark,
+        "commit": get_commit(),
+        "python": sys.version,
+        "platform": platform.platform(),
+        "config": config,
+        "metrics": metrics,
+        "summary": summarize(results, metrics),
+        "results": results,
+    }
+
+    if path == "-":
+        json.dump(doc, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+    else:
+        with open(path, "w") as fp:
+            json.dump(doc, fp, indent=2)
+
+
+def compare(path, results, metrics, stream=None):
+    """Print how the results changed from the results saved in path
+
+    :param path: str, the results of an earlier run (see `save`)
+    :param results: list[dict], the results of this run
+    :param metrics: list[str]
+    :returns: dict[tuple[str, str], float], (name, metric) keys with the
+        new value divided by the old value
+    """
+    stream = stream or sys.stdout
+    with open(path) as fp:
+        old = json.load(fp)
+
+    if old.get("commit"):
+        stream.write(f"Compared to {old['commit']}\n")
+
+    ratios = {}
+    new_summary = summarize(results, metrics)
+    for name, summary in new_summary.items():
+        old_summary = old["summary"].get(name, {})
+        for metric in metrics:
+            value = summary[metric]
+            if metric in old_summary:
+                old_value = old_summary[metric]
+                change = "n/a"
+                if old_value:
+                    ratios[(name, metric)] = value / old_value
+                    change = f"{ratios[(name, metric)]:.2f}x"
+
+                stream.write(
+                    f"{name:<20} {metric:<20} {old_value:>12.4g}"
+                    f" -> {value:<12.4g} {change}\n"
+                )
+
+            else:
+                stream.write(f"{name:<20} {metric:<20} {value:>12.4g}\n")
+
+    return ratios
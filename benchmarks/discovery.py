@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+"""Measures how long pyt takes to find and load tests in a large project
+
+This generates a synthetic project and then runs pyt in a new process for
+each invocation (eg, `pyt`, `pyt foo`, `pyt Foo.bar`, `--list`, `--rerun`,
+`--not`), measuring the wall time, the time spent finding and loading the
+tests, the filesystem calls, and the modules imported. The first run of each
+invocation is cold (pyt's cache directory is removed) and the rest are warm
+
+    $ python -m benchmarks.discovery --modules 10000 --output results.json
+    $ python -m benchmarks.discovery --modules 10000 --compare results.json
+
+The project's shape is configurable, modules are spread across `--prefixes`
+test directories nested `--depth` packages deep with `--fanout` packages at
+each level. Module, class, and method names are reused across packages so
+names like `foo` and `Foo.bar` are ambiguous and match a lot of tests
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import contextlib
+import compileall
+from collections import Counter
+
+from . import get_env, save, compare, summarize
+
+
+MODULE_NAMES = ["foo", "bar", "che", "baz", "models", "views", "utils"]
+"""Module names are reused in every package to make names ambiguous"""
+
+CLASS_NAMES = ["Foo", "Bar", "Che", "Baz"]
+
+METHOD_NAMES = ["foo", "bar", "che", "baz", "boo", "far", "cha", "bam"]
+
+METRICS = [
+    "wall",
+    "discovery",
+    "fs_calls",
+    "opens",
+    "imports",
+    "project_imports",
+]
+
+
+class Project(object):
+    """A synthetic project with a lot of test modules"""
+    def __init__(
+        self,
+        basedir,
+        modules=1000,
+        depth=3,
+        fanout=4,
+        prefixes=3,
+        classes=2,
+        methods=5,
+    ):
+        """
+        :param basedir: str, the project directory
+        :param modules: int, how many test modules
+        :param depth: int, how many packages deep the test modules are
+        :param fanout: int, how many packages are in each package
+        :param prefixes: int, how many test directories (eg, `prefix0/tests`)
+        :param classes: int, TestCase classes in each module
+        :param methods: int, test methods in each class
+        """
+        self.basedir = basedir
+        self.modules = modules
+        self.depth = depth
+        self.fanout = fanout
+        self.prefixes = prefixes
+        self.classes = min(classes, len(CLASS_NAMES))
+        self.methods = min(methods, len(METHOD_NAMES))
+        self.module_names = []
+
+    def get_packages(self) -> list[list[str]]:
+        """Get the module path parts of every package the test modules are
+        put in"""
+        packages = [[f"prefix{i}", "tests"] for i in range(self.prefixes)]
+        for _ in range(self.depth):
+            packages = [
+                parts + [f"pkg{i}"]
+                for parts in packages
+                for i in range(self.fanout)
+            ]
+
+        return packages
+
+    def get_body(self) -> str:
+        lines = ["from unittest import TestCase", ""]
+        for class_name in CLASS_NAMES[:self.classes]:
+            lines.append(f"class {class_name}Test(TestCase):")
+            for method_name in METHOD_NAMES[:self.methods]:
+                lines.append(f"    def test_{method_name}(self):")
+                lines.append("        pass")
+                lines.append("")
+
+        return "\n".join(lines)
+
+    def write_module(self, parts, body=""):
+        path = os.path.join(self.basedir, *parts) + ".py"
+        if not os.path.isfile(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as fp:
+                fp.write(body)
+
+    def create(self):
+        packages = self.get_packages()
+        body = self.get_body()
+
+        for i in range(self.modules):
+            parts = packages[i % len(packages)]
+            j = i // len(packages)
+            name = MODULE_NAMES[j % len(MODULE_NAMES)]
+            if n := j // len(MODULE_NAMES):
+                name = f"{name}{n}"
+
+            for k in range(1, len(parts) + 1):
+                self.write_module(parts[:k] + ["__init__"])
+
+            # a module that isn't a test module in every package
+            self.write_module(parts + ["helpers"], "VALUE = 1\n")
+            self.write_module(parts + [f"{name}_test"], body)
+            self.module_names.append(".".join(parts + [f"{name}_test"]))
+
+        # every run imports compiled modules
+        compileall.compile_dir(self.basedir, quiet=1)
+
+    def get_invocations(self) -> dict[str, list[str]]:
+        """The pyt arguments that are benchmarked
+
+        :returns: the keys are the names of the benchmarks
+        """
+        testpath = ".".join([
+            self.module_names[0],
+            f"{CLASS_NAMES[0]}Test",
+            f"test_{METHOD_NAMES[0]}",
+        ])
+        return {
+            "all": [],
+            "module": [MODULE_NAMES[0]],
+            "class_method": [f"{CLASS_NAMES[0]}.{METHOD_NAMES[1]}"],
+            "exact": [testpath],
+            "list": ["--list"],
+            "rerun": ["--rerun"],
+            "not": ["--not", MODULE_NAMES[0]],
+        }
+
+    def get_rerun_names(self) -> list[str]:
+        """The tests in the rerun file, one test from every 10th module"""
+        return [
+            f"{module_name}.{CLASS_NAMES[0]}Test.test_{METHOD_NAMES[0]}"
+            for module_name in self.module_names[::10]
+        ]
+
+
+def measure(argv):
+    """Run pyt with argv in this process and print the measurements as json,
+    this is called in a new process for every run so the imports and the
+    filesystem calls are only pyt's"""
+    counts = Counter()
+
+    def count(name):
+        func = getattr(os, name)
+        def wrapper(*args, **kwargs):
+            counts[name] += 1
+            return func(*args, **kwargs)
+        setattr(os, name, wrapper)
+
+    for name in ["stat", "lstat", "scandir", "listdir"]:
+        count(name)
+
+    def audit(event, args):
+        if event == "open":
+            counts["open"] += 1
+
+    sys.addaudithook(audit)
+
+    basedir = os.getcwd()
+    modules = set(sys.modules)
+
+    from pyt.tester import TestProgram
+
+    class BenchmarkProgram(TestProgram):
+        def createTests(self, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return super().createTests(*args, **kwargs)
+
+            finally:
+                counts["discovery"] += time.perf_counter() - start
+
+    start = time.perf_counter()
+    with open(os.devnull, "w") as fp:
+        with contextlib.redirect_stdout(fp), contextlib.redirect_stderr(fp):
+            program = BenchmarkProgram(argv=["pyt"] + argv, exit=False)
+    wall = time.perf_counter() - start
+
+    imported = [sys.modules[n] for n in set(sys.modules) - modules]
+    paths = [getattr(m, "__file__", None) or "" for m in imported]
+    json.dump(
+        {
+            "wall": wall,
+            "discovery": counts["discovery"],
+            "fs_calls": sum(
+                counts[n] for n in ["stat", "lstat", "scandir", "listdir"]
+            ),
+            "opens": counts["open"],
+            "imports": len(imported),
+            "project_imports": len([
+                p for p in paths if p.startswith(basedir)
+            ]),
+            "tests": program.test.countTestCases(),
+        },
+        sys.stdout,
+    )
+
+
+def run(project, name, argv, cold, tmpdir):
+    """Run one invocation in a new process
+
+    :returns: dict, the measurements, the name is suffixed with whether the
+        run was cold or warm so they are summarized separately
+    """
+    if cold:
+        shutil.rmtree(os.path.join(project.basedir, ".pyt"), True)
+
+    # pyt keeps the rerun file in the temp directory, so the subprocess gets
+    # its own temp directory to not clobber the real rerun file
+    output = subprocess.check_output(
+        [sys.executable, "-m", "benchmarks.discovery", "measure", *argv],
+        cwd=project.basedir,
+        env=get_env(TMPDIR=tmpdir),
+        text=True,
+    )
+    result = json.loads(output)
+    result.update(
+        name="{}:{}".format(name, "cold" if cold else "warm"),
+        argv=argv,
+        cold=cold,
+    )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modules", type=int, default=1000)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--fanout", type=int, default=4)
+    parser.add_argument("--prefixes", type=int, default=3)
+    parser.add_argument("--classes", type=int, default=2)
+    parser.add_argument("--methods", type=int, default=5)
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="How many times each invocation is run, the first run is cold",
+    )
+    parser.add_argument(
+        "--name",
+        dest="names",
+        action="append",
+        default=[],
+        help="Only run these invocations (eg, all, module, list)",
+    )
+    parser.add_argument(
+        "--basedir",
+        help="Generate the project here and keep it, defaults to a temp dir",
+    )
+    parser.add_argument(
+        "--output",
+        default="",
+        help="Save the results as json to this path (- for stdout)",
+    )
+    parser.add_argument(
+        "--compare",
+        default="",
+        help="Compare the results to the results saved in this path",
+    )
+
+    if sys.argv[1:2] == ["measure"]:
+        measure(sys.argv[2:])
+        return
+
+    args = parser.parse_args()
+    config = {
+        k: getattr(args, k) for k in [
+            "modules",
+            "depth",
+            "fanout",
+            "prefixes",
+            "classes",
+            "methods",
+            "repeat",
+        ]
+    }
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project = Project(
+            args.basedir or os.path.join(tmpdir, "project"),
+            **{k: v for k, v in config.items() if k != "repeat"},
+        )
+        sys.stderr.write("Generating {} test modules in {}\n".format(
+            args.modules,
+            project.basedir,
+        ))
+        project.create()
+
+        with open(os.path.join(tmpdir, "pyt.txt"), "w") as fp:
+            fp.write("\n".join(project.get_rerun_names()))
+
+        results = []
+        for name, argv in project.get_invocations().items():
+            if args.names and name not in args.names:
+                continue
+
+            for i in range(args.repeat):
+                result = run(project, name, argv, i == 0, tmpdir)
+                sys.stderr.write("{:<20} {:>8.3f}s {:>8} tests\n".format(
+                    result["name"],
+                    result["wall"],
+                    result["tests"],
+                ))
+                results.append(result)
+
+    if args.output:
+        save(args.output, "discovery", config, results, METRICS)
+
+    if args.compare:
+        compare(args.compare, results, METRICS)
+
+    elif not args.output:
+        for name, summary in summarize(results, METRICS).items():
+            sys.stdout.write("{:<20} {}\n".format(
+                name,
+                " ".join(f"{k}={v:.4g}" for k, v in summary.items()),
+            ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""Measures how much time and memory pyt adds to every test compared to
+stock unittest
+
+This generates a module of trivial tests (they only `pass`, so nearly all the
+time is spent in the test framework) and runs it with pyt's TestProgram and
+with unittest's TestProgram using the same flags, each in a new process. For
+every run it measures the microseconds per test spent running the tests (the
+runner's `run`), the microseconds per test of the whole program (loading the
+tests too), and the process's max RSS. `overhead_us` is how many microseconds
+per test pyt took over unittest with the same flags in the same round
+
+    $ python -m benchmarks.overhead --tests 10000 --tests 100000 \\
+        --output baseline.json
+    $ python -m benchmarks.overhead --tests 10000 --tests 100000 \\
+        --compare baseline.json --threshold 0.1
+
+With `--compare` this exits with 1 if pyt's overhead grew by more than
+`--threshold` (a fraction, so 0.1 is 10%)
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import contextlib
+
+from . import get_env, save, compare, summarize
+
+
+METRICS = ["us_per_test", "total_us_per_test", "overhead_us", "max_rss"]
+
+FLAGS = [[], ["-v"], ["-b"], ["-f"]]
+"""The flags every runner is run with"""
+
+CLASS_SIZE = 100
+"""How many test methods are in each generated TestCase"""
+
+
+def create_module(basedir, tests) -> str:
+    """Write a module with `tests` trivial tests
+
+    :returns: str, the module's name
+    """
+    module_name = f"overhead{tests}_test"
+    lines = ["from unittest import TestCase", ""]
+    for i in range(0, tests, CLASS_SIZE):
+        lines.append(f"class Overhead{i}Test(TestCase):")
+        for j in range(i, min(i + CLASS_SIZE, tests)):
+            lines.append(f"    def test_{j}(self):")
+            lines.append("        pass")
+            lines.append("")
+
+    with open(os.path.join(basedir, f"{module_name}.py"), "w") as fp:
+        fp.write("\n".join(lines))
+
+    return module_name
+
+
+def get_rss() -> int:
+    """Get the max resident set size of this process in bytes"""
+    try:
+        import resource
+
+    except ImportError:
+        return 0
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes and macOS reports bytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def measure(runner, module_name, flags):
+    """Run the tests in module_name in this process and print the
+    measurements as json
+
+    :param runner: str, either pyt or unittest
+    :param module_name: str
+    :param flags: list[str]
+    """
+    if runner == "pyt":
+        from pyt.tester import TestProgram, TestRunner
+
+    else:
+        from unittest import TestProgram, TextTestRunner as TestRunner
+
+    timings = {}
+
+    class TimedRunner(TestRunner):
+        def run(self, test):
+            start = time.perf_counter()
+            try:
+                return super().run(test)
+
+            finally:
+                timings["run"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with open(os.devnull, "w") as fp:
+        with contextlib.redirect_stdout(fp), contextlib.redirect_stderr(fp):
+            program = TestProgram(
+                module=None,
+                argv=[runner, module_name, *flags],
+                testRunner=TimedRunner,
+                exit=False,
+            )
+    total = time.perf_counter() - start
+
+    tests = program.result.testsRun
+    json.dump(
+        {
+            "tests": tests,
+            "us_per_test": timings["run"] / tests * 1e6,
+            "total_us_per_test": total / tests * 1e6,
+            "max_rss": get_rss(),
+        },
+        sys.stdout,
+    )
+
+
+def run(basedir, runner, module_name, flags) -> dict:
+    """Run one runner in a new process
+
+    :returns: dict, the measurements
+    """
+    output = subprocess.check_output(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.overhead",
+            "measure",
+            runner,
+            module_name,
+            *flags,
+        ],
+        cwd=basedir,
+        env=get_env(TMPDIR=basedir),
+        text=True,
+    )
+    result = json.loads(output)
+    result.update(name=" ".join([runner, *flags]), flags=flags)
+    return result
+
+
+def main():
+    if sys.argv[1:2] == ["measure"]:
+        measure(sys.argv[2], sys.argv[3], sys.argv[4:])
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--tests",
+        dest="tests",
+        type=int,
+        action="append",
+        default=[],
+        help="How many tests to run, can be passed more than once",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--output",
+        default="",
+        help="Save the results as json to this path (- for stdout)",
+    )
+    parser.add_argument(
+        "--compare",
+        default="",
+        help="Compare the results to the results saved in this path",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help=(
+            "With --compare, fail if pyt's overhead grew by more than this"
+            " fraction"
+        ),
+    )
+
+    args = parser.parse_args()
+    config = {"tests": args.tests or [10000], "repeat": args.repeat}
+
+    results = []
+    with tempfile.TemporaryDirectory() as basedir:
+        for tests in config["tests"]:
+            sys.stderr.write(f"Generating {tests} tests\n")
+            module_name = create_module(basedir, tests)
+
+            for _ in range(config["repeat"]):
+                for flags in FLAGS:
+                    baseline = run(basedir, "unittest", module_name, flags)
+                    result = run(basedir, "pyt", module_name, flags)
+                    baseline["overhead_us"] = 0.0
+                    result["overhead_us"] = (
+                        result["us_per_test"] - baseline["us_per_test"]
+                    )
+
+                    for r in [baseline, result]:
+                        r["name"] = f"{r['name']} ({tests})"
+                        sys.stderr.write(
+                            "{:<20} {:>8.2f}us/test {:>8.2f}us/test\n".format(
+                                r["name"],
+                                r["us_per_test"],
+                                r["total_us_per_test"],
+                            )
+                        )
+
+                    results.extend([baseline, result])
+
+    if args.output:
+        save(args.output, "overhead", config, results, METRICS)
+
+    if args.compare:
+        ratios = compare(args.compare, results, METRICS)
+        regressions = [
+            name for (name, metric), ratio in ratios.items()
+            if metric == "overhead_us" and ratio > 1 + args.threshold
+        ]
+        if regressions:
+            sys.stderr.write("pyt's overhead regressed in: {}\n".format(
+                ", ".join(regressions),
+            ))
+            sys.exit(1)
+
+    elif not args.output:
+        for name, summary in summarize(results, METRICS).items():
+            sys.stdout.write("{:<20} {}\n".format(
+                name,
+                " ".join(f"{k}={v:.4g}" for k, v in summary.items()),
+            ))
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,8 @@ import os
 import logging
 import sys
 
+from .watchdog import timeout
+
 
 __version__ = "1.4.0"
 
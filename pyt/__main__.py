@@ -4,6 +4,7 @@ import sys
 import os
 
 from pyt.tester import TestProgram
+from pyt.daemon import DaemonClient
 from pyt.compat import *
 
 
@@ -13,6 +14,12 @@ def main():
         executable = os.path.basename(sys.executable)
         sys.argv[0] = executable + " -m pyt"
 
+    # if there is a daemon running for this directory then it runs the tests
+    if not set(["--daemon", "--no-daemon", "--watch"]) & set(sys.argv):
+        code = DaemonClient().run(sys.argv)
+        if code is not None:
+            sys.exit(code)
+
     TestProgram()
 
 
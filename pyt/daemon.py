@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import json
+import socket
+import select
+import signal
+import struct
+import hashlib
+import logging
+import tempfile
+import importlib
+import traceback
+
+from .compat import *
+from .path import CacheDir
+from .graph import ImportGraph
+
+
+logger = logging.getLogger(__name__)
+
+
+class DaemonSocket(String):
+    """The path of the unix socket the daemon for a project listens on
+
+    This is in the CacheDir unless that path is too long for a unix socket,
+    then it is in the temp directory
+
+    The socket's name contains a hash of the project's base directory since
+    PYT_CACHE_DIR can point every project at the same CacheDir, and a daemon
+    only ever runs the commands of the project it was started in
+    """
+    def __new__(cls, basedir=""):
+        basedir = os.path.realpath(basedir or os.getcwd())
+        path = os.path.join(
+            CacheDir(basedir),
+            "daemon-{}.sock".format(
+                hashlib.md5(basedir.encode("utf-8")).hexdigest()[:16]
+            ),
+        )
+        if len(path) > 100:
+            path = os.path.join(
+                tempfile.gettempdir(),
+                "pyt-{}.sock".format(
+                    hashlib.md5(path.encode("utf-8")).hexdigest()[:16]
+                ),
+            )
+
+        return super().__new__(cls, path)
+
+
+class DaemonClient(object):
+    """Forwards a pyt command to a running daemon, the daemon writes the
+    output directly to this process's stdout and stderr"""
+    def __init__(self, basedir=""):
+        self.socket_path = DaemonSocket(basedir)
+
+    def connect(self):
+        """Connect to the daemon
+
+        :returns: socket.socket|None, None if there isn't a running daemon
+        """
+        if not hasattr(socket, "send_fds"):
+            return None
+
+        if not os.path.exists(self.socket_path):
+            return None
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.socket_path)
+
+        except OSError as e:
+            logger.debug("Could not connect to daemon {}: {}".format(
+                self.socket_path,
+                e,
+            ))
+            sock.close()
+            return None
+
+        return sock
+
+    def run(self, argv):
+        """Run argv in the daemon
+
+        :param argv: list[str], the full command line (eg, sys.argv)
+        :returns: int|None, the exit code, None if there isn't a daemon to run
+            the command
+        """
+        try:
+            fds = [
+                sys.stdin.fileno(),
+                sys.stdout.fileno(),
+                sys.stderr.fileno(),
+            ]
+
+        except (AttributeError, ValueError, OSError):
+            return None
+
+        sock = self.connect()
+        if not sock:
+            return None
+
+        with sock:
+            payload = json.dumps({
+                "argv": argv,
+                "cwd": os.getcwd(),
+                "environ": dict(os.environ),
+            }).encode("utf-8")
+
+            sys.stdout.flush()
+            sys.stderr.flush()
+            socket.send_fds(sock, [struct.pack("!Q", len(payload))], fds)
+            sock.sendall(payload)
+
+            data = b""
+            while len(data) < 4:
+                if not (chunk := sock.recv(4 - len(data))):
+                    raise IOError("Daemon closed the connection")
+                data += chunk
+
+            return struct.unpack("!i", data)[0]
+
+
+class DaemonServer(object):
+    """Keeps the imported test modules (and everything they import) in memory
+    and forks a new process for every command a DaemonClient sends
+
+    Before each command the source files of the imported project modules are
+    checked and any module that changed, along with every project module that
+    imports it, is removed from sys.modules so the forked process imports it
+    fresh. Those modules are imported again once the command has finished so
+    they are warm for the next command
+    """
+    def __init__(self, basedir=""):
+        self.basedir = os.path.abspath(basedir or os.getcwd())
+        self.socket_path = DaemonSocket(basedir)
+        self.graph = ImportGraph(basedir)
+        self.stats = {}
+
+    def get_project_modules(self):
+        """Get the imported modules that are part of the project
+
+        :returns: dict[str, str], module file paths to module names
+        """
+        ret = {}
+        prefix = self.basedir + os.sep
+        for name, module in list(sys.modules.items()):
+            path = getattr(module, "__file__", None)
+            if path and path.startswith(prefix) and path.endswith(".py"):
+                ret[path] = name
+
+        return ret
+
+    def stat(self, path):
+        try:
+            st = os.stat(path)
+            return (st.st_mtime_ns, st.st_size)
+
+        except OSError:
+            return None
+
+    def snapshot(self):
+        """Remember the stat of every imported project module"""
+        self.stats = {
+            path: self.stat(path) for path in self.get_project_modules()
+        }
+
+    def evict(self):
+        """Remove the changed modules, and the modules that import them, from
+        sys.modules
+
+        :returns: list[str], the names of the removed modules
+        """
+        changed = [
+            path for path, st in self.stats.items()
+            if self.stat(path) != st
+        ]
+        if not changed:
+            return []
+
+        dependents = self.graph.get_dependents(changed)
+        self.graph.save()
+
+        ret = []
+        for path, name in self.get_project_modules().items():
+            if path in dependents or path in changed:
+                logger.debug("Evicting changed module {}".format(name))
+                sys.modules.pop(name, None)
+                ret.append(name)
+
+        return ret
+
+    def warm(self, module_names):
+        """Import module_names, any module that fails to import is skipped
+        since it is probably in the middle of being edited"""
+        for name in module_names:
+            try:
+                importlib.import_module(name)
+
+            except Exception as e:
+                logger.debug("Could not import {}: {}".format(name, e))
+
+        self.snapshot()
+
+    def listen(self):
+        """Create the listening socket
+
+        :raises: ValueError if a daemon is already listening
+        """
+        if os.path.exists(self.socket_path):
+            if DaemonClient(self.basedir).connect():
+                raise ValueError(
+                    f"A daemon is already running at {self.socket_path}"
+                )
+
+            os.unlink(self.socket_path)
+
+        os.makedirs(os.path.dirname(self.socket_path), exist_ok=True)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        sock.listen()
+        return sock
+
+    def serve(self, stream=None):
+        """Handle commands until interrupted
+
+        :param stream: io.IOBase, where to write the startup message
+        """
+        self.snapshot()
+        self.listener = self.listen()
+
+        # terminating the daemon cleans up the socket just like ctrl-c
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        if stream:
+            stream.writeln(
+                "Listening on {} with {} modules loaded".format(
+                    self.socket_path,
+                    len(self.stats),
+                )
+            )
+            stream.flush()
+
+        try:
+            while True:
+                conn, _ = self.listener.accept()
+                with conn:
+                    try:
+                        self.handle(conn)
+
+                    except (OSError, ValueError) as e:
+                        logger.warning("Daemon command failed: {}".format(e))
+
+        except KeyboardInterrupt:
+            pass
+
+        finally:
+            self.listener.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def receive(self, conn):
+        """Read a DaemonClient's command
+
+        :returns: tuple[dict, list[int]], the command and the client's stdin,
+            stdout, and stderr file descriptors
+        """
+        header, fds, _, _ = socket.recv_fds(conn, 8, 3)
+        if len(header) != 8 or len(fds) != 3:
+            for fd in fds:
+                os.close(fd)
+            raise ValueError("Invalid daemon command")
+
+        size = struct.unpack("!Q", header)[0]
+        payload = b""
+        while len(payload) < size:
+            if not (chunk := conn.recv(size - len(payload))):
+                break
+            payload += chunk
+
+        return json.loads(payload.decode("utf-8")), fds
+
+    def handle(self, conn):
+        request, fds = self.receive(conn)
+        evicted = self.evict()
+
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            self.run_child(conn, request, fds)
+
+        for fd in fds:
+            os.close(fd)
+
+        # wait for the command to finish, if the client goes away (eg, it was
+        # interrupted) then the command is stopped
+        while True:
+            wpid, status = os.waitpid(pid, os.WNOHANG)
+            if wpid:
+                break
+
+            readable, _, _ = select.select([conn], [], [], 0.05)
+            if readable and not conn.recv(1):
+                os.kill(pid, signal.SIGTERM)
+                os.waitpid(pid, 0)
+                self.warm(evicted)
+                return
+
+        code = os.waitstatus_to_exitcode(status)
+        conn.sendall(struct.pack("!i", code if code >= 0 else 1))
+
+        self.warm(evicted)
+
+    def run_child(self, conn, request, fds):
+        """Runs in the forked process, this never returns"""
+        from .tester import TestProgram # avoid circular dependency
+
+        code = 1
+        try:
+            self.listener.close()
+            conn.close()
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+            for fd, target in zip(fds, (0, 1, 2)):
+                os.dup2(fd, target)
+                os.close(fd)
+
+            os.chdir(request["cwd"])
+            os.environ.clear()
+            os.environ.update(request["environ"])
+            sys.argv = list(request["argv"])
+
+            TestProgram(argv=sys.argv)
+            code = 0
+
+        except SystemExit as e:
+            if e.code is None:
+                code = 0
+
+            elif isinstance(e.code, int):
+                code = e.code
+
+            else:
+                sys.stderr.write(f"{e.code}\n")
+
+        except BaseException:
+            traceback.print_exc()
+
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+
@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+import os
+import ast
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import subprocess
+from collections.abc import Iterable
+
+from .compat import *
+from .path import CacheDir, DirectorySnapshot, PathFinder, SitePackagesDir
+
+
+logger = logging.getLogger(__name__)
+
+
+class ImportGraph(object):
+    """A static graph of what modules every python file in the project
+    imports, this is used to find the test modules that could be affected by
+    changes to some files
+
+    Modules are matched by name (found with PathFinder.module_path) so the
+    graph doesn't need to import anything or know the project's sys.path.
+    Each file's imports are cached in the CacheDir by the file's mtime and
+    size, so only files that changed since the last run are parsed
+    """
+    version = 1
+
+    racy_seconds = 2
+    """Files modified this recently aren't cached, see DiscoveryIndex"""
+
+    def __init__(self, basedir="", snapshot=None):
+        """
+        :param basedir: str, the project directory
+        :param snapshot: DirectorySnapshot, used to walk basedir
+        """
+        self.basedir = os.path.abspath(basedir or os.getcwd())
+        self.filepath = os.path.join(CacheDir(basedir), "imports.json")
+        self.snapshot = snapshot or DirectorySnapshot()
+        self.finder = PathFinder(self.basedir, snapshot=self.snapshot)
+        self.entries = {}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.filepath, encoding="utf-8") as fp:
+                data = json.load(fp)
+
+        except (IOError, ValueError) as e:
+            data = {}
+
+        if data.get("version") == self.version:
+            self.entries = data.get("entries", {})
+
+    def save(self):
+        """Atomically write the graph to disk if it has been modified"""
+        if not self.dirty:
+            return
+
+        now = time.time_ns()
+        racy_ns = self.racy_seconds * 1_000_000_000
+        dirpath = os.path.dirname(self.filepath)
+        try:
+            os.makedirs(dirpath, exist_ok=True)
+            fd, tmppath = tempfile.mkstemp(dir=dirpath, suffix=".tmp")
+            with os.fdopen(fd, mode="w", encoding="utf-8") as fp:
+                json.dump(
+                    {
+                        "version": self.version,
+                        "entries": {
+                            k: v for k, v in self.entries.items()
+                            if now - v["stat"][0] > racy_ns
+                        },
+                    },
+                    fp,
+                )
+
+            os.replace(tmppath, self.filepath)
+            self.dirty = False
+
+        except (IOError, OSError) as e:
+            logger.warning("Could not save import graph {}: {}".format(
+                self.filepath,
+                e,
+            ))
+
+    def paths(self) -> Iterable[str]:
+        """Yield every python file in the project, hidden directories and
+        site-packages are skipped"""
+        system_d = SitePackagesDir()
+        for root, dirs, files in self.snapshot.walk(self.basedir):
+            dirs[:] = [
+                d for d in dirs
+                if d[0] != "." and d != "__pycache__"
+                and (not system_d or os.path.join(root, d) != system_d)
+            ]
+
+            for basename in files:
+                if basename.lower().endswith(".py"):
+                    yield os.path.join(root, basename)
+
+    def get_imports(self, path, module_name) -> list[str]:
+        """Parse path and return the names of every module it might import
+
+        This is conservative, `from a import b` imports both `a` and `a.b`
+        since b might be a submodule, and every parent package of an imported
+        module is included since importing a module runs its packages
+
+        :param path: str, the python file
+        :param module_name: str, path's module name
+        :returns: list[str], the module names
+        """
+        try:
+            with open(path, "rb") as fp:
+                tree = ast.parse(fp.read(), filename=path)
+
+        except (SyntaxError, ValueError, OSError) as e:
+            logger.debug("Could not parse {}: {}".format(path, e))
+            return []
+
+        if os.path.basename(path) == "__init__.py":
+            package = module_name
+
+        else:
+            package = module_name.rpartition(".")[0]
+
+        names = set()
+        # importing a module always runs its parent packages
+        names.add(package)
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    names.add(alias.name)
+
+            elif isinstance(node, ast.ImportFrom):
+                name = node.module or ""
+                if node.level:
+                    parts = package.split(".") if package else []
+                    if node.level > 1:
+                        parts = parts[:-(node.level - 1)]
+
+                    if name:
+                        parts.append(name)
+
+                    name = ".".join(parts)
+
+                names.add(name)
+                for alias in node.names:
+                    if alias.name != "*":
+                        if name:
+                            names.add(f"{name}.{alias.name}")
+
+                        else:
+                            names.add(alias.name)
+
+        ret = set()
+        for name in names:
+            parts = name.split(".")
+            for i in range(1, len(parts) + 1):
+                ret.add(".".join(parts[:i]))
+
+        ret.discard("")
+        ret.discard(module_name)
+        return sorted(ret)
+
+    def update(self):
+        """Make sure every project file has a fresh entry, only files that
+        have changed since the last time the graph was saved are parsed
+
+        :returns: dict, path keys with entry values
+        """
+        entries = {}
+        for path in self.paths():
+            try:
+                st = os.stat(path)
+
+            except OSError:
+                continue
+
+            stat = [st.st_mtime_ns, st.st_size]
+            entry = self.entries.get(path)
+            if not entry or entry["stat"] != stat:
+                module_name = self.finder.module_path(path)
+                entry = {
+                    "stat": stat,
+                    "module": module_name,
+                    "imports": self.get_imports(path, module_name),
+                }
+                self.dirty = True
+
+            entries[path] = entry
+
+        if len(entries) != len(self.entries):
+            self.dirty = True
+
+        self.entries = entries
+        return entries
+
+    def get_dependents(self, paths: Iterable[str]) -> set[str]:
+        """Find every project file that transitively imports any of paths
+
+        :param paths: the changed files, these can be files that were deleted
+        :returns: set[str], the paths of the dependent files, this includes
+            any of the passed in paths that are still in the project
+        """
+        entries = self.update()
+
+        importers = {}
+        for path, entry in entries.items():
+            for name in entry["imports"]:
+                importers.setdefault(name, []).append(path)
+
+        ret = set()
+        queue = []
+        for path in paths:
+            path = os.path.abspath(path)
+            if path.lower().endswith(".py"):
+                if path in entries:
+                    ret.add(path)
+                    queue.append(entries[path]["module"])
+
+                else:
+                    # the file was deleted
+                    queue.append(self.finder.module_path(path))
+
+        seen = set(queue)
+        while queue:
+            name = queue.pop()
+            for path in importers.get(name, []):
+                if path not in ret:
+                    ret.add(path)
+                    module_name = entries[path]["module"]
+                    if module_name not in seen:
+                        seen.add(module_name)
+                        queue.append(module_name)
+
+        return ret
+
+    def is_test_path(self, path) -> bool:
+        """Return True if path is a test module"""
+        if os.path.basename(path) == "__init__.py":
+            return self.finder._is_module_path(os.path.dirname(path))
+
+        return self.finder._is_module_path(path)
+
+    def get_test_paths(self, paths: Iterable[str]) -> list[str]:
+        """Find the test modules that transitively import any of paths
+
+        :param paths: the changed files
+        :returns: list[str], the test module paths
+        """
+        ret = [
+            path for path in sorted(self.get_dependents(paths))
+            if self.is_test_path(path)
+        ]
+        self.save()
+        return ret
+
+    def get_digests(self, paths: Iterable[str]) -> dict[str, str]:
+        """Hash the contents of each path and of every project file it
+        transitively imports, so the digest of a path changes whenever any
+        code it could run changes
+
+        :param paths: the python files to hash
+        :returns: dict[str, str], the keys are the absolute paths
+        """
+        entries = self.update()
+        modules = {entry["module"]: path for path, entry in entries.items()}
+
+        file_digests = {}
+        def get_file_digest(path):
+            if path not in file_digests:
+                try:
+                    with open(path, "rb") as fp:
+                        file_digests[path] = hashlib.sha256(
+                            fp.read()
+                        ).digest()
+
+                except OSError:
+                    file_digests[path] = b""
+
+            return file_digests[path]
+
+        ret = {}
+        for path in paths:
+            path = os.path.abspath(path)
+            seen = set()
+            queue = [path]
+            while queue:
+                p = queue.pop()
+                if p not in seen:
+                    seen.add(p)
+                    for name in entries.get(p, {}).get("imports", []):
+                        if name in modules:
+                            queue.append(modules[name])
+
+            h = hashlib.sha256()
+            for p in sorted(seen):
+                h.update(os.path.relpath(p, self.basedir).encode("utf-8"))
+                h.update(get_file_digest(p))
+
+            ret[path] = h.hexdigest()
+
+        self.save()
+        return ret
+
+    def get_changed_paths(self, ref="HEAD") -> list[str]:
+        """Use git to find the files that have changed
+
+        :param ref: str, the working tree is compared to this commit, so
+            by default this is every uncommitted change
+        :returns: list[str], the absolute paths of modified, added, deleted
+            and untracked files under the basedir
+        :raises: ValueError if git failed
+        """
+        ret = []
+        for args in [
+            ["diff", "--name-only", "--relative", ref],
+            ["ls-files", "--others", "--exclude-standard"],
+        ]:
+            try:
+                output = subprocess.run(
+                    ["git", *args],
+                    cwd=self.basedir,
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                ).stdout
+
+            except subprocess.CalledProcessError as e:
+                raise ValueError(
+                    f"Could not find changed files: {e.stderr.strip()}"
+                ) from e
+
+            except OSError as e:
+                raise ValueError(f"Could not find changed files: {e}") from e
+
+            for line in output.splitlines():
+                if line := line.strip():
+                    ret.append(os.path.join(self.basedir, line))
+
+        return ret
+
@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+import logging
+import sqlite3
+import hashlib
+from collections.abc import Iterable
+
+from .compat import *
+from .utils import testpath, get_testcase_name
+from .path import CacheDir
+from .graph import ImportGraph
+
+
+logger = logging.getLogger(__name__)
+
+
+class TestHistory(object):
+    """Persists the outcome, duration, and memory (if it was measured, see
+    --memory) of every test that was run so later runs can use how long tests
+    have taken in the past
+
+    The history is a sqlite database in the CacheDir with one row per test per
+    run, only the most recent `keep` runs of each test are kept
+
+    https://docs.python.org/3/library/sqlite3.html
+    """
+    keep = 10
+    """How many of each test's most recent results are kept"""
+
+    def __init__(self, basedir=""):
+        """
+        :param basedir: str, the project directory, see CacheDir
+        """
+        self.filepath = os.path.join(CacheDir(basedir), "history.sqlite3")
+
+    def connect(self):
+        """Open the database, creating the tables if needed
+
+        :returns: sqlite3.Connection
+        """
+        os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
+        conn = sqlite3.connect(self.filepath, timeout=10)
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS results (
+                testpath TEXT NOT NULL,
+                outcome TEXT NOT NULL,
+                duration REAL,
+                created REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS results_testpath
+                ON results (testpath, created);
+        """)
+
+        # databases created before memory was recorded need the new columns
+        columns = set(r[1] for r in conn.execute("PRAGMA table_info(results)"))
+        for column in ["peak_memory", "rss_growth"]:
+            if column not in columns:
+                conn.execute(
+                    f"ALTER TABLE results ADD COLUMN {column} INTEGER"
+                )
+
+        return conn
+
+    def get_outcomes(self, result) -> dict[str, str]:
+        """Get the outcome of every test that didn't succeed in result
+
+        :param result: TestResult
+        :returns: dict[str, str], the keys are testpaths
+        """
+        outcomes = {}
+        for outcome, tests in [
+            ("skip", result.skipped),
+            ("expected_failure", result.expectedFailures),
+            ("unexpected_success", result.unexpectedSuccesses),
+            ("failure", result.failures),
+            ("error", result.errors),
+        ]:
+            for test in tests:
+                if isinstance(test, tuple):
+                    test = test[0]
+
+                # subtests are recorded against the test they are part of
+                test = getattr(test, "test_case", test)
+                outcomes[testpath(test)] = outcome
+
+        return outcomes
+
+    def get_rows(self, result, created=None) -> list[tuple]:
+        """Get the rows that will be inserted for result
+
+        Durations come from `result.collectedDurations` and memory comes
+        from `result.collectedMemory`, tests that never started (eg,
+        setUpClass failed) have a null duration, tests whose memory wasn't
+        measured have null memory
+
+        :param result: TestResult
+        :param created: float, the timestamp of the run
+        :returns: list[tuple], (testpath, outcome, duration, created,
+            peak_memory, rss_growth)
+        """
+        if created is None:
+            created = time.time()
+
+        outcomes = self.get_outcomes(result)
+        durations = {}
+        for name, duration in getattr(result, "collectedDurations", []):
+            try:
+                _, tp = get_testcase_name(name)
+
+            except ValueError:
+                continue
+
+            durations[tp] = durations.get(tp, 0.0) + duration
+
+        memory = {
+            tp: (peak, rss)
+            for tp, peak, rss in getattr(result, "collectedMemory", [])
+        }
+
+        return [
+            (
+                tp,
+                outcomes.get(tp, "success"),
+                durations.get(tp),
+                created,
+                *memory.get(tp, (None, None)),
+            )
+            for tp in durations.keys() | outcomes.keys()
+        ]
+
+    def add_result(self, result):
+        """Record every test in result, everything is written in one
+        transaction
+
+        :param result: TestResult
+        """
+        rows = self.get_rows(result)
+        if not rows:
+            return
+
+        conn = self.connect()
+        try:
+            with conn:
+                conn.executemany(
+                    """
+                    INSERT INTO results (
+                        testpath,
+                        outcome,
+                        duration,
+                        created,
+                        peak_memory,
+                        rss_growth
+                    ) VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    rows,
+                )
+                conn.execute(
+                    """
+                    DELETE FROM results WHERE rowid IN (
+                        SELECT rowid FROM (
+                            SELECT rowid, ROW_NUMBER() OVER (
+                                PARTITION BY testpath
+                                ORDER BY created DESC, rowid DESC
+                            ) AS n FROM results
+                        ) WHERE n > ?
+                    )
+                    """,
+                    (self.keep,),
+                )
+
+            logger.debug("Recorded {} results in history {}".format(
+                len(rows),
+                self.filepath,
+            ))
+
+        finally:
+            conn.close()
+
+    def get_durations(
+        self,
+        testpaths: Iterable[str]|None = None,
+    ) -> dict[str, float]:
+        """Get the average duration of each test's recent runs
+
+        :param testpaths: the tests to get, if None then every test is
+            returned
+        :returns: dict[str, float], the keys are testpaths, tests without any
+            history aren't included
+        """
+        if not os.path.isfile(self.filepath):
+            return {}
+
+        conn = self.connect()
+        try:
+            durations = dict(conn.execute(
+                """
+                SELECT testpath, AVG(duration) FROM results
+                WHERE duration IS NOT NULL GROUP BY testpath
+                """
+            ))
+
+        finally:
+            conn.close()
+
+        if testpaths is not None:
+            durations = {
+                tp: durations[tp] for tp in testpaths if tp in durations
+            }
+
+        return durations
+
+
+
+class ResultCache(object):
+    """Remembers the tests that passed along with a digest of the code they
+    ran so later runs can skip them until that code changes
+
+    A test's digest covers its module and every project module its module
+    transitively imports (see ImportGraph.get_digests) along with the python
+    version. The passed tests are kept in the history database, only the
+    `max_size` most recently passed or skipped tests are kept
+    """
+    max_size = 10000
+    """How many tests are kept"""
+
+    def __init__(self, basedir=""):
+        """
+        :param basedir: str, the project directory, see CacheDir
+        """
+        self.basedir = basedir
+        self.filepath = os.path.join(CacheDir(basedir), "history.sqlite3")
+
+        self.digests = {}
+        """testpath keys with the digest of the test in this run"""
+
+        self.cached = []
+        """The testpaths of the tests this run skipped"""
+
+    def connect(self):
+        """Open the database, creating the tables if needed
+
+        :returns: sqlite3.Connection
+        """
+        os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
+        conn = sqlite3.connect(self.filepath, timeout=10)
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS cached (
+                testpath TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                created REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS cached_created ON cached (created);
+        """)
+        return conn
+
+    def get_digests(self, test) -> dict[str, str]:
+        """Get the digest of every test in the suite
+
+        :param test: TestSuite
+        :returns: dict[str, str], the keys are testpaths
+        """
+        paths = {}
+        for tc in test.get_testcases():
+            module = sys.modules.get(type(tc).__module__, None)
+            if path := getattr(module, "__file__", None):
+                paths[testpath(tc)] = os.path.abspath(path)
+
+        digests = ImportGraph(self.basedir).get_digests(set(paths.values()))
+        return {
+            tp: hashlib.sha256(
+                f"{sys.version}\n{digests[path]}".encode("utf-8"),
+            ).hexdigest()
+            for tp, path in paths.items()
+        }
+
+    def filter(self, test):
+        """Remove the tests that passed before with the same digest
+
+        :param test: TestSuite
+        :returns: TestSuite, the tests that need to run
+        """
+        self.digests = self.get_digests(test)
+
+        cached = {}
+        if os.path.isfile(self.filepath):
+            conn = self.connect()
+            try:
+                cached = dict(conn.execute(
+                    "SELECT testpath, digest FROM cached"
+                ))
+
+            finally:
+                conn.close()
+
+        self.cached = [
+            tp for tp, digest in self.digests.items()
+            if cached.get(tp) == digest
+        ]
+        logger.debug("Skipping {} cached tests".format(len(self.cached)))
+
+        skip = set(self.cached)
+        return test.filter(lambda tc: testpath(tc) not in skip)
+
+    def add_result(self, result):
+        """Remember the tests that passed in result, and the tests that were
+        skipped because they were cached, and then evict the oldest tests
+
+        :param result: TestResult
+        """
+        testpaths = [
+            row[0] for row in TestHistory().get_rows(result)
+            if row[1] == "success"
+        ]
+        testpaths.extend(self.cached)
+
+        created = time.time()
+        rows = [
+            (tp, self.digests[tp], created)
+            for tp in testpaths if tp in self.digests
+        ]
+        if not rows:
+            return
+
+        conn = self.connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO cached VALUES (?, ?, ?)",
+                    rows,
+                )
+                conn.execute(
+                    """
+                    DELETE FROM cached WHERE testpath NOT IN (
+                        SELECT testpath FROM cached
+                        ORDER BY created DESC LIMIT ?
+                    )
+                    """,
+                    (self.max_size,),
+                )
+
+        finally:
+            conn.close()
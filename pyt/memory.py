@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import sys
+import logging
+import tracemalloc
+
+try:
+    import resource
+
+except ImportError:
+    # resource is only available on Unix
+    resource = None
+
+from .compat import *
+
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryTracker(object):
+    """Measures the memory each test uses
+
+    Two numbers are measured for every test, the peak memory python allocated
+    while the test ran (tracemalloc) and how much the process's maximum
+    resident set size grew while the test ran (getrusage). The peak is
+    relative to what was already allocated when the test started, the RSS
+    only grows the first time the process needs more memory than it has ever
+    used so it points at the tests that pushed the process to its high water
+    mark
+
+    https://docs.python.org/3/library/tracemalloc.html
+    https://docs.python.org/3/library/resource.html#resource.getrusage
+    """
+    def __init__(self):
+        self.started = False
+        self.traced = 0
+        self.rss = 0
+
+    def get_rss(self) -> int:
+        """Get the maximum resident set size of the process in bytes, 0 if
+        it can't be measured"""
+        if resource is None:
+            return 0
+
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes and macOS reports bytes
+        return rss if sys.platform == "darwin" else rss * 1024
+
+    def start_test(self, test):
+        if not tracemalloc.is_tracing():
+            logger.debug("Starting tracemalloc")
+            tracemalloc.start()
+            self.started = True
+
+        tracemalloc.reset_peak()
+        self.traced = tracemalloc.get_traced_memory()[0]
+        self.rss = self.get_rss()
+
+    def stop_test(self, test) -> tuple[int, int]:
+        """
+        :returns: the test's peak traced memory and RSS growth in bytes
+        """
+        peak = tracemalloc.get_traced_memory()[1] - self.traced
+        return max(peak, 0), max(self.get_rss() - self.rss, 0)
+
+    def stop(self):
+        """Stop tracemalloc if this started it"""
+        if self.started:
+            tracemalloc.stop()
+            self.started = False
+
+
+def format_bytes(size) -> str:
+    """Format size in the largest unit that keeps it at least 1
+
+    :param size: int, bytes
+    :returns: str, eg, "1.5MB"
+    """
+    for unit in ["B", "KB", "MB", "GB"]:
+        if abs(size) < 1024:
+            break
+        size /= 1024
+
+    else:
+        unit = "TB"
+
+    return "{:.1f}{}".format(size, unit) if unit != "B" else f"{size}B"
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+import time
+import queue
+import logging
+import threading
+
+from .compat import *
+from .utils import testpath
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncStream(object):
+    """Wraps the runner's stream so writing the results never waits on the
+    terminal (or whatever the output is piped into)
+
+    Writes are put on a bounded queue and a thread drains the queue, joining
+    everything that is waiting into one write and then flushing the stream
+    once, so a slow stream only slows the tests down when the queue is full.
+    The writes are written in the order they were made, `wait` blocks until
+    everything already written has made it to the stream (eg, before a
+    failure is reported) and `close` drains the queue and stops the thread
+    """
+    batch_size = 1000
+    """The most writes that are joined into one write"""
+
+    def __init__(self, stream, maxsize=10000):
+        """
+        :param stream: io.IOBase, usually unittest's _WritelnDecorator
+        :param maxsize: int, how many writes can be waiting before writing
+            blocks
+        """
+        self.stream = stream
+        self.queue = queue.Queue(maxsize)
+        self.thread = None
+
+    def write(self, s):
+        if s:
+            if not self.thread:
+                self.thread = threading.Thread(
+                    target=self.run,
+                    name="pyt-output",
+                    daemon=True,
+                )
+                self.thread.start()
+
+            self.queue.put(s)
+
+    def writeln(self, s=None):
+        self.write("{}\n".format(s) if s else "\n")
+
+    def flush(self):
+        # the thread flushes the stream after every batch
+        pass
+
+    def wait(self):
+        """Block until everything written so far is on the stream"""
+        if self.thread:
+            event = threading.Event()
+            self.queue.put(event)
+            event.wait()
+
+    def close(self):
+        """Write everything that is waiting and stop the thread"""
+        if self.thread:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        stopped = False
+        while not stopped:
+            items = [self.queue.get()]
+            try:
+                while len(items) < self.batch_size:
+                    items.append(self.queue.get_nowait())
+
+            except queue.Empty:
+                pass
+
+            chunks = []
+            events = []
+            for item in items:
+                if item is None:
+                    stopped = True
+
+                elif isinstance(item, threading.Event):
+                    events.append(item)
+
+                else:
+                    chunks.append(item)
+
+            if chunks:
+                try:
+                    self.stream.write("".join(chunks))
+                    self.stream.flush()
+
+                except (OSError, ValueError) as e:
+                    # the queue has to keep draining or writers would block
+                    # forever
+                    logger.debug("Could not write output: {}".format(e))
+
+            for event in events:
+                event.set()
+
+    def __getattr__(self, k):
+        return getattr(self.stream, k)
+
+
+class Progress(object):
+    """Draws one status line that is redrawn as the tests run, instead of a
+    line (or a dot) for every test
+
+    The line has how many tests have run, how many failed, how many tests
+    are running per second, and how long until the run is done. The time
+    left comes from how long the tests that haven't run took in earlier runs
+    (see TestHistory.get_durations), if there isn't any history it comes
+    from how fast the tests are running. The line is only redrawn every
+    `interval` seconds so huge runs don't write megabytes of output
+    """
+    interval = 0.25
+    """The least seconds between redraws"""
+
+    def __init__(self, stream, total, durations=None, completed=0):
+        """
+        :param stream: io.IOBase
+        :param total: int, how many tests are in the run
+        :param durations: dict[str, float], testpath keys with how long the
+            tests that will run took in earlier runs
+        :param completed: int, how many tests don't need to run (eg, they
+            were cached)
+        """
+        self.stream = stream
+        self.total = total
+        self.durations = durations or {}
+        self.average = 0.0
+        self.remaining = 0.0
+        if self.durations:
+            unknown = max(total - completed - len(self.durations), 0)
+            self.average = sum(self.durations.values()) / len(self.durations)
+            self.remaining = (
+                sum(self.durations.values()) + unknown * self.average
+            )
+
+        self.completed = completed
+        self.failed = 0
+        self.count = 0
+        self.start = time.monotonic()
+        self.drawn = 0.0
+        self.width = 0
+
+    def add(self, test, completed, failed):
+        """Called after each test
+
+        :param test: TestCase
+        :param completed: int, how many tests have run
+        :param failed: int, how many tests errored or failed
+        """
+        self.completed = completed
+        self.failed = failed
+        self.count += 1
+        if self.durations:
+            self.remaining -= self.durations.get(testpath(test), self.average)
+
+        if time.monotonic() - self.drawn >= self.interval:
+            self.draw()
+
+    def format_seconds(self, seconds) -> str:
+        seconds = int(max(seconds, 0))
+        if seconds >= 3600:
+            return "{}h{:02d}m".format(seconds // 3600, seconds % 3600 // 60)
+
+        if seconds >= 60:
+            return "{}m{:02d}s".format(seconds // 60, seconds % 60)
+
+        return "{}s".format(seconds)
+
+    def get_line(self) -> str:
+        elapsed = time.monotonic() - self.start
+        rate = self.count / elapsed if elapsed > 0 else 0.0
+
+        if self.durations:
+            eta = self.format_seconds(self.remaining)
+
+        elif rate:
+            eta = self.format_seconds((self.total - self.completed) / rate)
+
+        else:
+            eta = "?"
+
+        return "{}/{} tests, {} failed, {:.1f} tests/s, ETA {}".format(
+            self.completed,
+            self.total,
+            self.failed,
+            rate,
+            eta,
+        )
+
+    def draw(self):
+        line = self.get_line()
+        self.stream.write("\r" + line.ljust(self.width))
+        self.stream.flush()
+        self.width = len(line)
+        self.drawn = time.monotonic()
+
+    def clear(self):
+        """Erase the line so something else can be written"""
+        if self.width:
+            self.stream.write("\r" + " " * self.width + "\r")
+            self.width = 0
+            self.drawn = 0.0
+
+    def finish(self):
+        """Draw the final line"""
+        self.draw()
+        self.stream.writeln()
+        self.width = 0
@@ -0,0 +1,793 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import io
+import gc
+import logging
+import warnings
+import traceback
+import collections
+import multiprocessing
+from multiprocessing.connection import wait
+from unittest.suite import _ErrorHolder
+from unittest.case import _SubTest, _subtest_msg_sentinel
+import unittest
+
+from .compat import *
+from .tester import TestSuite, TestLoader, TestResult, RemoteTraceback
+from .watchdog import Watchdog, TestTimeoutError
+from .memory import MemoryTracker
+from .profiler import Profiler
+from .sampler import Sampler
+
+
+logger = logging.getLogger(__name__)
+
+
+class RemoteSubTest(_SubTest):
+    """A subtest that ran in a worker process, the worker only sends back the
+    subtest's description so that is all this holds"""
+    def __init__(self, test_case, description):
+        super().__init__(test_case, _subtest_msg_sentinel, {})
+        self.description = description
+
+    def _subDescription(self):
+        return self.description
+
+
+class WorkerResult(TestResult):
+    """The result used in a worker process, it doesn't output anything, it
+    sends everything that happens to each test back to the parent process
+    through `conn`
+
+    Each test's events are batched and sent when the test stops, the parent
+    replays them into the real result
+
+    Messages sent:
+        ("start", group_id, index) -- a test has started
+        ("test", group_id, index, events, started) -- a test has finished,
+            started is False if the test was skipped without being started
+        ("holder", description, events) -- a class or module fixture errored
+        ("done", group_id) -- every test in the group has run
+        ("timeout", group_id) -- a test timed out and the worker is exiting
+        ("stopped",) -- the worker has torn everything down and is exiting
+    """
+    def __init__(self, conn, buffer=False, tb_locals=False):
+        super().__init__(
+            unittest.runner._WritelnDecorator(io.StringIO()),
+            True,
+            0,
+        )
+        self.buffer = buffer
+        self.tb_locals = tb_locals
+        self.conn = conn
+        self.group_id = None
+        self.indexes = {}
+        self.events = None
+        self.started = False
+
+    def start_group(self, group_id, tests):
+        """
+        :param group_id: int
+        :param tests: list[tuple[int, TestCase]], each test's index in the
+            parent's group
+        """
+        self.group_id = group_id
+        self.indexes = {id(test): i for i, test in tests}
+
+    def add_event(self, test, name, *args):
+        if id(test) in self.indexes:
+            if self.events is None:
+                # a skipped test method (or a test in a skipped class) is
+                # skipped without being started
+                self.events = []
+
+            self.events.append((name, *args))
+
+        else:
+            # setUpClass, tearDownModule, etc. errors aren't attached to a
+            # started test
+            self.conn.send(("holder", str(test), [(name, *args)]))
+
+    def startTest(self, test):
+        super().startTest(test)
+        self.events = []
+        self.started = True
+        self.conn.send(("start", self.group_id, self.indexes[id(test)]))
+
+    def stopTest(self, test):
+        super().stopTest(test)
+        self.conn.send((
+            "test",
+            self.group_id,
+            self.indexes[id(test)],
+            self.events or [],
+            self.started,
+        ))
+        self.events = None
+        self.started = False
+
+    def addSuccess(self, test):
+        super().addSuccess(test)
+        self.add_event(test, "addSuccess")
+
+    def addError(self, test, err):
+        super().addError(test, err)
+        self.add_event(
+            test,
+            "addError",
+            self.errors.pop()[1],
+            self._get_error_message(err),
+        )
+
+    def addFailure(self, test, err):
+        super().addFailure(test, err)
+        self.add_event(
+            test,
+            "addFailure",
+            self.failures.pop()[1],
+            self._get_error_message(err),
+        )
+
+    def addSkip(self, test, reason):
+        super().addSkip(test, reason)
+        self.skipped.pop()
+        self.add_event(test, "addSkip", reason)
+
+    def addExpectedFailure(self, test, err):
+        super().addExpectedFailure(test, err)
+        self.add_event(
+            test,
+            "addExpectedFailure",
+            self.expectedFailures.pop()[1],
+            self._get_error_message(err),
+        )
+
+    def addUnexpectedSuccess(self, test):
+        super().addUnexpectedSuccess(test)
+        self.unexpectedSuccesses.pop()
+        self.add_event(test, "addUnexpectedSuccess")
+
+    def addSubTest(self, test, subtest, err):
+        super().addSubTest(test, subtest, err)
+        description = subtest._subDescription()
+        if err is None:
+            self.add_event(test, "addSubTest", description, "", "", "")
+
+        else:
+            if issubclass(err[0], test.failureException):
+                outcome, text = "failure", self.failures.pop()[1]
+
+            else:
+                outcome, text = "error", self.errors.pop()[1]
+
+            self.add_event(
+                test,
+                "addSubTest",
+                description,
+                outcome,
+                text,
+                self._get_error_message(err),
+            )
+
+    def addDuration(self, test, elapsed):
+        if hasattr(super(), "addDuration"):
+            super().addDuration(test, elapsed)
+        self.add_event(test, "addDuration", elapsed)
+
+    def addMemory(self, test, peak, rss):
+        super().addMemory(test, peak, rss)
+        self.collectedMemory.pop()
+        self.add_event(test, "addMemory", peak, rss)
+
+
+def run_worker(conn, config):
+    """The worker process's entry point, this runs groups of tests sent from
+    the parent until it receives a stop message
+
+    Module and class fixtures are only torn down when the next group needs
+    a different module or class (or the worker is stopping), so tests of the
+    same module sent to the same worker share setUpModule
+
+    :param conn: Connection, the worker's end of the pipe
+    :param config: dict, the parent's buffer, tb_locals, warnings, timeout,
+        memory, profile, sample_profile and sys.path
+    """
+    sys.path[:] = config["sys_path"]
+    if config["warnings"]:
+        warnings.simplefilter(config["warnings"])
+
+    loader = TestLoader()
+    result = WorkerResult(
+        conn,
+        buffer=config["buffer"],
+        tb_locals=config["tb_locals"],
+    )
+    # this stops every group's suite from thinking it is the top level suite,
+    # which would tear down the module fixtures after every group
+    result._testRunEntered = True
+
+    def timed_out(test, message):
+        # the test could be stuck somewhere that can't be interrupted, so the
+        # error is sent and the worker exits, the parent runs the rest of the
+        # group in a new worker
+        result.add_event(
+            test,
+            "addError",
+            message,
+            result._get_error_message(
+                (TestTimeoutError, TestTimeoutError(message), None),
+            ),
+        )
+        conn.send((
+            "test",
+            result.group_id,
+            result.indexes[id(test)],
+            result.events,
+            result.started,
+        ))
+        conn.send(("timeout", result.group_id))
+        os._exit(1)
+
+    result.watchdog = Watchdog(config["timeout"], callback=timed_out)
+    if config["memory"]:
+        result.memory = MemoryTracker()
+
+    if config["profile"] is not None:
+        result.profiler = Profiler(config["profile"])
+
+    sampler = None
+    if config["sample_profile"] is not None:
+        sampler = Sampler(config["sample_profile"])
+        sampler.phase = "run"
+        sampler.start()
+        result.sampler = sampler
+
+    try:
+        while (msg := conn.recv())[0] != "stop":
+            _, group_id, classpaths = msg
+
+            tests = []
+            index = 0
+            for module_name, qualname, method_names in classpaths:
+                try:
+                    suite = loader.loadTestsFromClassPath(
+                        module_name,
+                        qualname,
+                        method_names,
+                    )
+
+                except Exception:
+                    text = "".join(
+                        traceback.format_exception(*sys.exc_info())
+                    )
+                    message = result._get_error_message(sys.exc_info())
+                    for i in range(index, index + len(method_names)):
+                        conn.send((
+                            "test",
+                            group_id,
+                            i,
+                            [("addError", text, message)],
+                            True,
+                        ))
+
+                else:
+                    tests.extend(enumerate(suite, index))
+
+                index += len(method_names)
+
+            result.start_group(group_id, tests)
+            unittest.TestSuite(test for _, test in tests).run(result)
+            conn.send(("done", group_id))
+
+        suite = unittest.TestSuite()
+        suite._tearDownPreviousClass(None, result)
+        suite._handleModuleTearDown(result)
+
+        if sampler:
+            sampler.stop()
+            sampler.write_worker()
+
+        conn.send(("stopped",))
+
+    except (KeyboardInterrupt, EOFError, BrokenPipeError):
+        # the parent is gone or is shutting everything down
+        pass
+
+
+class TestGroup(object):
+    """The tests of one TestCase class, or one module, that will be sent to
+    a worker together"""
+    def __init__(self, group_id, tests):
+        self.group_id = group_id
+        self.tests = tests
+        self.finished = set()
+        self.module_name = type(tests[0]).__module__
+
+    def remaining(self):
+        """Return the indexes of the tests that haven't finished"""
+        return [i for i in range(len(self.tests)) if i not in self.finished]
+
+    def get_classpaths(self):
+        """Get what a worker needs to load this group's tests
+
+        :returns: list[tuple[str, str, list[str]]], the module name, class
+            qualname and method names of each run of tests from the same class
+        """
+        ret = []
+        for test in self.tests:
+            c = type(test)
+            if not ret or ret[-1][:2] != (c.__module__, c.__qualname__):
+                ret.append((c.__module__, c.__qualname__, []))
+            ret[-1][2].append(test._testMethodName)
+
+        return ret
+
+
+class Worker(object):
+    """Wraps a worker process and the parent's end of its pipe"""
+    def __init__(self, context, config):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=run_worker,
+            args=(child_conn, config),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+        self.group = None
+        self.group_id = None
+        self.index = None
+        self.module_name = ""
+        self.stopping = False
+        self.timed_out = False
+        self.group_count = 0
+
+    def send_group(self, group):
+        self.group = group
+        self.group_id = group.group_id
+        self.index = None
+        self.module_name = group.module_name
+        self.group_count += 1
+        self.conn.send(("run", group.group_id, group.get_classpaths()))
+
+    def stop(self):
+        self.stopping = True
+        try:
+            self.conn.send(("stop",))
+
+        except OSError:
+            pass
+
+    def terminate(self):
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        self.conn.close()
+
+
+class ParallelTestSuite(object):
+    """Runs the tests of a suite across a pool of worker processes and
+    streams the results back into the result passed to `.run`
+
+    The results are replayed in the order the groups are in the suite, the
+    first unfinished group's results are replayed as they arrive and the
+    results of the groups after it are held until it finishes, so the output
+    is in the same order as a serial run
+
+    Tests are grouped by class so setUpClass runs once per group, tests that
+    can't be imported by a worker (eg, classes defined in a function) are
+    run in this process after the workers finish
+
+    In fork mode the tests are grouped by module and every group is run in
+    its own process forked from this one, so each module gets a fresh copy
+    of everything this process has already imported
+
+    https://docs.python.org/3/library/multiprocessing.html
+    """
+    def __init__(self, test, jobs, warnings=None, fork=False):
+        """
+        :param test: TestSuite, the suite the TestLoader created
+        :param jobs: int, how many worker processes, 0 uses every cpu
+        :param warnings: str, the runner's warnings setting
+        :param fork: bool, True to fork a new process for every module
+        """
+        self.test = test
+        self.jobs = jobs if jobs > 0 else (os.cpu_count() or 1)
+        self.warnings = warnings
+        self.fork = fork
+        self.groups, self.local_tests = self.get_groups()
+
+    def __call__(self, *args, **kwargs):
+        return self.run(*args, **kwargs)
+
+    def countTestCases(self):
+        return self.test.countTestCases()
+
+    def is_portable(self, test):
+        """Return True if a worker process can recreate `test` from its
+        module, class and method names"""
+        c = type(test)
+        if c.__module__ == "__main__" or "<locals>" in c.__qualname__:
+            return False
+
+        o = sys.modules.get(c.__module__)
+        for name in c.__qualname__.split("."):
+            o = getattr(o, name, None)
+
+        if o is not c:
+            return False
+
+        # unittest's placeholder tests (eg, _FailedTest) create their test
+        # methods on the instance
+        method_name = getattr(test, "_testMethodName", "")
+        return callable(getattr(c, method_name, None))
+
+    def get_groups(self):
+        """Split the suite's tests into groups by class, or by module in
+        fork mode
+
+        :returns: tuple[list[TestGroup], list[TestCase]], the groups the
+            workers will run and the tests that have to run in this process
+        """
+        groups = {}
+        local_tests = []
+        for test in self.test.get_testcases():
+            if self.is_portable(test):
+                c = type(test)
+                if self.fork:
+                    key = c.__module__
+
+                else:
+                    key = (c.__module__, c.__qualname__)
+
+                if key in groups:
+                    groups[key].tests.append(test)
+
+                else:
+                    groups[key] = TestGroup(len(groups), [test])
+
+            else:
+                local_tests.append(test)
+
+        return list(groups.values()), local_tests
+
+    def get_config(self, result):
+        return {
+            "sys_path": list(sys.path),
+            "warnings": self.warnings,
+            "buffer": result.buffer,
+            "tb_locals": result.tb_locals,
+            "timeout": getattr(result, "watchdog", Watchdog()).timeout,
+            "memory": bool(getattr(result, "memory", None)),
+            "profile": (
+                profiler.directory
+                if (profiler := getattr(result, "profiler", None))
+                else None
+            ),
+            "sample_profile": (
+                sampler.path
+                if (sampler := getattr(result, "sampler", None))
+                else None
+            ),
+        }
+
+    def next_group(self, pending, worker):
+        """Pop the next group for `worker`, preferring a group from the module
+        the worker last ran so its module fixtures are reused"""
+        for i, group in enumerate(pending):
+            if group.module_name == worker.module_name:
+                del pending[i]
+                return group
+
+        return pending.popleft()
+
+    def run(self, result, debug=False):
+        if debug or (
+            not self.fork
+            and (self.jobs < 2 or len(self.groups) < 2)
+        ):
+            return self.test.run(result, debug)
+
+        for suite in self.test.get_suites():
+            suite.add_path_guesser_errors(result)
+
+        if self.fork:
+            context = multiprocessing.get_context("fork")
+            # everything imported so far is moved out of the garbage
+            # collector's generations so the forked processes don't touch
+            # (and copy) those pages when they collect
+            gc.freeze()
+
+        else:
+            context = multiprocessing.get_context()
+
+        config = self.get_config(result)
+        pending = collections.deque(self.groups)
+        workers = []
+
+        self.output = {group.group_id: [] for group in self.groups}
+        self.finished = set()
+        self.next_group_id = 0
+
+        # the workers time, measure, and profile their own tests, the tests
+        # replayed into result have already finished
+        watchdog = getattr(result, "watchdog", None)
+        result.watchdog = None
+        memory = getattr(result, "memory", None)
+        result.memory = None
+        profiler = getattr(result, "profiler", None)
+        result.profiler = None
+        sampler = getattr(result, "sampler", None)
+        result.sampler = None
+
+        try:
+            while pending or workers:
+                if result.shouldStop:
+                    break
+
+                idle = [w for w in workers if not w.group and not w.stopping]
+                for w in idle:
+                    if pending and not (self.fork and w.group_count):
+                        w.send_group(self.next_group(pending, w))
+
+                    else:
+                        w.stop()
+
+                running = len([w for w in workers if not w.stopping])
+                while pending and running < self.jobs:
+                    w = Worker(context, config)
+                    w.send_group(self.next_group(pending, w))
+                    workers.append(w)
+                    running += 1
+
+                ready = wait(
+                    [w.conn for w in workers]
+                    + [w.process.sentinel for w in workers]
+                )
+                for w in list(workers):
+                    if w.conn in ready or w.process.sentinel in ready:
+                        if not self.receive(w, result):
+                            workers.remove(w)
+                            w.terminate()
+                            self.handle_exit(w, result, pending)
+
+            # anything held for a group that never finished (eg, its
+            # worker died between tests) is still replayed
+            self.flush(result, force=True)
+
+        finally:
+            for w in workers:
+                w.terminate()
+
+            result.watchdog = watchdog
+            result.memory = memory
+            result.profiler = profiler
+            result.sampler = sampler
+
+        if self.local_tests and not result.shouldStop:
+            TestSuite(self.local_tests).run(result)
+
+        return result
+
+    def receive(self, worker, result):
+        """Read every message `worker` has sent
+
+        :returns: bool, False if the worker has exited
+        """
+        try:
+            while worker.conn.poll():
+                msg = worker.conn.recv()
+                if msg[0] == "start":
+                    worker.index = msg[2]
+
+                elif msg[0] == "test":
+                    group = worker.group
+                    group.finished.add(msg[2])
+                    worker.index = None
+                    self.add_output(
+                        result,
+                        msg[1],
+                        ("test", group.tests[msg[2]], msg[3], msg[4]),
+                    )
+                    if result.shouldStop:
+                        return True
+
+                elif msg[0] == "holder":
+                    # a fixture is attached to the group the worker is
+                    # running, or the group it last ran if the worker is
+                    # tearing everything down
+                    self.add_output(
+                        result,
+                        worker.group_id,
+                        ("holder", msg[1], msg[2]),
+                    )
+
+                elif msg[0] == "done":
+                    worker.group = None
+                    self.finished.add(msg[1])
+                    self.flush(result)
+
+                elif msg[0] == "timeout":
+                    worker.timed_out = True
+
+                elif msg[0] == "stopped":
+                    return False
+
+        except (EOFError, OSError):
+            return False
+
+        return worker.process.is_alive()
+
+    def handle_exit(self, worker, result, pending):
+        """Called after `worker` exits, if the worker died while running a
+        group then the test it was running is reported as an error and the
+        rest of the group is put back on the queue"""
+        group = worker.group
+        if not group:
+            if not worker.stopping:
+                logger.warning(
+                    "Worker process {} exited with code {}".format(
+                        worker.process.pid,
+                        worker.process.exitcode,
+                    )
+                )
+            return
+
+        if remaining := group.remaining():
+            if worker.timed_out:
+                # the test that timed out was already reported
+                pending.appendleft(TestGroup(
+                    group.group_id,
+                    [group.tests[i] for i in remaining],
+                ))
+                return
+
+            index = remaining[0] if worker.index is None else worker.index
+            text = "Worker process {} exited with code {} while running {}"
+            text = text.format(
+                worker.process.pid,
+                worker.process.exitcode,
+                group.tests[index],
+            )
+            self.add_output(
+                result,
+                group.group_id,
+                ("test", group.tests[index], [("addError", text, text)], True),
+            )
+
+            tests = [group.tests[i] for i in remaining if i != index]
+            if tests:
+                pending.appendleft(TestGroup(group.group_id, tests))
+                return
+
+        # the worker died after the group's last test so there is nothing
+        # left to wait for
+        self.finished.add(group.group_id)
+        self.flush(result)
+
+    def add_output(self, result, group_id, output):
+        """Hold `output` until every group before `group_id` has been
+        replayed into `result`
+
+        :param group_id: int
+        :param output: tuple, ("test", test, events, started) or ("holder",
+            description, events)
+        """
+        if group_id is None or group_id < self.next_group_id:
+            # the group has already been replayed
+            self.replay_output(result, output)
+
+        else:
+            self.output[group_id].append(output)
+            self.flush(result)
+
+    def flush(self, result, force=False):
+        """Replay the held output of the groups in order, stopping at the first
+        group that hasn't finished
+
+        :param force: bool, True to replay the output of every group even if
+            it hasn't finished
+        """
+        while self.next_group_id < len(self.groups):
+            output = self.output[self.next_group_id]
+            while output and not result.shouldStop:
+                self.replay_output(result, output.pop(0))
+
+            if result.shouldStop:
+                break
+
+            if not force and self.next_group_id not in self.finished:
+                break
+
+            self.next_group_id += 1
+
+    def replay_output(self, result, output):
+        if output[0] == "test":
+            self.replay(result, *output[1:])
+
+        else:
+            self.replay_holder(result, *output[1:])
+
+    def create_exc_info(self, text, message, exc_class=RemoteTraceback):
+        """
+        :param text: str, the error the worker formatted
+        :param message: str, the error's message, see
+            TestResult._get_error_message
+        :param exc_class: type, the error's type, used to tell failures from
+            errors
+        """
+        return (exc_class, RemoteTraceback(text, message), None)
+
+    def replay(self, result, test, events, started=True):
+        """Replay the events a worker sent for `test` into `result` as if the
+        test had just run in this process
+
+        :param events: list[tuple], the result methods the worker called
+        :param started: bool, False if the worker never started the test (eg,
+            it was skipped with @skip), unittest doesn't start those tests
+            so they aren't started here either
+        """
+        events = events or []
+        if started:
+            result.startTest(test)
+
+        for name, *args in events:
+            if name == "addDuration":
+                # the test already ran, so move the start time back to get the
+                # worker's runtime in the verbose output
+                if getattr(result, "_pyt_start", None):
+                    result._pyt_start -= args[0]
+
+        for name, *args in events:
+            if name in set(["addSuccess", "addUnexpectedSuccess"]):
+                getattr(result, name)(test)
+
+            elif name in set(["addError", "addExpectedFailure"]):
+                getattr(result, name)(test, self.create_exc_info(*args))
+
+            elif name == "addFailure":
+                result.addFailure(
+                    test,
+                    self.create_exc_info(*args, test.failureException),
+                )
+
+            elif name == "addSkip":
+                result.addSkip(test, args[0])
+
+            elif name == "addSubTest":
+                description, outcome, text, message = args
+                err = None
+                if outcome == "failure":
+                    err = self.create_exc_info(
+                        text,
+                        message,
+                        test.failureException,
+                    )
+
+                elif outcome == "error":
+                    err = self.create_exc_info(text, message)
+
+                result.addSubTest(test, RemoteSubTest(test, description), err)
+
+            elif name == "addDuration":
+                if hasattr(result, "addDuration"):
+                    result.addDuration(test, args[0])
+
+            elif name == "addMemory":
+                if hasattr(result, "addMemory"):
+                    result.addMemory(test, *args)
+
+        result.stopTest(test)
+
+    def replay_holder(self, result, description, events):
+        """Replay a fixture error (eg, setUpClass raised) into `result`"""
+        holder = _ErrorHolder(description)
+        for name, *args in events:
+            if name == "addSkip":
+                result.addSkip(holder, args[0])
+
+            else:
+                result.addError(holder, self.create_exc_info(*args))
+
@@ -5,11 +5,17 @@ import unittest
 import sys
 import inspect
 import importlib
+import importlib.util
+import ast
+import builtins
+import types
 import logging
 import hashlib
 import site
 import tempfile
 import glob
+import json
+import time
 
 from .compat import *
 from .utils import modname, get_testcase_name
@@ -47,6 +53,937 @@ class RerunFile(object):
                 yield line.strip()
 
 
+class CacheDir(String):
+    """Finds the directory pyt uses to persist things between runs and sets the
+    value of this string to that path
+
+    This defaults to a `.pyt` directory in the project's base directory (which
+    PathFinder.walk will never descend into since it's a dot directory) but
+    can be moved anywhere using the PYT_CACHE_DIR environment variable
+    """
+    def __new__(cls, basedir=""):
+        basepath = os.environ.get("PYT_CACHE_DIR", "")
+        if not basepath:
+            if not basedir:
+                basedir = os.getcwd()
+            basepath = os.path.join(basedir, ".{}".format(modname()))
+
+        return super().__new__(cls, basepath)
+
+
+class DiscoveryIndex(object):
+    """Persistent index of the test modules pyt has already seen
+
+    Each entry maps a module filepath to the TestCase classes (and their test
+    methods) that were found in that module. An entry is only valid while the
+    stat (mtime and size) of the module, and of every file the module's classes
+    were defined in, hasn't changed. Stale entries are dropped one at a time as
+    they are found, so an edit only ever rescans the files that changed
+
+    Entries come from either importing the module or, if the index has a
+    scanner, from statically scanning the module's source
+
+    PathFinder uses this to skip importing modules that can't possibly contain
+    the class or method it is looking for
+    """
+    version = 2
+
+    racy_seconds = 2
+    """Files modified this recently aren't indexed since a second write within
+    the filesystem's timestamp granularity wouldn't change the stat"""
+
+    def __init__(self, basedir="", method_prefix="test", scanner=None):
+        """
+        :param basedir: str, the project directory, see CacheDir
+        :param method_prefix: str, the prefix test methods start with, the
+            index is thrown away if this changes
+        :param scanner: ModuleScanner, used to fill in missing or stale
+            entries without importing the module
+        """
+        self.filepath = os.path.join(CacheDir(basedir), "index.json")
+        self.method_prefix = method_prefix
+        self.scanner = scanner
+        self.entries = {}
+        self.dirty = False
+
+        # the filepaths that have already been validated during this run
+        self.fresh = set()
+
+        # the filepaths that were modified too recently to be saved
+        self.racy = set()
+
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.filepath, encoding="utf-8") as fp:
+                data = json.load(fp)
+
+        except (IOError, ValueError) as e:
+            data = {}
+
+        if (
+            data.get("version") == self.version
+            and data.get("method_prefix") == self.method_prefix
+        ):
+            self.entries = data.get("entries", {})
+            logger.debug(
+                "Loaded {} entries from index {}".format(
+                    len(self.entries),
+                    self.filepath,
+                )
+            )
+
+    def save(self):
+        """Write the index to disk if it has been modified, this is atomic so
+        concurrent pyt runs will never see a half written index"""
+        if not self.dirty:
+            return
+
+        dirpath = os.path.dirname(self.filepath)
+        try:
+            os.makedirs(dirpath, exist_ok=True)
+            fd, tmppath = tempfile.mkstemp(dir=dirpath, suffix=".tmp")
+            with os.fdopen(fd, mode="w", encoding="utf-8") as fp:
+                json.dump(
+                    {
+                        "version": self.version,
+                        "method_prefix": self.method_prefix,
+                        "entries": {
+                            k: v for k, v in self.entries.items()
+                            if k not in self.racy
+                        },
+                    },
+                    fp,
+                )
+
+            os.replace(tmppath, self.filepath)
+            self.dirty = False
+
+        except (IOError, OSError) as e:
+            logger.warning("Could not save index {}: {}".format(
+                self.filepath,
+                e,
+            ))
+
+    def stat(self, path):
+        st = os.stat(path)
+        return [st.st_mtime_ns, st.st_size]
+
+    def get(self, path):
+        """Return the entry for path if it is still fresh
+
+        :param path: str, the module filepath
+        :returns: dict|None, the entry, None if path isn't in the index or if
+            its entry was stale (in which case the entry is removed)
+        """
+        path = os.path.abspath(path)
+        entry = self.entries.get(path, None)
+        if entry and path not in self.fresh:
+            try:
+                for p, stat in entry["stats"].items():
+                    if self.stat(p) != stat:
+                        raise ValueError(p)
+
+            except (OSError, ValueError) as e:
+                logger.debug("Index entry for {} is stale".format(path))
+                self.discard(path)
+                entry = None
+
+            else:
+                self.fresh.add(path)
+
+        return entry
+
+    def add(self, path, classes, depends=None, **kwargs):
+        """Add or replace the entry for path
+
+        :param path: str, the module filepath
+        :param classes: dict[str, dict], the keys are the names of the
+            TestCase classes in the module, the values have "module",
+            "qualname", and "methods" keys, methods is None if the test
+            methods of the class aren't known
+        :param depends: Iterable[str], any other filepaths whose changes
+            should invalidate this entry (eg, where parent classes are defined)
+        :param **kwargs:
+            * source: str, either "import" or "scan"
+            * dynamic: bool, True if the module could have TestCase classes
+                that aren't in classes
+            * load_tests: bool, True if the module defines load_tests
+        :returns: dict|None, the entry
+        """
+        path = os.path.abspath(path)
+        stats = {}
+        racy_ns = (time.time() - self.racy_seconds) * 1000000000
+        racy = False
+        try:
+            for p in [path, *(depends or [])]:
+                stats[p] = self.stat(p)
+                if stats[p][0] > racy_ns:
+                    racy = True
+
+        except OSError:
+            return None
+
+        entry = {
+            "stats": stats,
+            "classes": classes,
+            "source": kwargs.get("source", "import"),
+            "dynamic": kwargs.get("dynamic", False),
+            "load_tests": kwargs.get("load_tests", False),
+        }
+        self.entries[path] = entry
+        self.fresh.add(path)
+        self.dirty = True
+        if racy:
+            self.racy.add(path)
+
+        else:
+            self.racy.discard(path)
+
+        return entry
+
+    def scan(self, path, module_name):
+        """Add an entry for path by statically scanning it
+
+        :param path: str, the module filepath
+        :param module_name: str, the module's python path
+        :returns: dict|None, the entry, None if there isn't a scanner or path
+            couldn't be scanned
+        """
+        entry = None
+        if self.scanner is not None:
+            if info := self.scanner.scan(path, module_name):
+                logger.debug("Scanned {} for the index".format(path))
+                entry = self.add(
+                    path,
+                    info["classes"],
+                    info["depends"],
+                    source="scan",
+                    dynamic=info["dynamic"],
+                    load_tests=info["load_tests"],
+                )
+
+        return entry
+
+    def is_complete(self, entry):
+        """True if entry completely describes the tests of its module"""
+        return (
+            not entry["dynamic"]
+            and not entry["load_tests"]
+            and all(
+                c_info["methods"] is not None
+                for c_info in entry["classes"].values()
+            )
+        )
+
+    def discard(self, path):
+        path = os.path.abspath(path)
+        if self.entries.pop(path, None) is not None:
+            self.dirty = True
+        self.fresh.discard(path)
+        self.racy.discard(path)
+
+
+class DirectorySnapshot(object):
+    """A run scoped, in memory, copy of the directory tree
+
+    Each directory is only ever read once (using os.scandir) no matter how
+    many times it is walked, so the PathFinders of every test name, and every
+    interpretation of those names, can share one traversal of the tree
+    """
+    def __init__(self):
+        # path -> tuple(dirs, files, symlinked dirs, files as a set)
+        self.listings = {}
+
+        # path -> bool, isfile checks for paths outside of the listings
+        self.isfiles = {}
+
+    def scandir(self, path):
+        """Read the directory at path
+
+        :param path: str, the directory
+        :returns: tuple|None, (dirs, files, links, fileset), None if path
+            couldn't be read
+        """
+        try:
+            listing = self.listings[path]
+
+        except KeyError:
+            dirs = []
+            files = []
+            links = set()
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        try:
+                            is_dir = entry.is_dir()
+
+                        except OSError:
+                            is_dir = False
+
+                        if is_dir:
+                            dirs.append(entry.name)
+                            if entry.is_symlink():
+                                links.add(entry.name)
+
+                        else:
+                            files.append(entry.name)
+
+                listing = (dirs, files, links, set(files))
+
+            except OSError as e:
+                logger.debug("Could not read directory {}: {}".format(path, e))
+                listing = None
+
+            self.listings[path] = listing
+
+        return listing
+
+    def walk(self, basedir):
+        """Same as os.walk(basedir, topdown=True), the yielded dirs list can be
+        modified to prune the walk
+
+        :param basedir: str, the directory to walk
+        :returns: generator[tuple[str, list[str], list[str]]]
+        """
+        if listing := self.scandir(basedir):
+            dirs = list(listing[0])
+            yield basedir, dirs, list(listing[1])
+
+            for d in dirs:
+                # like os.walk we don't follow symlinked directories
+                if d not in listing[2]:
+                    yield from self.walk(os.path.join(basedir, d))
+
+    def isfile(self, path):
+        """Same as os.path.isfile(path) but cached"""
+        dirpath, basename = os.path.split(path)
+        if listing := self.listings.get(dirpath, None):
+            ret = basename in listing[3]
+
+        else:
+            try:
+                ret = self.isfiles[path]
+
+            except KeyError:
+                ret = os.path.isfile(path)
+                self.isfiles[path] = ret
+
+        return ret
+
+
+class ModuleScanner(object):
+    """Statically finds the TestCase classes and test methods of a module by
+    parsing its source instead of importing it
+
+    TestCase subclasses are found by following base classes through local
+    classes and `from ... import` statements into other modules' source
+    (project modules and installed packages) until they bottom out at one of
+    unittest's TestCase classes or something that definitely isn't one. Any
+    name that can't be followed has unknown methods, so PathFinder will fall
+    back to importing the module if that name could match
+
+    Like PathGuesser, this uses PEP 8 conventions, so only names that start
+    with an uppercase letter (and aren't ALL_CAPS constants) are considered
+    possible classes
+    """
+    testcase_names = {
+        "TestCase": "unittest.case",
+        "IsolatedAsyncioTestCase": "unittest.async_case",
+        "FunctionTestCase": "unittest.case",
+    }
+    """The TestCase classes that unittest defines and their modules"""
+
+    decorator_names = set([
+        "skip",
+        "skipIf",
+        "skipUnless",
+        "skip_if",
+        "skip_unless",
+        "expectedFailure",
+        "patch",
+    ])
+    """Class decorators that are known to return the class they decorate"""
+
+    dynamic_names = set([
+        "setattr",
+        "delattr",
+        "exec",
+        "eval",
+        "globals",
+        "locals",
+        "vars",
+    ])
+    """Calling any of these could add or change names that can't be seen by
+    parsing"""
+
+    metaclass_names = set([
+        "type",
+        "ABCMeta",
+    ])
+
+    max_depth = 20
+
+    def __init__(self, basedir, method_prefix="test", snapshot=None):
+        """
+        :param basedir: str, the project directory, modules are looked for in
+            here first
+        :param method_prefix: str, the test method prefix
+        :param snapshot: DirectorySnapshot
+        """
+        self.basedir = basedir
+        self.method_prefix = method_prefix
+        self.snapshot = snapshot or DirectorySnapshot()
+
+        # filepath -> parsed module info
+        self.modules = {}
+
+        # modname -> filepath
+        self.module_paths = {}
+
+        # (filepath, name) -> tuple(resolved, depends)
+        self.resolved = {}
+
+        self.resolving = set()
+
+    def scan(self, path, module_name):
+        """Statically scan the module at path
+
+        :param path: str, the module filepath
+        :param module_name: str, the module's python path (eg, foo.bar_test)
+        :returns: dict|None, None if the module couldn't be parsed, otherwise
+            keys are "classes" (see DiscoveryIndex.add), "dynamic" (True if
+            there could be names that parsing can't see), "load_tests", and
+            "depends" (all the other filepaths that were read)
+        """
+        path = os.path.abspath(path)
+        module = self.get_module(path, module_name)
+        if module is None:
+            return None
+
+        classes = {}
+        depends = set()
+        for name in module["symbols"].keys():
+            if not self.is_class_name(name):
+                continue
+
+            resolved = self.resolve_name(module, name, depends)
+            if resolved is None:
+                classes[name] = {
+                    "module": module_name,
+                    "qualname": name,
+                    "methods": None,
+                }
+
+            elif (
+                resolved["testcase"]
+                and resolved["classpath"] != "unittest.case.TestCase"
+            ):
+                classes[name] = {
+                    "module": resolved["module"],
+                    "qualname": resolved["qualname"],
+                    "methods": (
+                        None if resolved["methods"] is None
+                        else sorted(resolved["methods"])
+                    ),
+                }
+
+        depends.discard(path)
+        return {
+            "classes": classes,
+            "dynamic": module["dynamic"],
+            "load_tests": module["load_tests"],
+            "depends": depends,
+        }
+
+    def is_class_name(self, name):
+        return name[0].isupper() and not name.isupper()
+
+    def get_module(self, path, module_name):
+        """Parse the module at path and gather the names it defines
+
+        :returns: dict|None, None if path couldn't be parsed
+        """
+        try:
+            return self.modules[path]
+
+        except KeyError:
+            module = None
+            try:
+                with open(path, mode="rb") as fp:
+                    tree = ast.parse(fp.read(), filename=path)
+
+            except (OSError, SyntaxError, ValueError) as e:
+                logger.debug("Could not parse {}: {}".format(path, e))
+
+            else:
+                module = {
+                    "path": path,
+                    "name": module_name,
+                    "package": (
+                        module_name if path.endswith("__init__.py")
+                        else module_name.rpartition(".")[0]
+                    ),
+                    "symbols": {},
+                    "dynamic": False,
+                    "load_tests": False,
+                }
+                self.scan_body(module, tree.body)
+
+            self.modules[path] = module
+            return module
+
+    def scan_body(self, module, body, conditional=False):
+        """Add the names bound by the statements in body to module
+
+        :param module: dict, see .get_module
+        :param body: list[ast.stmt]
+        :param conditional: bool, True if body is inside a control flow
+            statement (eg, if, try)
+        """
+        symbols = module["symbols"]
+        for node in body:
+            if isinstance(node, ast.ClassDef):
+                if conditional:
+                    module["dynamic"] = True
+
+                # the previous binding is kept around because the class can
+                # extend it (eg, class TestCase(TestCase))
+                symbols[node.name] = (
+                    "class",
+                    node,
+                    symbols.get(node.name, None),
+                )
+
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                if node.name == "load_tests":
+                    module["load_tests"] = True
+
+                elif node.name == "__getattr__":
+                    module["dynamic"] = True
+
+                symbols[node.name] = ("value",)
+
+            elif isinstance(node, ast.Import):
+                for alias in node.names:
+                    if alias.asname:
+                        symbols[alias.asname] = ("module", alias.name)
+
+                    else:
+                        name = alias.name.split(".")[0]
+                        symbols[name] = ("module", name)
+
+            elif isinstance(node, ast.ImportFrom):
+                modname = self.get_import_modname(module, node)
+                for alias in node.names:
+                    if alias.name == "*":
+                        module["dynamic"] = True
+
+                    else:
+                        symbols[alias.asname or alias.name] = (
+                            "from",
+                            modname,
+                            alias.name,
+                        )
+
+            else:
+                if self.is_dynamic(node):
+                    module["dynamic"] = True
+
+                if isinstance(node, (ast.Assign, ast.AnnAssign)):
+                    targets = self.get_targets(node)
+                    for target in targets:
+                        if isinstance(target, ast.Name):
+                            symbols[target.id] = self.get_value_symbol(
+                                node.value
+                            )
+
+                        else:
+                            for n in ast.walk(target):
+                                if isinstance(n, ast.Name):
+                                    symbols[n.id] = ("unknown",)
+
+                elif isinstance(node, ast.AugAssign):
+                    if isinstance(node.target, ast.Name):
+                        symbols[node.target.id] = ("unknown",)
+
+                else:
+                    for field in ["body", "orelse", "finalbody"]:
+                        if stmts := getattr(node, field, None):
+                            self.scan_body(module, stmts, True)
+
+                    for handler in getattr(node, "handlers", []):
+                        self.scan_body(module, handler.body, True)
+
+                    for case in getattr(node, "cases", []):
+                        self.scan_body(module, case.body, True)
+
+                    if isinstance(node, (ast.For, ast.AsyncFor)):
+                        for n in ast.walk(node.target):
+                            if isinstance(n, ast.Name):
+                                symbols[n.id] = ("unknown",)
+
+    def get_targets(self, node):
+        """Get the targets of an Assign or AnnAssign node"""
+        if isinstance(node, ast.Assign):
+            return node.targets
+
+        # an annotation without a value doesn't bind anything
+        return [node.target] if node.value else []
+
+    def is_dynamic(self, node):
+        """True if node calls anything in .dynamic_names"""
+        for n in ast.walk(node):
+            if isinstance(n, ast.Call):
+                if isinstance(n.func, ast.Name):
+                    if n.func.id in self.dynamic_names:
+                        return True
+
+        return False
+
+    def get_value_symbol(self, value):
+        if isinstance(value, (ast.Name, ast.Attribute)):
+            return ("alias", value)
+
+        elif isinstance(
+            value,
+            (
+                ast.Constant,
+                ast.JoinedStr,
+                ast.List,
+                ast.Tuple,
+                ast.Dict,
+                ast.Set,
+                ast.ListComp,
+                ast.DictComp,
+                ast.SetComp,
+                ast.Lambda,
+                ast.BinOp,
+                ast.Compare,
+            )
+        ):
+            return ("value",)
+
+        else:
+            return ("unknown",)
+
+    def get_import_modname(self, module, node):
+        """Get the absolute module name of an ImportFrom node"""
+        modname = node.module or ""
+        if node.level:
+            parts = module["package"].split(".") if module["package"] else []
+            if node.level > 1:
+                parts = parts[:-(node.level - 1)]
+
+            if modname:
+                parts.append(modname)
+
+            modname = ".".join(parts)
+
+        return modname
+
+    def get_dotted_name(self, node):
+        """Convert a Name or Attribute node into a list of names (eg, a.b.C
+        would return ["a", "b", "C"])"""
+        if isinstance(node, ast.Name):
+            return [node.id]
+
+        elif isinstance(node, ast.Attribute):
+            if parts := self.get_dotted_name(node.value):
+                parts.append(node.attr)
+                return parts
+
+        elif isinstance(node, ast.Call):
+            # decorators like @skip("reason")
+            return self.get_dotted_name(node.func)
+
+        return []
+
+    def find_module_path(self, modname):
+        """Find the source file of modname without importing it
+
+        :param modname: str, an absolute module name
+        :returns: str, the filepath, empty if the source couldn't be found
+        """
+        try:
+            return self.module_paths[modname]
+
+        except KeyError:
+            ret = ""
+            parts = modname.split(".")
+            basedirs = [self.basedir]
+
+            # find_spec imports parent packages, so we only ask it about the
+            # top level module and then look for the rest ourselves
+            try:
+                spec = importlib.util.find_spec(parts[0])
+
+            except (ImportError, ValueError) as e:
+                spec = None
+
+            if spec:
+                if spec.submodule_search_locations:
+                    basedirs.extend(
+                        os.path.dirname(p)
+                        for p in spec.submodule_search_locations
+                    )
+
+                elif len(parts) == 1 and spec.has_location:
+                    if spec.origin and spec.origin.endswith(".py"):
+                        ret = spec.origin
+
+            if not ret:
+                for basedir in basedirs:
+                    for path in [
+                        os.path.join(basedir, *parts, "__init__.py"),
+                        os.path.join(basedir, *parts) + ".py",
+                    ]:
+                        if self.snapshot.isfile(path):
+                            ret = os.path.abspath(path)
+                            break
+
+                    if ret:
+                        break
+
+            self.module_paths[modname] = ret
+            return ret
+
+    def resolve_name(self, module, name, depends, depth=0):
+        """Resolve name in module's namespace to a class
+
+        :param module: dict, see .get_module
+        :param name: str
+        :param depends: set, any filepaths that were read are added to this
+        :returns: dict|None, None if name couldn't be resolved, otherwise the
+            keys are "testcase" (bool), "methods" (set|None, None if the test
+            methods couldn't be determined), "module", "qualname", "classpath"
+            and "defines" (set of all the methods the class defines)
+        """
+        key = (module["path"], name)
+        if key in self.resolved:
+            resolved, rdepends = self.resolved[key]
+            depends.update(rdepends)
+            return resolved
+
+        if key in self.resolving or depth > self.max_depth:
+            return None
+
+        self.resolving.add(key)
+        rdepends = set([module["path"]])
+        try:
+            resolved = self._resolve_name(module, name, rdepends, depth)
+
+        finally:
+            self.resolving.discard(key)
+
+        self.resolved[key] = (resolved, rdepends)
+        depends.update(rdepends)
+        return resolved
+
+    def _resolve_name(self, module, name, depends, depth):
+        return self.resolve_symbol(
+            module,
+            name,
+            module["symbols"].get(name, None),
+            depends,
+            depth,
+        )
+
+    def resolve_symbol(self, module, name, symbol, depends, depth):
+        """Resolve the symbol bound to name in module"""
+        if symbol is None:
+            if isinstance(getattr(builtins, name, None), type):
+                # builtin classes (eg, object, Exception) aren't TestCases
+                # and don't have test methods
+                return self.create_resolved("builtins", name, False, set())
+
+        elif symbol[0] == "class":
+            return self.resolve_class(
+                module,
+                symbol[1],
+                depends,
+                depth,
+                symbol[2],
+            )
+
+        elif symbol[0] == "from":
+            return self.resolve_import(symbol[1], symbol[2], depends, depth)
+
+        elif symbol[0] == "alias":
+            return self.resolve_expr(module, symbol[1], depends, depth)
+
+        elif symbol[0] in ("value", "module"):
+            # functions, constants, and modules aren't classes
+            return self.create_resolved(module["name"], name, False, set())
+
+        return None
+
+    def resolve_import(self, modname, name, depends, depth):
+        """Resolve `from modname import name`"""
+        if modname == "unittest" or modname.startswith("unittest."):
+            # unittest's source is never followed, its TestCase classes are
+            # where everything bottoms out
+            return self.create_resolved(
+                self.testcase_names.get(name, modname),
+                name,
+                name in self.testcase_names,
+                set(),
+            )
+
+        if not modname:
+            return None
+
+        if path := self.find_module_path(modname):
+            if module := self.get_module(path, modname):
+                if name in module["symbols"]:
+                    return self.resolve_name(module, name, depends, depth + 1)
+
+                elif self.find_module_path(f"{modname}.{name}"):
+                    # name is a submodule, not a class
+                    return self.create_resolved(modname, name, False, set())
+
+        return None
+
+    def resolve_expr(self, module, node, depends, depth):
+        """Resolve a Name or Attribute node (eg, a base class) to a class"""
+        parts = self.get_dotted_name(node)
+        if not parts:
+            return None
+
+        if len(parts) == 1:
+            return self.resolve_name(module, parts[0], depends, depth + 1)
+
+        symbol = module["symbols"].get(parts[0], None)
+        if symbol and symbol[0] == "module":
+            modname = ".".join([symbol[1], *parts[1:-1]])
+
+        elif symbol and symbol[0] == "from":
+            # from foo import bar; bar.Baz
+            modname = ".".join([symbol[1], symbol[2], *parts[1:-1]])
+
+        else:
+            return None
+
+        return self.resolve_import(modname, parts[-1], depends, depth)
+
+    def resolve_class(self, module, node, depends, depth, previous=None):
+        """Resolve a local class definition
+
+        :param previous: tuple, the symbol that was bound to the class's name
+            before the class was defined
+        """
+        testcase = False
+        methods = set()
+        defines = set()
+        unknown = False
+
+        for base in node.bases:
+            if isinstance(base, ast.Name) and base.id == node.name:
+                resolved = self.resolve_symbol(
+                    module,
+                    base.id,
+                    previous,
+                    depends,
+                    depth + 1,
+                )
+
+            else:
+                resolved = self.resolve_expr(module, base, depends, depth)
+
+            if resolved is None:
+                # we don't know if this is a TestCase or not
+                return None
+
+            testcase = testcase or resolved["testcase"]
+            defines.update(resolved["defines"])
+            if resolved["methods"] is None:
+                unknown = True
+
+            else:
+                methods.update(resolved["methods"])
+
+        for keyword in node.keywords:
+            if keyword.arg == "metaclass":
+                parts = self.get_dotted_name(keyword.value)
+                if not parts or parts[-1] not in self.metaclass_names:
+                    resolved = self.resolve_expr(
+                        module,
+                        keyword.value,
+                        depends,
+                        depth,
+                    )
+                    if resolved is None or resolved["defines"].intersection(
+                        ["__new__", "__init__", "__prepare__", "__dir__"]
+                    ):
+                        unknown = True
+
+            else:
+                unknown = True
+
+        for decorator in node.decorator_list:
+            parts = self.get_dotted_name(decorator)
+            if not parts or parts[-1] not in self.decorator_names:
+                if "patch" not in parts:
+                    unknown = True
+
+        for n in node.body:
+            if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                defines.add(n.name)
+                if n.name.startswith(self.method_prefix):
+                    methods.add(n.name)
+
+            elif isinstance(n, (ast.Assign, ast.AnnAssign)):
+                for target in self.get_targets(n):
+                    for t in ast.walk(target):
+                        if isinstance(t, ast.Name):
+                            defines.add(t.id)
+                            if t.id.startswith(self.method_prefix):
+                                unknown = True
+
+                if self.is_dynamic(n):
+                    unknown = True
+
+            elif not isinstance(n, (ast.Expr, ast.Pass, ast.ClassDef)):
+                unknown = True
+
+            elif self.is_dynamic(n):
+                unknown = True
+
+        return self.create_resolved(
+            module["name"],
+            node.name,
+            testcase,
+            None if unknown else methods,
+            defines,
+        )
+
+    def create_resolved(
+        self,
+        module_name,
+        qualname,
+        testcase,
+        methods,
+        defines=None,
+    ):
+        return {
+            "testcase": testcase,
+            "methods": methods,
+            "defines": defines or set(),
+            "module": module_name,
+            "qualname": qualname,
+            "classpath": f"{module_name}.{qualname}",
+        }
+
+
+class StaticTestCase(unittest.TestCase):
+    """Stands in for a TestCase class that was found by ModuleScanner without
+    importing its module, these are only ever listed (see --list), never run
+    """
+    def _static_test(self):
+        raise unittest.SkipTest("Test was found statically and wasn't loaded")
+
+
 class PathFinder(object):
     """Pathfinder class
 
@@ -66,14 +1003,37 @@ class PathFinder(object):
             * method_name: str, the test method name to find
             * filepath: str, if instead of a python class path you pass in an
                 actual file path then it will be here
+            * index: DiscoveryIndex, consulted before any module is imported
+            * snapshot: DirectorySnapshot, used to walk basedir, pass in the
+                same snapshot to multiple finders so they share one traversal
+            * static: bool, if True then .modules will yield stand-in modules
+                built from the index (see .create_static_module) instead of
+                importing any module the index completely describes
+            * module: ModuleType, the already imported module to search, if
+                this is given then basedir isn't walked at all
+            * members: dict, the TestCase classes of modules and the methods
+                of classes, pass in the same dict to multiple finders so each
+                module and class is only inspected once
+            * exclude: TestMatcher, modules this matches are never imported
         """
         self.basedir = basedir
         self.method_prefix = kwargs.get("method_prefix", "test")
         self.module_prefixes = ["test_", "test"]
         self.module_postfixes = ["_test", "test", "_tests", "tests"]
+        self.index = None
+        self.snapshot = None
+        self.static = False
+        self.members = None
+        self.exclude = None
         for k, v in kwargs.items():
             setattr(self, k, v)
 
+        if self.snapshot is None:
+            self.snapshot = DirectorySnapshot()
+
+        if self.members is None:
+            self.members = {}
+
     def has_module(self):
         v = getattr(self, 'module_name', None)
         return bool(v)
@@ -107,6 +1067,9 @@ class PathFinder(object):
 
     def modules(self):
         """return modules that match module_name"""
+        if module := getattr(self, "module", None):
+            yield module
+            return
 
         # since the module has to be importable we go ahead and put the
         # basepath as the very first path to check as that should minimize
@@ -114,12 +1077,28 @@ class PathFinder(object):
         sys.path.insert(0, self.basedir)
 
         for p in self.paths():
+            if not self.is_candidate(p):
+                logger.debug("Skipping {} using index".format(p))
+                continue
+
+            if self.exclude and self.exclude.is_excluded_module(
+                self.module_path(p),
+            ):
+                logger.debug("Skipping excluded module {}".format(p))
+                continue
+
+            if self.static:
+                entry = self.get_index_entry(p)
+                if entry and self.index.is_complete(entry):
+                    yield self.create_static_module(p, entry)
+                    continue
+
             # http://stackoverflow.com/questions/67631/
             try:
                 module_name = self.module_path(p)
                 logger.debug("Importing {} ({})".format(module_name, p))
                 m = importlib.import_module(module_name)
-                yield m
+                self.index_module(p, m)
 
             except Exception as e:
                 logger.warning(
@@ -134,73 +1113,242 @@ class PathFinder(object):
                     self.error_info = exc_info
                 continue
 
+            yield m
+
         sys.path.pop(0)
 
-    def classes(self):
-        """the partial self.class_name will be used to find actual TestCase
-        classes"""
-        for module in self.modules():
-            cs = inspect.getmembers(module, inspect.isclass)
-            class_name = getattr(self, 'class_name', '')
-            class_regex = ''
-            if class_name:
-                if class_name.startswith("*"):
-                    class_name = class_name.strip("*")
-                    class_regex = re.compile(r'.*?{}'.format(class_name), re.I)
-                else:
-                    class_regex = re.compile(r'^{}'.format(class_name), re.I)
+    def get_index_entry(self, path):
+        """Get the fresh index entry for path, statically scanning path if the
+        index doesn't have one
 
-            for c_name, c in cs:
-                can_yield = True
-                if class_regex and not class_regex.match(c_name):
-                    can_yield = False
+        :param path: str, the module filepath
+        :returns: dict|None
+        """
+        entry = None
+        if self.index is not None:
+            entry = self.index.get(path)
+            if entry is None:
+                entry = self.index.scan(path, self.module_path(path))
+
+        return entry
+
+    def is_candidate(self, path):
+        """Returns False if the index knows the module at path doesn't contain
+        any test matching the class and method names of this finder
 
-                if can_yield and issubclass(c, unittest.TestCase):
+        :param path: str, the module filepath
+        :returns: bool, True if the module needs to be imported
+        """
+        ret = True
+        if self.index is not None and (self.has_class() or self.has_method()):
+            entry = self.get_index_entry(path)
+            if entry and not entry["dynamic"]:
+                class_regex = self._get_class_regex()
+                method_regex = self._get_method_regex()
+                ret = False
+                for c_name, c_info in entry["classes"].items():
+                    if class_regex and not class_regex.match(c_name):
+                        continue
+
+                    if c_info["methods"] is None:
+                        ret = True
+
+                    elif method_regex:
+                        for m_name in c_info["methods"]:
+                            if method_regex.match(m_name):
+                                ret = True
+                                break
+
+                    else:
+                        ret = bool(c_info["methods"]) or not self.has_method()
+
+                    if ret:
+                        break
+
+        return ret
+
+    def create_static_module(self, path, entry):
+        """Create a stand-in for the module at path from its index entry
+
+        The stand-in's TestCase classes have the same names and test methods
+        as the real ones so they can be loaded and listed just like the real
+        module, they just can't be run
+
+        :param path: str, the module filepath
+        :param entry: dict, the complete index entry for path
+        :returns: ModuleType
+        """
+        module_name = self.module_path(path)
+        logger.debug("Creating static module {} ({})".format(module_name, path))
+        m = types.ModuleType(module_name)
+        m.__file__ = path
+
+        for c_name, c_info in entry["classes"].items():
+            body = {
+                m_name: StaticTestCase._static_test
+                for m_name in c_info["methods"]
+            }
+            body["__module__"] = c_info["module"]
+            body["__qualname__"] = c_info["qualname"]
+            c = type(
+                c_info["qualname"].rpartition(".")[2],
+                (StaticTestCase,),
+                body,
+            )
+            setattr(m, c_name, c)
+
+        return m
+
+    def index_module(self, path, module):
+        """Add the TestCase classes found in module to the index if it doesn't
+        already have a fresh entry for path
+
+        :param path: str, the filepath module was imported from
+        :param module: ModuleType
+        """
+        if self.index is None:
+            return
+
+        entry = self.index.get(path)
+        if entry and entry["source"] == "import":
+            return
+
+        module_file = getattr(module, "__file__", "") or ""
+        if os.path.abspath(module_file) != os.path.abspath(path):
+            # a module with the same name was already imported from somewhere
+            # else so what we have doesn't describe path
+            return
+
+        basedir = os.path.abspath(self.basedir)
+        classes = {}
+        depends = set()
+        for c_name, c in self._get_testcase_classes(module):
+            classes[c_name] = {
+                "module": c.__module__,
+                "qualname": c.__qualname__,
+                "methods": [
+                    m_name for m_name, m in self._get_methods(c)
+                    if m_name.startswith(self.method_prefix)
+                ],
+            }
+
+            # the methods of c can come from parents defined in other files
+            # so changes to those files need to invalidate this entry also
+            for parent in c.__mro__:
+                parent_module = sys.modules.get(parent.__module__, None)
+                if parent_file := getattr(parent_module, "__file__", ""):
+                    parent_file = os.path.abspath(parent_file)
+                    if parent_file.startswith(basedir):
+                        depends.add(parent_file)
+
+        depends.discard(os.path.abspath(path))
+        self.index.add(
+            path,
+            classes,
+            depends,
+            source="import",
+            load_tests=hasattr(module, "load_tests"),
+        )
+
+    def _get_testcase_classes(self, module):
+        """Get all the TestCase classes in module
+
+        :param module: ModuleType
+        :returns: list[tuple[str, type]], (name, class)
+        """
+        try:
+            return self.members[module]
+
+        except KeyError:
+            ret = []
+            for c_name, c in inspect.getmembers(module, inspect.isclass):
+                if issubclass(c, unittest.TestCase):
                     if c is not unittest.TestCase:
-                        logger.debug(
-                            'class: {} matches {}'.format(c_name, class_name)
-                        )
-                        yield c
+                        ret.append((c_name, c))
 
-    def method_names(self):
-        """return the actual test methods that matched self.method_name"""
-        for c in self.classes():
+            self.members[module] = ret
+            return ret
+
+    def _get_methods(self, c):
+        try:
+            return self.members[c]
+
+        except KeyError:
             # http://stackoverflow.com/questions/17019949/
-            ms = inspect.getmembers(
+            ret = inspect.getmembers(
                 c,
                 lambda f: inspect.ismethod(f) or inspect.isfunction(f)
             )
-            method_name = getattr(self, 'method_name', '')
-            method_regex = ''
-            if method_name:
-                if method_name.startswith(self.method_prefix):
+            self.members[c] = ret
+            return ret
+
+    def _get_class_regex(self):
+        class_name = getattr(self, 'class_name', '')
+        class_regex = ''
+        if class_name:
+            if class_name.startswith("*"):
+                class_name = class_name.strip("*")
+                class_regex = re.compile(r'.*?{}'.format(class_name), re.I)
+            else:
+                class_regex = re.compile(r'^{}'.format(class_name), re.I)
+
+        return class_regex
+
+    def _get_method_regex(self):
+        method_name = getattr(self, 'method_name', '')
+        method_regex = ''
+        if method_name:
+            if method_name.startswith(self.method_prefix):
+                method_regex = re.compile(
+                    r'^(?:{}[_]?)?{}'.format(
+                        self.method_prefix,
+                        method_name
+                    ),
+                    flags=re.I
+                )
+
+            else:
+
+                if method_name.startswith("*"):
+                    method_name = method_name.strip("*")
                     method_regex = re.compile(
-                        r'^(?:{}[_]?)?{}'.format(
+                        r'^{}[_]{{0,1}}.*?{}'.format(
                             self.method_prefix,
                             method_name
                         ),
                         flags=re.I
                     )
-
                 else:
+                    method_regex = re.compile(
+                        r'^{}[_]{{0,1}}{}'.format(
+                            self.method_prefix,
+                            method_name
+                        ),
+                        flags=re.I
+                    )
 
-                    if method_name.startswith("*"):
-                        method_name = method_name.strip("*")
-                        method_regex = re.compile(
-                            r'^{}[_]{{0,1}}.*?{}'.format(
-                                self.method_prefix,
-                                method_name
-                            ),
-                            flags=re.I
-                        )
-                    else:
-                        method_regex = re.compile(
-                            r'^{}[_]{{0,1}}{}'.format(
-                                self.method_prefix,
-                                method_name
-                            ),
-                            flags=re.I
-                        )
+        return method_regex
+
+    def classes(self):
+        """the partial self.class_name will be used to find actual TestCase
+        classes"""
+        for module in self.modules():
+            class_name = getattr(self, 'class_name', '')
+            class_regex = self._get_class_regex()
+
+            for c_name, c in self._get_testcase_classes(module):
+                if not class_regex or class_regex.match(c_name):
+                    logger.debug(
+                        'class: {} matches {}'.format(c_name, class_name)
+                    )
+                    yield c
+
+    def method_names(self):
+        """return the actual test methods that matched self.method_name"""
+        for c in self.classes():
+            ms = self._get_methods(c)
+            method_name = getattr(self, 'method_name', '')
+            method_regex = self._get_method_regex()
 
             for m_name, m in ms:
                 if not m_name.startswith(self.method_prefix):
@@ -451,7 +1599,7 @@ class PathFinder(object):
             and os.path.commonprefix([system_d, basedir]) != system_d
         )
 
-        for root, dirs, files in os.walk(basedir, topdown=True):
+        for root, dirs, files in self.snapshot.walk(basedir):
             # ignore dot directories and private directories (start with
             # underscore)
             dirs[:] = [d for d in dirs if d[0] != '.' and d[0] != "_"]
@@ -496,7 +1644,7 @@ class PathFinder(object):
                     else:
                         path = basedir
 
-                    if os.path.isfile(path):
+                    if self.snapshot.isfile(path):
                         logger.debug("Module path: %s", path)
                         yield path
 
@@ -565,7 +1713,7 @@ class PathFinder(object):
             path_args.extend(prefixes[0:i+1])
             path_args.append('__init__.py')
             prefix_module = os.path.join(*path_args)
-            if os.path.isfile(prefix_module):
+            if self.snapshot.isfile(prefix_module):
                 modpath = prefixes[i:]
                 break
 
@@ -589,6 +1737,186 @@ class PathFinder(object):
         return module_name
 
 
+class TestMatcher(object):
+    """Matches tests against names, using the same PEP 8 conventions as
+    PathGuesser to decide which parts of a name are the module, class, and
+    method, without having to find or load the tests the names describe
+
+    This is used to exclude tests (eg, the --not flag). The module parts of
+    the names are kept in a prefix trie, each part matches a module path part
+    that starts with it (ignoring test prefixes like `test_`) and the parts
+    can match anywhere in the module path, so `foo.bar` matches
+    `prefix.foo.bar_test` and every module in it if it is a package. The class
+    and method parts are matched just like PathFinder matches them
+    """
+    finder_class = PathFinder
+
+    def __init__(self, names, basedir="", method_prefix="test"):
+        """
+        :param names: list[str], the names to match, these can be in any of
+            the formats PathGuesser accepts
+        :param basedir: str, the directory file paths are relative to
+        :param method_prefix: str, the test method prefix
+        """
+        self.basedir = os.path.abspath(basedir or os.getcwd())
+        self.method_prefix = method_prefix
+        self.module_prefixes = self.finder_class(
+            self.basedir,
+            method_prefix=method_prefix,
+        ).module_prefixes
+        self.root = self.create_node()
+        self.module_nodes = {}
+        for name in names:
+            self.add(name)
+
+    def create_node(self):
+        return {"children": {}, "module": False, "tests": []}
+
+    def get_module_parts(self, name):
+        """Split a module path or a file path into its parts"""
+        if "/" in name or os.sep in name or name.lower().endswith(".py"):
+            if os.path.isabs(name):
+                name = os.path.relpath(name, self.basedir)
+
+            name = re.sub(r"\.py$", "", name, flags=re.I)
+            return [p for p in re.split(r"[\\/]", name) if p and p != "."]
+
+        return [p for p in name.split(".") if p]
+
+    def get_interpretations(self, name):
+        """Split name into its module, class, and method parts
+
+        :param name: str
+        :returns: list[tuple[list[str], str, str]], an ambiguous name (eg,
+            `foo.bar` could be the bar module or the bar method of the foo
+            module) returns more than one
+        """
+        try:
+            _, name = get_testcase_name(name)
+
+        except ValueError:
+            pass
+
+        if ":" in name:
+            modpath, classpath = name.split(":", 1)
+            bits = self.get_module_parts(modpath) + classpath.split(".")
+
+        else:
+            bits = self.get_module_parts(name)
+
+        if not bits:
+            return []
+
+        if re.search(r"^\*?[A-Z]", bits[-1]):
+            return [(bits[:-1], bits[-1], "")]
+
+        if len(bits) > 1 and re.search(r"^\*?[A-Z]", bits[-2]):
+            return [(bits[:-2], bits[-2], bits[-1])]
+
+        # a lowercase name can also be a method in any class, in any module
+        # if it only has one part, just like PathGuesser guesses it
+        return [(bits, "", ""), (bits[:-1], "", bits[-1])]
+
+    def add(self, name):
+        for module_parts, class_name, method_name in self.get_interpretations(
+            name,
+        ):
+            node = self.root
+            for part in module_parts:
+                node = node["children"].setdefault(
+                    part.lower(),
+                    self.create_node(),
+                )
+
+            if class_name or method_name:
+                finder = self.finder_class(
+                    self.basedir,
+                    method_prefix=self.method_prefix,
+                    class_name=class_name,
+                    method_name=method_name,
+                )
+                node["tests"].append((
+                    finder._get_class_regex(),
+                    finder._get_method_regex(),
+                ))
+
+            else:
+                node["module"] = True
+
+        self.module_nodes = {}
+
+    def is_module_part(self, pattern, part):
+        """Return True if the module path part matches the name's pattern"""
+        part = part.lower()
+        if pattern.startswith("*"):
+            return pattern.strip("*") in part
+
+        if part.startswith(pattern):
+            return True
+
+        for prefix in self.module_prefixes:
+            if part.startswith(prefix) and part[len(prefix):].startswith(
+                pattern,
+            ):
+                return True
+
+        return False
+
+    def get_nodes(self, module_name):
+        """Get the trie nodes of every name whose module parts matched
+        module_name
+
+        :param module_name: str, the full module path
+        :returns: list[dict]
+        """
+        try:
+            return self.module_nodes[module_name]
+
+        except KeyError:
+            ret = [self.root]
+            parts = module_name.split(".")
+            for i in range(len(parts)):
+                nodes = [self.root]
+                for part in parts[i:]:
+                    nodes = [
+                        child
+                        for node in nodes
+                        for pattern, child in node["children"].items()
+                        if self.is_module_part(pattern, part)
+                    ]
+                    if not nodes:
+                        break
+
+                    ret.extend(nodes)
+
+            self.module_nodes[module_name] = ret
+            return ret
+
+    def is_excluded_module(self, module_name):
+        """Return True if every test in module_name matches"""
+        return any(node["module"] for node in self.get_nodes(module_name))
+
+    def is_excluded(self, module_name, class_name, method_name):
+        """Return True if the test matches
+
+        :param module_name: str, the full module path of the test's class
+        :param class_name: str, the class's qualified name
+        :param method_name: str, the test method
+        """
+        for node in self.get_nodes(module_name):
+            if node["module"]:
+                return True
+
+            for class_regex, method_regex in node["tests"]:
+                if (
+                    (not class_regex or class_regex.match(class_name))
+                    and (not method_regex or method_regex.match(method_name))
+                ):
+                    return True
+
+        return False
+
+
 class PathGuesser(object):
     """PathGuesser
 
@@ -617,6 +1945,12 @@ class PathGuesser(object):
             * prefixes: list[str], passed in from PYT_PREFIX or --prefix flag,
                 these are the only prefixes that should be checked, see
                 .create_finder
+            * index: DiscoveryIndex, passed to every PathFinder this creates
+            * snapshot: DirectorySnapshot, passed to every PathFinder this
+                creates, one is created if it isn't passed in
+            * static: bool, passed to every PathFinder this creates
+            * members: dict, passed to every PathFinder this creates
+            * exclude: TestMatcher, passed to every PathFinder this creates
         """
         self.name = name
 
@@ -626,6 +1960,13 @@ class PathGuesser(object):
 
         self.method_prefix = kwargs.get("method_prefix", "test")
         self.prefixes = kwargs.get("prefixes", [])
+        self.index = kwargs.get("index", None)
+        self.snapshot = kwargs.get("snapshot", None) or DirectorySnapshot()
+        self.static = kwargs.get("static", False)
+        self.members = kwargs.get("members", None)
+        if self.members is None:
+            self.members = {}
+        self.exclude = kwargs.get("exclude", None)
 
         self.set_possible()
 
@@ -673,6 +2014,11 @@ class PathGuesser(object):
                 yield self.finder_class(
                     self.basedir,
                     method_prefix=self.method_prefix,
+                    index=self.index,
+                    snapshot=self.snapshot,
+                    static=self.static,
+                    members=self.members,
+                    exclude=self.exclude,
                     **kwargs
                 )
 
@@ -680,9 +2026,117 @@ class PathGuesser(object):
             yield self.finder_class(
                 self.basedir,
                 method_prefix=self.method_prefix,
+                index=self.index,
+                snapshot=self.snapshot,
+                static=self.static,
+                members=self.members,
+                exclude=self.exclude,
                 **kwargs
             )
 
+    def create_exact_finder(self):
+        """If .name is the full path of a TestCase class or test method (eg,
+        `foo.bar_test.BarTest.test_che`, like the testpaths in the RerunFile)
+        then its module is imported directly instead of searching basedir for
+        it
+
+        Only a test module in .basedir that the index says has the class is
+        imported, anything else (eg, an application package) is left to the
+        normal search. This is never done in static mode (eg, --list) since
+        that mode doesn't import anything
+
+        The class and method names are still matched like any other
+        PathFinder would match them, but only in that one module
+
+        :returns: PathFinder|None, None if .name isn't the path of a test
+            class or method in a module in .basedir
+        """
+        if self.static or self.index is None:
+            return None
+
+        parts = self.name.split(".")
+        if len(parts) < 2 or not all(p.isidentifier() for p in parts):
+            return None
+
+        basedir = os.path.abspath(self.basedir)
+        finder = self.finder_class(basedir, method_prefix=self.method_prefix)
+        sys.path.insert(0, basedir)
+        try:
+            for i in range(len(parts) - 1, max(len(parts) - 3, 0), -1):
+                module_name = ".".join(parts[:i])
+                if self.exclude and self.exclude.is_excluded_module(
+                    module_name,
+                ):
+                    return None
+
+                path = os.path.join(basedir, *parts[:i])
+                if not finder._is_module_path(path):
+                    continue
+
+                if self.snapshot.isfile(f"{path}.py"):
+                    path = f"{path}.py"
+
+                elif self.snapshot.isfile(os.path.join(path, "__init__.py")):
+                    path = os.path.join(path, "__init__.py")
+
+                else:
+                    continue
+
+                entry = self.index.get(path) or self.index.scan(
+                    path,
+                    module_name,
+                )
+                if not entry or parts[i] not in entry["classes"]:
+                    return None
+
+                try:
+                    module = importlib.import_module(module_name)
+
+                except Exception as e:
+                    # the normal search will find and report this error
+                    logger.debug("Could not import {}: {}".format(
+                        module_name,
+                        e,
+                    ))
+                    return None
+
+                path = getattr(module, "__file__", None) or ""
+                if not path.startswith(os.path.join(basedir, "")):
+                    return None
+
+                class_name, *method_names = parts[i:]
+                c = getattr(module, class_name, None)
+                if not isinstance(c, type) or not issubclass(
+                    c,
+                    unittest.TestCase,
+                ):
+                    return None
+
+                kwargs = {"class_name": class_name}
+                if method_names:
+                    if not callable(getattr(c, method_names[0], None)):
+                        return None
+                    kwargs["method_name"] = method_names[0]
+
+                logger.debug("Found exact test path: {}".format(self.name))
+                return self.finder_class(
+                    basedir,
+                    method_prefix=self.method_prefix,
+                    index=self.index,
+                    snapshot=self.snapshot,
+                    static=self.static,
+                    members=self.members,
+                    exclude=self.exclude,
+                    module=module,
+                    module_name=module_name,
+                    **kwargs
+                )
+
+        finally:
+            sys.path.remove(basedir)
+
+        return None
+
     def set_possible(self):
         '''
         break up a module path to its various parts (prefix, module, class,
@@ -700,6 +2154,10 @@ class PathGuesser(object):
 
         logger.debug("Guessing test name: %s", name)
 
+        if finder := self.create_exact_finder():
+            self.possible = [finder]
+            return
+
         if "/" in name or re.search(r"\.py(?:\:|$)", name, flags=re.I):
             bits = name.split(":", 1)
             filepath = bits[0]
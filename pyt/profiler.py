@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import logging
+import cProfile
+import pstats
+from collections import defaultdict
+
+from .compat import *
+from .path import CacheDir
+
+
+logger = logging.getLogger(__name__)
+
+
+class Profiler(object):
+    """Profiles each test with cProfile, from startTest to stopTest so the
+    test's setUp and tearDown are included
+
+    Every test's stats are written to
+    `<directory>/tests/<module>/<class>.<method>.pstats` and when the run
+    stops they are merged into the stats of each class (`classes/`), each
+    module (`modules/`) and the whole run (`suite.pstats`), any of them can
+    be opened with pstats:
+
+        $ python -m pstats .pyt/profile/suite.pstats
+
+    https://docs.python.org/3/library/profile.html
+    """
+    def __init__(self, directory=""):
+        """
+        :param directory: str, where the stats are written, defaults to a
+            profile directory in the CacheDir
+        """
+        self.directory = os.path.abspath(
+            directory or os.path.join(CacheDir(), "profile")
+        )
+        self.profile = None
+        self.profiled = 0
+        """How many tests were merged when the run stopped"""
+
+    def get_path(self, *parts) -> str:
+        return os.path.join(self.directory, *parts)
+
+    def start(self):
+        """Remove the stats of any earlier run, this is only called by the
+        process that starts the test run, not the workers running its
+        tests"""
+        for name in ["tests", "classes", "modules"]:
+            shutil.rmtree(self.get_path(name), ignore_errors=True)
+
+        os.makedirs(self.get_path("tests"), exist_ok=True)
+
+    def start_test(self, test):
+        self.profile = cProfile.Profile()
+        try:
+            self.profile.enable()
+
+        except ValueError as e:
+            # only one profiler can be active at a time
+            logger.warning("Could not profile {}: {}".format(test, e))
+            self.profile = None
+
+    def stop_test(self, test):
+        if self.profile:
+            self.profile.disable()
+            module_name = type(test).__module__
+            os.makedirs(self.get_path("tests", module_name), exist_ok=True)
+            self.profile.dump_stats(
+                self.get_path(
+                    "tests",
+                    module_name,
+                    "{}.{}.pstats".format(
+                        type(test).__qualname__,
+                        getattr(test, "_testMethodName", "test"),
+                    ),
+                ),
+            )
+            self.profile = None
+
+    def stop(self) -> int:
+        """Merge the stats of every test into the stats of their classes,
+        modules, and the whole run
+
+        :returns: int, how many tests were profiled
+        """
+        classes = defaultdict(list)
+        modules = defaultdict(list)
+        paths = []
+
+        for root, dirs, files in os.walk(self.get_path("tests")):
+            module_name = os.path.basename(root)
+            for basename in sorted(files):
+                path = os.path.join(root, basename)
+                qualname = basename.rsplit(".", 2)[0]
+                classes[f"{module_name}.{qualname}"].append(path)
+                modules[module_name].append(path)
+                paths.append(path)
+
+        if paths:
+            for name, groups in [("classes", classes), ("modules", modules)]:
+                os.makedirs(self.get_path(name), exist_ok=True)
+                for key, group in groups.items():
+                    pstats.Stats(*group).dump_stats(
+                        self.get_path(name, f"{key}.pstats"),
+                    )
+
+            pstats.Stats(*paths).dump_stats(self.get_path("suite.pstats"))
+            logger.debug("Merged the stats of {} tests in {}".format(
+                len(paths),
+                self.directory,
+            ))
+
+        self.profiled = len(paths)
+        return self.profiled
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+import os
+import glob
+import signal
+import logging
+from collections import Counter
+
+from .compat import *
+from .path import CacheDir
+
+
+logger = logging.getLogger(__name__)
+
+
+class Sampler(object):
+    """A sampling profiler for the whole run
+
+    A timer interrupts the process every `interval` seconds of CPU time and
+    the signal handler records the stack of whatever is running, this costs
+    a few microseconds per sample instead of the cost cProfile adds to every
+    function call, so it can be left on for a whole suite
+
+    Each stack is attributed to pyt's phase (discovery, import, run) and to
+    the test that was running (see TestResult.startTest). The stacks are
+    written in the collapsed format flamegraph tools (eg, flamegraph.pl,
+    speedscope, inferno) read, one `frame;frame;frame count` line per stack
+
+    https://docs.python.org/3/library/signal.html#signal.setitimer
+    https://github.com/brendangregg/FlameGraph#2-fold-stacks
+    """
+    interval = 0.005
+    """How many seconds of CPU time between samples"""
+
+    def __init__(self, path=""):
+        """
+        :param path: str, where the collapsed stacks are written, defaults to
+            sample-profile.txt in the CacheDir
+        """
+        self.path = os.path.abspath(
+            path or os.path.join(CacheDir(), "sample-profile.txt")
+        )
+        self.counts = Counter()
+        self.phase = "discovery"
+        self.test = ""
+        self.handler = None
+
+    def get_worker_paths(self) -> list[str]:
+        """Get the stacks written by worker processes (eg, --jobs)"""
+        return glob.glob(f"{glob.escape(self.path)}.*.worker")
+
+    def clear(self):
+        """Remove the worker stacks left behind by an earlier run that didn't
+        finish"""
+        for path in self.get_worker_paths():
+            os.unlink(path)
+
+    def start(self):
+        if not hasattr(signal, "setitimer"):
+            logger.warning("Sampling is not supported on this platform")
+            return
+
+        self.handler = signal.signal(signal.SIGPROF, self.sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def sample(self, signum, frame):
+        """The signal handler, this only collects the code objects so it is
+        as quick as possible, they are formatted when the stacks are
+        written"""
+        codes = []
+        while frame is not None:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+
+        self.counts[(self.phase, self.test, tuple(codes))] += 1
+
+    def stop(self):
+        if self.handler is not None:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, self.handler)
+            self.handler = None
+
+    def get_frame_name(self, code) -> str:
+        # semicolons separate the frames so they can't be in a frame's name
+        return "{} ({}:{})".format(
+            getattr(code, "co_qualname", code.co_name),
+            os.path.basename(code.co_filename),
+            code.co_firstlineno,
+        ).replace(";", ":")
+
+    def get_lines(self) -> Counter:
+        """Format the collected stacks
+
+        :returns: Counter, the keys are collapsed stacks
+        """
+        lines = Counter()
+        for (phase, test, codes), count in self.counts.items():
+            if phase == "discovery" and any(
+                code.co_filename.startswith("<frozen importlib")
+                for code in codes
+            ):
+                phase = "import"
+
+            frames = ["pyt", phase]
+            if test:
+                frames.append(test)
+
+            frames.extend(self.get_frame_name(c) for c in reversed(codes))
+            lines[";".join(frames)] += count
+
+        return lines
+
+    def write_worker(self):
+        """Write the stacks of a worker process so the parent's `write`
+        merges them"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(f"{self.path}.{os.getpid()}.worker", "w") as fp:
+            for line, count in self.get_lines().items():
+                fp.write(f"{line} {count}\n")
+
+    def write(self) -> int:
+        """Write the stacks of this process and every worker
+
+        :returns: int, how many samples were written
+        """
+        lines = self.get_lines()
+        for path in self.get_worker_paths():
+            with open(path) as fp:
+                for line in fp:
+                    if line := line.strip():
+                        stack, count = line.rsplit(" ", 1)
+                        lines[stack] += int(count)
+
+            os.unlink(path)
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "w") as fp:
+            for line, count in sorted(lines.items()):
+                fp.write(f"{line} {count}\n")
+
+        logger.debug("Wrote {} stacks to {}".format(len(lines), self.path))
+        return sum(lines.values())
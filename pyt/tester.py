@@ -17,11 +17,36 @@ import warnings
 import itertools
 import inspect
 import re
+import importlib
+import sqlite3
+import json
+from xml.sax.saxutils import escape, quoteattr
 
 from .compat import *
-from .utils import testpath, classpath, loghandler_members, modname
+from .utils import (
+    testpath,
+    classpath,
+    modname,
+    get_testcase_name,
+    LogHandlerStreams,
+)
 from .environ import TestEnviron
-from .path import PathGuesser, PathFinder, RerunFile
+from .path import (
+    PathGuesser,
+    PathFinder,
+    RerunFile,
+    DiscoveryIndex,
+    DirectorySnapshot,
+    ModuleScanner,
+    TestMatcher,
+)
+from .history import TestHistory, ResultCache
+from .graph import ImportGraph
+from .watchdog import Watchdog
+from .memory import MemoryTracker, format_bytes
+from .profiler import Profiler
+from .sampler import Sampler
+from .output import AsyncStream, Progress
 
 
 logger = logging.getLogger(__name__)
@@ -72,6 +97,13 @@ class TestSuite(TestSuite):
             else:
                 logger.warning("Unknown test type: %s", type(test))
 
+    def get_suites(self) -> Generator["TestSuite"]:
+        """Get this suite and all the suites it contains"""
+        yield self
+        for test in self._tests:
+            if isinstance(test, TestSuite):
+                yield from test.get_suites()
+
     def get_testpaths(self) -> Generator[str]:
         """Get the full test paths (<MODULE>.<CLASSNAME>.<METHOD_NAME>)
         for all the tests this testsuite represents"""
@@ -79,10 +111,103 @@ class TestSuite(TestSuite):
             if tp := testpath(tc):
                 yield tp
 
-    def run(self, result, *args, **kwargs):
-        # we surface any PathGuesser errors here because this is one of the
-        # first times we have access to the result and we want PathGuesser's
-        # errors integrated with the rest of the error 
+    def filter(self, callback) -> "TestSuite":
+        """Create a copy of this suite with only the tests callback returns
+        True for, the hierarchy of suites (and their names and any PathGuesser
+        errors) is kept but suites that end up empty are dropped
+
+        :param callback: Callable[[TestCase], bool]
+        :returns: TestSuite
+        """
+        suite = self.__class__()
+        for name in ["name", "program", "path_guesser"]:
+            if name in self.__dict__:
+                setattr(suite, name, self.__dict__[name])
+
+        for test in self._tests:
+            if isinstance(test, TestSuite):
+                s = test.filter(callback)
+                if s._tests or getattr(s, "path_guesser", None):
+                    suite.addTest(s)
+
+            elif callback(test):
+                suite.addTest(test)
+
+        return suite
+
+    def shard(
+        self,
+        index: int,
+        count: int,
+        durations: dict[str, float]|None = None,
+    ) -> "TestSuite":
+        """Split this suite's tests into `count` shards and return a suite
+        with only the tests of shard `index`
+
+        Tests are kept together by class so each class is only set up on one
+        shard. Classes are assigned longest first to the shard with the least
+        total duration so far, so every machine given the same tests and
+        durations will compute the same shards
+
+        :param index: int, the shard to return, 1 to count
+        :param count: int, how many shards
+        :param durations: dict[str, float], testpath keys to how long the test
+            takes (see TestHistory.get_durations), tests without a duration
+            are given the average duration, if there aren't any durations then
+            each test is given the same weight so the shards are balanced by
+            test count
+        :returns: TestSuite, the tests are in their original order
+        """
+        durations = durations or {}
+        groups = {}
+        weights = {}
+        for test in self.get_testcases():
+            c = type(test)
+            key = (c.__module__, c.__qualname__)
+            groups.setdefault(key, []).append(test)
+            weights.setdefault(key, [])
+            weights[key].append(durations.get(testpath(test), None))
+
+        known = [d for ds in weights.values() for d in ds if d is not None]
+        default = (sum(known) / len(known)) if known else 1.0
+        for key, ds in weights.items():
+            weights[key] = sum(default if d is None else d for d in ds)
+
+        loads = [0.0] * count
+        shards = {}
+        for key in sorted(groups.keys(), key=lambda k: (-weights[k], k)):
+            i = min(range(count), key=lambda i: (loads[i], i))
+            loads[i] += weights[key]
+            shards[key] = i + 1
+
+        suite = self.__class__()
+        suite.program = getattr(self, "program", None)
+        if index == 1:
+            # any errors from finding the tests are only reported once
+            for s in self.get_suites():
+                if path_guesser := getattr(s, "path_guesser", None):
+                    es = self.__class__()
+                    es.path_guesser = path_guesser
+                    suite.addTest(es)
+
+        for key, tests in groups.items():
+            if shards[key] == index:
+                s = self.__class__(tests)
+                s.name = "{}.{}".format(*key)
+                suite.addTest(s)
+
+        logger.debug("Shard {}/{} has {} tests ({:.3f}s)".format(
+            index,
+            count,
+            suite.countTestCases(),
+            loads[index - 1] if known else 0.0,
+        ))
+
+        return suite
+
+    def add_path_guesser_errors(self, result):
+        """Add any errors the PathGuesser encountered while finding this
+        suite's tests to `result`"""
         if path_guesser := getattr(self, "path_guesser", None):
             for exc_info in path_guesser.get_any_error():
                 self._createClassOrModuleLevelException(
@@ -93,6 +218,11 @@ class TestSuite(TestSuite):
                     exc_info
                 )
 
+    def run(self, result, *args, **kwargs):
+        # we surface any PathGuesser errors here because this is one of the
+        # first times we have access to the result and we want PathGuesser's
+        # errors integrated with the rest of the error 
+        self.add_path_guesser_errors(result)
         return super().run(result, *args, **kwargs)
 
 
@@ -105,10 +235,63 @@ class TestLoader(TestLoader):
     """
     suiteClass = TestSuite
 
-    def loadTestsFromNames(self, names, *args, **kwargs):
-        test = super().loadTestsFromNames(names, *args, **kwargs)
+    def loadTestsFromNames(self, names, module=None):
+        """Load the tests of every name
+
+        The names share one index, snapshot, and cache of module members so
+        each module is only found, imported, and inspected once. Tests that
+        more than one name matched are only added once, and the tests of a
+        class that more than one name matched are grouped into the suite of
+        the first name that matched the class
+
+        :param names: list[str]
+        :returns: TestSuite
+        """
+        # the index and the snapshot are shared by every name, the index is
+        # only written once all the names have been loaded
+        self.directory_snapshot = DirectorySnapshot()
+        self.discovery_index = DiscoveryIndex(
+            self._top_level_dir,
+            self.testMethodPrefix,
+            scanner=ModuleScanner(
+                self._top_level_dir or os.getcwd(),
+                self.testMethodPrefix,
+                self.directory_snapshot,
+            ),
+        )
+        self.module_members = {}
+
+        seen = set()
+        def is_new(t):
+            key = testpath(t)
+            if key in seen:
+                return False
+
+            seen.add(key)
+            return True
+
+        test = self.suiteClass()
+        suites = {}
+        for name in names:
+            suite = self.loadTestsFromName(name, module).filter(is_new)
+            tests = []
+            for s in suite:
+                if s_name := getattr(s, "name", ""):
+                    if s_name in suites:
+                        suites[s_name].addTests(s)
+                        continue
+
+                    suites[s_name] = s
+
+                tests.append(s)
+
+            suite._tests = tests
+            test.addTest(suite)
+
         test.program = self.program
 
+        self.discovery_index.save()
+
         test_count = test.countTestCases()
         logger.debug("Found {} total tests".format(test_count))
 
@@ -127,6 +310,13 @@ class TestLoader(TestLoader):
             basedir=self._top_level_dir,
             method_prefix=self.testMethodPrefix,
             prefixes=program.prefixes,
+            index=getattr(self, "discovery_index", None),
+            snapshot=getattr(self, "directory_snapshot", None),
+            members=getattr(self, "module_members", None),
+            exclude=program.ignore_matcher,
+            # when we are only listing the tests we don't need to import
+            # anything the index can describe
+            static=getattr(program, "list_found_tests", False),
         )
 
         logger.debug(
@@ -175,6 +365,29 @@ class TestLoader(TestLoader):
         suite = self.suiteClass(map(testCaseClass, testCaseNames)) 
         return suite
 
+    def loadTestsFromClassPath(
+        self,
+        module_name: str,
+        qualname: str,
+        method_names: list[str],
+    ) -> TestSuite:
+        """Import `module_name` and load the `method_names` tests of the
+        class at `qualname` in that module
+
+        This doesn't do any filtering, the names are expected to have come
+        from an already loaded suite (eg, from the parent process when
+        running with --jobs)
+
+        :param module_name: str, the full module path
+        :param qualname: str, the class's qualified name in the module
+        :param method_names: list[str], the test methods to load
+        """
+        testCaseClass = importlib.import_module(module_name)
+        for name in qualname.split("."):
+            testCaseClass = getattr(testCaseClass, name)
+
+        return self.suiteClass(map(testCaseClass, method_names))
+
     def getTestCaseNames(
         self,
         testCaseClass: type[TestCase],
@@ -205,19 +418,154 @@ class TestLoader(TestLoader):
                 testnames = super().getTestCaseNames(testCaseClass)
 
         if testnames:
-            if ignored := self.program.ignore_testpaths:
+            if matcher := self.program.ignore_matcher:
                 testnames = [
                     n for n in testnames
-                    if testpath(testCaseClass, n) not in ignored
+                    if not matcher.is_excluded(
+                        testCaseClass.__module__,
+                        testCaseClass.__qualname__,
+                        n,
+                    )
                 ]
 
         return testnames
 
 
+class RemoteTraceback(Exception):
+    """Holds an error that was already formatted in another process, see
+    `TestResult._exc_info_to_string`"""
+    def __init__(self, text, message=""):
+        """
+        :param text: str, the formatted error
+        :param message: str, the error's `<type>: <message>` line, see
+            `TestResult._get_error_message`
+        """
+        super().__init__(text)
+        self.message = message
+
+
+class Reporter(object):
+    """Writes the event of each test to `path` as soon as the test finishes,
+    nothing is kept in memory
+
+    The events are built by `TestResult`, each one has the testpath,
+    outcome, duration, message, traceback, stdout, and stderr of the test.
+    Child classes write each event in their format with `.write(event)`
+    """
+    def __init__(self, path):
+        self.path = path
+        self.fp = None
+
+    def open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.fp = open(self.path, mode="wb")
+
+    def close(self):
+        if self.fp:
+            self.fp.close()
+            self.fp = None
+
+
+class JSONLinesReporter(Reporter):
+    """Writes each test as a line of json, every line is flushed so the file
+    is always readable even if the run is killed
+
+    https://jsonlines.org/
+    """
+    def write(self, event):
+        self.fp.write(json.dumps(event).encode("utf-8") + b"\n")
+        self.fp.flush()
+
+
+class JUnitXMLReporter(Reporter):
+    """Writes each test to `path` as a JUnit XML testcase as soon as the test
+    finishes
+
+    The closing tags are written after every test and then overwritten by
+    the next test, so the file is always a valid document even if the run is
+    killed
+
+    https://github.com/testmoapp/junitxml
+    """
+    tail = b"</testsuite>\n</testsuites>\n"
+
+    def open(self):
+        super().open()
+        self.write_element(
+            "<?xml version=\"1.0\" encoding=\"utf-8\"?>\n<testsuites>\n"
+            "<testsuite name=\"{}\" timestamp=\"{}\">\n".format(
+                modname(),
+                time.strftime("%Y-%m-%dT%H:%M:%S"),
+            )
+        )
+
+    def write_element(self, element):
+        self.fp.write(element.encode("utf-8") + self.tail)
+        self.fp.flush()
+        self.fp.seek(-len(self.tail), os.SEEK_CUR)
+
+    def get_text(self, text):
+        # control characters (eg, terminal colors) aren't allowed in XML
+        return re.sub(r"[\x00-\x08\x0b\x0c\x0e-\x1f]", "", text)
+
+    def write(self, event):
+        classname, _, name = event["testpath"].rpartition(".")
+        lines = [
+            "<testcase classname={} name={} time=\"{:.6f}\">".format(
+                quoteattr(classname),
+                quoteattr(name),
+                event["duration"] or 0.0,
+            ),
+        ]
+
+        tag = {
+            "failure": "failure",
+            "unexpected_success": "failure",
+            "error": "error",
+            "skip": "skipped",
+        }.get(event["outcome"], "")
+        if tag:
+            lines.append("<{} message={}>{}</{}>".format(
+                tag,
+                quoteattr(self.get_text(event["message"])),
+                escape(self.get_text(event["traceback"])),
+                tag,
+            ))
+
+        for key in ["stdout", "stderr"]:
+            if event[key]:
+                lines.append("<system-{}>{}</system-{}>".format(
+                    key[3:],
+                    escape(self.get_text(event[key])),
+                    key[3:],
+                ))
+
+        lines.append("</testcase>\n")
+        self.write_element("\n".join(lines))
+
+
 class TestResult(TextTestResult):
     """
     https://github.com/python/cpython/blob/3.7/Lib/unittest/result.py
     """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.collectedMemory = []
+        """(testpath, peak traced memory, RSS growth) of each test, see
+        MemoryTracker"""
+
+        self.reporters = []
+        """Each test's event is written to these as soon as the test
+        finishes, see JSONLinesReporter"""
+
+        self._pyt_event = None
+
+    def _exc_info_to_string(self, err, test):
+        if isinstance(err[1], RemoteTraceback):
+            return str(err[1])
+        return super()._exc_info_to_string(err, test)
+
     def _show_status(self, status):
         if pyt_start := getattr(self, "_pyt_start", None):
             pyt_stop = time.time()
@@ -227,6 +575,10 @@ class TestResult(TextTestResult):
                     round(pyt_stop - pyt_start, 2)
                 )
             )
+            # the status finished the test's line, so a test that is skipped
+            # without being started (eg, @skip on its class) or a fixture
+            # that raised SkipTest gets its own line with its description
+            self._newline = True
 
     def startTest(self, test):
         if self.showAll:
@@ -238,6 +590,205 @@ class TestResult(TextTestResult):
             self.stream.flush()
         super().startTest(test)
 
+        # the test's own output isn't captured so the test's name has to be
+        # written before the test runs
+        if self.showAll and not self.buffer:
+            self._wait_stream()
+
+        if watchdog := getattr(self, "watchdog", None):
+            watchdog.start_test(test)
+
+        if memory := getattr(self, "memory", None):
+            memory.start_test(test)
+
+        if profiler := getattr(self, "profiler", None):
+            profiler.start_test(test)
+
+        if sampler := getattr(self, "sampler", None):
+            sampler.test = testpath(test)
+
+        if self.reporters:
+            self._pyt_event = self._create_event(test)
+
+    def stopTest(self, test):
+        if sampler := getattr(self, "sampler", None):
+            sampler.test = ""
+
+        if event := self._pyt_event:
+            self._pyt_event = None
+            if event["duration"] is None:
+                event["duration"] = time.perf_counter() - event.pop("start")
+
+            else:
+                event.pop("start")
+
+            # the buffers are cleared when the output is restored
+            if self.buffer and self._stdout_buffer is not None:
+                event["stdout"] = self._stdout_buffer.getvalue()
+                event["stderr"] = self._stderr_buffer.getvalue()
+
+            self._write_event(event)
+
+        if profiler := getattr(self, "profiler", None):
+            profiler.stop_test(test)
+
+        if memory := getattr(self, "memory", None):
+            self.addMemory(test, *memory.stop_test(test))
+
+        if watchdog := getattr(self, "watchdog", None):
+            watchdog.stop_test(test)
+
+        super().stopTest(test)
+
+        if progress := getattr(self, "progress", None):
+            progress.add(
+                test,
+                self.testsRun,
+                len(self.errors) + len(self.failures),
+            )
+
+    def startTestRun(self):
+        super().startTestRun()
+
+        for reporter in self.reporters:
+            reporter.open()
+
+        if profiler := getattr(self, "profiler", None):
+            profiler.start()
+
+        if sampler := getattr(self, "sampler", None):
+            sampler.phase = "run"
+
+    def stopTestRun(self):
+        if watchdog := getattr(self, "watchdog", None):
+            watchdog.stop()
+
+        if memory := getattr(self, "memory", None):
+            memory.stop()
+
+        if profiler := getattr(self, "profiler", None):
+            profiler.stop()
+
+        for reporter in self.reporters:
+            reporter.close()
+
+        super().stopTestRun()
+
+    def printErrors(self):
+        if progress := getattr(self, "progress", None):
+            progress.finish()
+            # the errors and failures were written in full when they happened
+            if self.unexpectedSuccesses:
+                self.stream.writeln(self.separator1)
+                for test in self.unexpectedSuccesses:
+                    self.stream.writeln("UNEXPECTED SUCCESS: {}".format(
+                        self.getDescription(test),
+                    ))
+                self.stream.flush()
+
+        else:
+            super().printErrors()
+
+    def _write_progress_error(self, flavour, error):
+        """In --progress mode errors and failures are written in full as soon
+        as they happen, above the progress line"""
+        if progress := getattr(self, "progress", None):
+            progress.clear()
+            self.printErrorList(flavour, [error])
+            progress.draw()
+
+    def _wait_stream(self):
+        """Block until everything written to the stream has been written,
+        see AsyncStream"""
+        if wait := getattr(self.stream, "wait", None):
+            wait()
+
+    def _get_error_message(self, err) -> str:
+        """Get the `<type>: <message>` line of err
+
+        :param err: tuple, the (type, value, traceback) of the error
+        """
+        if isinstance(err[1], RemoteTraceback):
+            return err[1].message
+
+        name = type(err[1]).__name__
+        if message := str(err[1]):
+            return "{}: {}".format(name, message)
+
+        return name
+
+    def _create_event(self, test) -> dict:
+        return {
+            "testpath": testpath(test),
+            "outcome": "success",
+            "duration": None,
+            "message": "",
+            "traceback": "",
+            "stdout": "",
+            "stderr": "",
+            "start": time.perf_counter(),
+        }
+
+    def _write_event(self, event):
+        for reporter in self.reporters:
+            try:
+                reporter.write(event)
+
+            except (OSError, ValueError) as e:
+                logger.warning("Could not report {}: {}".format(
+                    event["testpath"],
+                    e,
+                ))
+
+    def _report(self, test, outcome, message="", traceback=""):
+        """Set the outcome of test in the event that will be reported when it
+        stops
+
+        :param test: TestCase, errors in class and module fixtures aren't
+            part of a started test so they are reported right away
+        :param outcome: str, the same outcomes TestHistory uses
+        :param message: str, eg, the skip reason or the error's message (see
+            `._get_error_message`)
+        :param traceback: str, the formatted error
+        """
+        if not self.reporters:
+            return
+
+        event = self._pyt_event
+        if event is None or event["testpath"] != testpath(test):
+            event = self._create_event(test)
+            event["duration"] = 0.0
+            event["outcome"] = outcome
+
+        # a failure is kept even if the test has other outcomes (eg, a
+        # subtest failed and the test succeeded) unless there is an error
+        elif (
+            event["outcome"] not in set(["error", "failure"])
+            or outcome == "error"
+        ):
+            event["outcome"] = outcome
+
+        if message:
+            event["message"] = message
+
+        if traceback:
+            event["traceback"] = "\n".join(
+                filter(None, [event["traceback"], traceback])
+            )
+
+        if event is not self._pyt_event:
+            event.pop("start")
+            self._write_event(event)
+
+    def addMemory(self, test, peak, rss):
+        """Called when a test finishes with how much memory it used
+
+        :param test: TestCase
+        :param peak: int, the peak memory the test allocated in bytes
+        :param rss: int, how much the process's max RSS grew in bytes
+        """
+        self.collectedMemory.append((testpath(test), peak, rss))
+
     def addSuccess(self, test):
         orig_show_all = self.showAll
         if self.showAll:
@@ -245,6 +796,7 @@ class TestResult(TextTestResult):
             self.showAll = False
         super().addSuccess(test)
         self.showAll = orig_show_all
+        self._report(test, "success")
 
     def addError(self, test, err):
         orig_show_all = self.showAll
@@ -252,6 +804,14 @@ class TestResult(TextTestResult):
             self._show_status("ERROR")
         super().addError(test, err)
         self.showAll = orig_show_all
+        self._write_progress_error("ERROR", self.errors[-1])
+        self._wait_stream()
+        self._report(
+            test,
+            "error",
+            self._get_error_message(err),
+            self.errors[-1][1],
+        )
 
     def addFailure(self, test, err):
         orig_show_all = self.showAll
@@ -259,6 +819,14 @@ class TestResult(TextTestResult):
             self._show_status("FAIL")
         super().addFailure(test, err)
         self.showAll = orig_show_all
+        self._write_progress_error("FAIL", self.failures[-1])
+        self._wait_stream()
+        self._report(
+            test,
+            "failure",
+            self._get_error_message(err),
+            self.failures[-1][1],
+        )
 
     def addExpectedFailure(self, test, err):
         orig_show_all = self.showAll
@@ -266,6 +834,12 @@ class TestResult(TextTestResult):
             self._show_status("expected failure")
         super().addExpectedFailure(test, err)
         self.showAll = orig_show_all
+        self._report(
+            test,
+            "expected_failure",
+            self._get_error_message(err),
+            self.expectedFailures[-1][1],
+        )
 
     def addUnexpectedSuccess(self, test):
         orig_show_all = self.showAll
@@ -273,6 +847,39 @@ class TestResult(TextTestResult):
             self._show_status("unexpected success")
         super().addUnexpectedSuccess(test)
         self.showAll = orig_show_all
+        self._report(test, "unexpected_success", "unexpected success")
+
+    def addSkip(self, test, reason):
+        super().addSkip(test, reason)
+        self._report(test, "skip", reason)
+
+    def addSubTest(self, test, subtest, err):
+        super().addSubTest(test, subtest, err)
+        if err is not None:
+            if issubclass(err[0], test.failureException):
+                self._write_progress_error("FAIL", self.failures[-1])
+                self._report(
+                    test,
+                    "failure",
+                    self._get_error_message(err),
+                    self.failures[-1][1],
+                )
+
+            else:
+                self._write_progress_error("ERROR", self.errors[-1])
+                self._report(
+                    test,
+                    "error",
+                    self._get_error_message(err),
+                    self.errors[-1][1],
+                )
+
+    def addDuration(self, test, elapsed):
+        if hasattr(super(), "addDuration"):
+            super().addDuration(test, elapsed)
+
+        if (event := self._pyt_event) and event["testpath"] == testpath(test):
+            event["duration"] = elapsed
 
     def _setupStdout(self):
         super()._setupStdout()
@@ -281,28 +888,31 @@ class TestResult(TextTestResult):
             # code in the previous version, turns out by default buffer didn't
             # remove logs when logging had already been messed with, so now I
             # mess with the loggers and buffer them
-            for r in loghandler_members():
-                ohs = [
-                    (self._original_stdout, self._stdout_buffer),
-                    (self._original_stderr, self._stderr_buffer)
-                ]
-                for oh in ohs:
-                    if r.member is oh[0]:
-                        setattr(r.handler, r.member_name, oh[1])
+            if not getattr(self, "_pyt_streams", None):
+                self._pyt_streams = LogHandlerStreams(
+                    self._original_stdout,
+                    self._original_stderr,
+                )
+
+            self._pyt_swapped = self._pyt_streams.swap(
+                self._get_stream_replacements(),
+            )
 
     def _restoreStdout(self):
-        if self.buffer:
-            for r in loghandler_members():
-                ohs = [
-                    (self._original_stdout, self._stdout_buffer),
-                    (self._original_stderr, self._stderr_buffer)
-                ]
-                for oh in ohs:
-                    if r.member is oh[1]:
-                        setattr(r.handler, r.member_name, oh[0])
+        if self.buffer and getattr(self, "_pyt_streams", None):
+            self._pyt_streams.restore(
+                self._pyt_swapped,
+                self._get_stream_replacements(),
+            )
 
         super()._restoreStdout()
 
+    def _get_stream_replacements(self):
+        return [
+            (self._original_stdout, self._stdout_buffer),
+            (self._original_stderr, self._stderr_buffer)
+        ]
+
 
 class TestRunner(TextTestRunner):
     """
@@ -314,8 +924,48 @@ class TestRunner(TextTestRunner):
     def _makeResult(self):
         result = super()._makeResult()
         result.program = self.program
+        result.watchdog = Watchdog(getattr(self.program, "timeout", 0))
+        if getattr(self.program, "memory", 0):
+            result.memory = MemoryTracker()
+
+        if (directory := getattr(self.program, "profile", None)) is not None:
+            result.profiler = Profiler(directory)
+
+        result.sampler = getattr(self.program, "sampler", None)
+
+        if path := getattr(self.program, "jsonl", None):
+            result.reporters.append(JSONLinesReporter(path))
+
+        if path := getattr(self.program, "junit_xml", None):
+            result.reporters.append(JUnitXMLReporter(path))
+
+        # the cached tests count as tests that ran
+        if cache := getattr(self.program, "result_cache", None):
+            result.testsRun = len(cache.cached)
+
+        if getattr(self.program, "progress", False):
+            # the progress line replaces the dots and the verbose lines
+            result.dots = False
+            result.showAll = False
+            result.progress = Progress(
+                self.stream,
+                self.program.environ.test_count,
+                self._get_durations(),
+                result.testsRun,
+            )
+
         return result
 
+    def _get_durations(self) -> dict[str, float]:
+        """Get how long each test that is about to run took in earlier runs,
+        see TestHistory.get_durations"""
+        try:
+            return TestHistory().get_durations(self.test.get_testpaths())
+
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("Could not read test history: {}".format(e))
+            return {}
+
     def _get_line_number(self, testcase: TestCase, failure: str) -> int:
         """Get the line number where the test failed"""
 
@@ -332,34 +982,193 @@ class TestRunner(TextTestRunner):
 
         return 0
 
+    def _get_rollup(
+        self,
+        test_cases: list[TestCase],
+        result: TestResult,
+    ) -> dict:
+        """Roll the test durations up into a package -> module -> class tree
+
+        Every duration is added to each level above its test in one pass, so
+        this is linear in the number of tests
+
+        :returns: the root node, every node has a `count` of tests, their
+            total `duration`, and `children` nodes keyed by the full name of
+            the package, module, or class
+        """
+        classes = {
+            testpath(tc): (type(tc).__module__, classpath(tc))
+            for tc in test_cases
+        }
+
+        root = {"count": 0, "duration": 0.0, "children": {}}
+        for tn, duration in result.collectedDurations:
+            try:
+                module_name, class_name = classes[get_testcase_name(tn)[1]]
+
+            except (ValueError, KeyError):
+                continue
+
+            parts = module_name.split(".")
+            keys = [".".join(parts[:i]) for i in range(1, len(parts) + 1)]
+            keys.append(class_name)
+
+            node = root
+            node["count"] += 1
+            node["duration"] += duration
+            for key in keys:
+                node = node["children"].setdefault(
+                    key,
+                    {"count": 0, "duration": 0.0, "children": {}},
+                )
+                node["count"] += 1
+                node["duration"] += duration
+
+        return root
+
+    def _write_rollup(self, node, parent_name="", depth=0):
+        """Write the tree from `._get_rollup`, a node with only one child has
+        the same totals as its child so only the child is written"""
+        for name, child in node["children"].items():
+            if len(child["children"]) == 1:
+                self._write_rollup(child, parent_name, depth)
+
+            else:
+                tc, td = child["count"], child["duration"]
+                v = "tests" if tc > 1 else "test"
+                if parent_name:
+                    name = name[len(parent_name) + 1:]
+
+                self.stream.writeln(
+                    f"{'  ' * depth}* {name} - {tc} {v} in {td:.3f}s",
+                )
+                self._write_rollup(
+                    child,
+                    ".".join(filter(None, [parent_name, name])),
+                    depth + 1,
+                )
+
+    def _get_memory(self, result):
+        """Get the tests that used the most memory, see --memory
+
+        :returns: list[tuple], the (testpath, peak, rss) of the top tests
+        """
+        consumers = []
+        if (top := getattr(self.program, "memory", 0)) > 0:
+            consumers = sorted(
+                result.collectedMemory,
+                key=lambda m: (m[1], m[2]),
+                reverse=True,
+            )[:top]
+
+        return consumers
+
+    def _write_memory(self, result):
+        """Write the tests from `._get_memory` in the same format as
+        `._write_rollup`"""
+        if consumers := self._get_memory(result):
+            self.stream.writeln(f"Top {len(consumers)} memory consumers:")
+            for tp, peak, rss in consumers:
+                self.stream.writeln(
+                    f"* {tp} - {format_bytes(peak)} peak,"
+                    f" {format_bytes(rss)} RSS growth",
+                )
+
     def run(self, test):
         # this will be used to set the TestProgram instance into TestResult
         self.program = test.program
+        self.test = test
 
         test_cases = []
         if self.verbosity > 1:
             test_cases = list(test.get_testcases())
 
-        result = super().run(test)
+        jobs = getattr(self.program, "jobs", 1)
+        fork = getattr(self.program, "forkserver", False)
+        if jobs != 1 or fork:
+            from .parallel import ParallelTestSuite # avoid circular dependency
+            result = super().run(
+                ParallelTestSuite(
+                    test,
+                    jobs,
+                    warnings=self.warnings,
+                    fork=fork,
+                ),
+            )
+
+        else:
+            # the results are written by another thread so the tests never
+            # wait on the stream, this isn't done with workers since the
+            # tests already run in other processes and forking a process
+            # that has other threads isn't safe
+            stream = self.stream
+            self.stream = AsyncStream(stream)
+            try:
+                result = super().run(test)
+
+            finally:
+                self.stream.close()
+                self.stream = stream
+
+        if getattr(self.program, "history", True):
+            try:
+                TestHistory().add_result(result)
+
+            except (sqlite3.Error, OSError) as e:
+                logger.warning("Could not record test history: {}".format(e))
+
+        if cache := getattr(self.program, "result_cache", None):
+            try:
+                cache.add_result(result)
+
+            except (sqlite3.Error, OSError) as e:
+                logger.warning("Could not cache test results: {}".format(e))
+
+            if cache.cached:
+                self.stream.writeln(
+                    "{} cached tests passed in an earlier run".format(
+                        len(cache.cached),
+                    )
+                )
+
+        if sampler := getattr(self.program, "sampler", None):
+            sampler.stop()
+            try:
+                self.stream.writeln(
+                    "Sampled {} stacks, the collapsed stacks are in {}".format(
+                        sampler.write(),
+                        sampler.path,
+                    )
+                )
+
+            except OSError as e:
+                logger.warning("Could not write the sampled stacks: {}".format(
+                    e,
+                ))
+
+        if profiler := getattr(result, "profiler", None):
+            self.stream.writeln(
+                "Profiled {} tests, the stats are in {}".format(
+                    profiler.profiled,
+                    profiler.directory,
+                )
+            )
 
+        rollup = False
         if self.verbosity > 1:
             total_count = test.countTestCases()
+            if cache:
+                # the cached tests were filtered out of the suite but they
+                # count as tests that ran
+                total_count += len(cache.cached)
 
             if len(test_cases) > 1:
-                t_names = {
-                    classpath(tc): [0, 0.0]
-                    for tc in test_cases
-                }
-                class_type = "classes"
-
-                if len(t_names) > 30:
-                    t_names = {
-                        tc.__class__.__module__: [0, 0.0]
-                        for tc in test_cases
-                    }
-                    class_type = "modules"
-
-                if len(t_names) > 1:
+                class_count = len(set(classpath(tc) for tc in test_cases))
+                module_count = len(set(
+                    type(tc).__module__ for tc in test_cases
+                ))
+
+                if class_count > 1:
                     # print out how many ran to total tests
                     # https://github.com/Jaymon/pyt/issues/48
                     ran_count = result.testsRun
@@ -367,24 +1176,21 @@ class TestRunner(TextTestRunner):
                     self.stream.writeln("")
                     self.stream.writeln(
                         f"Ran {ran_count}/{total_count} tests"
-                        f" across {len(t_names)} {class_type}:",
+                        f" across {class_count} classes"
+                        f" in {module_count}"
+                        f" {'modules' if module_count > 1 else 'module'}:",
                     )
-
-                    for tn, duration in result.collectedDurations:
-                        for tc_name in t_names.keys():
-                            if tc_name in tn:
-                                t_names[tc_name][0] += 1
-                                t_names[tc_name][1] += duration
-
-                    for tc_name, tc_count in t_names.items():
-                        tc, td = tc_count
-                        v = "tests" if tc > 1 else "test"
-                        self.stream.writeln(
-                            f"* {tc_name} - {tc} {v} in {td:.3f}s",
-                        )
-
+                    self._write_rollup(self._get_rollup(test_cases, result))
+                    self._write_memory(result)
                     self.stream.writeln("")
+                    rollup = True
+
+        if not rollup and self._get_memory(result):
+            self.stream.writeln("")
+            self._write_memory(result)
+            self.stream.writeln("")
 
+        if self.verbosity > 1:
             if len(result.errors) or len(result.failures):
                 with RerunFile() as fp:
                     count = len(result.errors) + len(result.failures)
@@ -392,10 +1198,13 @@ class TestRunner(TextTestRunner):
                         f"Failed or errored {count}/{total_count} tests:"
                     )
 
+                    rerun = set()
                     for testcase, failure in itertools.chain(
                         result.errors,
                         result.failures,
                     ):
+                        # subtests are listed as the test they are part of
+                        testcase = getattr(testcase, "test_case", testcase)
                         tp = testpath(testcase)
                         if ln := self._get_line_number(testcase, failure):
                             self.stream.writeln(f"* {tp} on line {ln}")
@@ -403,7 +1212,9 @@ class TestRunner(TextTestRunner):
                         else:
                             self.stream.writeln(f"* {tp}")
 
-                        fp.writeln(tp)
+                        if tp not in rerun:
+                            rerun.add(tp)
+                            fp.writeln(tp)
 
                 self.stream.writeln("")
 
@@ -500,6 +1311,18 @@ class TestProgram(TestProgram):
         """Ideally we would put a lot of this configuration in .parseArgs but
         that method calls this method or `._do_discovery`, which then calls
         this method"""
+        if (
+            self.sample_profile is not None
+            and not self.list_found_tests
+            and not getattr(self, "sampler", None)
+        ):
+            # everything from here on is sampled, including finding and
+            # importing the tests, --list doesn't run anything so it isn't
+            # sampled
+            self.sampler = Sampler(self.sample_profile)
+            self.sampler.clear()
+            self.sampler.start()
+
         if not from_discovery:
             if self.rerun_failed_tests:
                 if (
@@ -516,22 +1339,57 @@ class TestProgram(TestProgram):
                 else:
                     self.testNames = list(RerunFile())
 
+            if self.changed or self.changed_files:
+                if (
+                    self.testNames
+                    and (
+                        len(self.testNames) > 1
+                        or self.testNames[0] != ""
+                    )
+                ):
+                    raise ValueError(
+                        "Changed flag passed in with tests arguments",
+                    )
+
+                graph = ImportGraph(self.testLoader._top_level_dir or "")
+                paths = list(self.changed_files)
+                if self.changed:
+                    try:
+                        paths.extend(graph.get_changed_paths(self.changed))
+
+                    except ValueError as e:
+                        # not a git repo or the ref doesn't exist
+                        self._main_parser.error(str(e))
+
+                self.testNames = graph.get_test_paths(paths)
+                if not self.testNames:
+                    logger.warning("No test modules import the changed files")
+
+            # these are imported before any tests are loaded so, in fork
+            # server mode, every forked process gets them for free
+            for module_name in self.preload:
+                logger.debug("Preloading module {}".format(module_name))
+                try:
+                    importlib.import_module(module_name)
+
+                except ImportError as e:
+                    self._main_parser.error(
+                        f"Could not preload {module_name}: {e}"
+                    )
+
             # if the --prefix flag was used on the command line then ignore the
             # environment prefixes
             if not self.prefixes:
                 self.prefixes = self.environ.get_prefixes()
 
-            self.ignore_testpaths = None
+            # the ignored tests are matched while the tests are found so
+            # ignored modules are never even imported
+            self.ignore_matcher = None
             if self.ignore_tests:
-                if Loader is None:
-                    Loader = type(self.testLoader)
-
-                loader = Loader()
-                loader.program = self
-                self.ignore_testpaths = set(
-                    loader.loadTestsFromNames(
-                        _convert_names(self.ignore_tests),
-                    ).get_testpaths(),
+                self.ignore_matcher = TestMatcher(
+                    _convert_names(self.ignore_tests),
+                    basedir=self.testLoader._top_level_dir or "",
+                    method_prefix=self.testLoader.testMethodPrefix,
                 )
 
         # `.testLoader` is used to load the tests and .test is set in parent's 
@@ -541,6 +1399,38 @@ class TestProgram(TestProgram):
             Loader=Loader,
         )
 
+        if self.shard:
+            index, count = self.shard
+            try:
+                durations = TestHistory().get_durations()
+
+            except (sqlite3.Error, OSError) as e:
+                # every shard has to use the same durations or the shards
+                # won't split the tests the same way
+                logger.warning(
+                    "Could not read test history, sharding by test count,"
+                    " every shard should do the same: {}".format(e)
+                )
+                durations = {}
+
+            self.test = self.test.shard(index, count, durations)
+            self.environ.update_env_for_test(self.test.countTestCases())
+
+        self.result_cache = None
+        if self.cache_results:
+            try:
+                result_cache = ResultCache(
+                    self.testLoader._top_level_dir or "",
+                )
+                self.test = result_cache.filter(self.test)
+                self.result_cache = result_cache
+
+            except (sqlite3.Error, OSError) as e:
+                logger.warning(
+                    "Could not read cached test results, running every"
+                    " test: {}".format(e)
+                )
+
     def _getParentArgParser(self) -> argparse.ArgumentParser:
         """Get the argument parser and add any custom flags
 
@@ -606,8 +1496,211 @@ class TestProgram(TestProgram):
             help="Invert the match and don't run those tests",
         )
 
+        parser.add_argument(
+            "--jobs", "-j",
+            dest="jobs",
+            type=int,
+            default=1,
+            metavar="N",
+            help="Run the tests across N processes, 0 uses every cpu",
+        )
+
+        parser.add_argument(
+            "--daemon",
+            dest="daemon",
+            action="store_true",
+            help=(
+                "Load the tests and wait for other pyt commands in this"
+                " directory to run them in a forked process"
+            ),
+        )
+
+        parser.add_argument(
+            "--no-daemon",
+            dest="no_daemon",
+            action="store_true",
+            help="Don't send this command to a running daemon",
+        )
+
+        parser.add_argument(
+            "--forkserver",
+            dest="forkserver",
+            action="store_true",
+            help=(
+                "Import everything once and then fork a new process to run"
+                " each test module"
+            ),
+        )
+
+        parser.add_argument(
+            "--preload",
+            dest="preload",
+            action="append",
+            default=[],
+            metavar="MODULE",
+            help="Import MODULE before loading the tests",
+        )
+
+        parser.add_argument(
+            "--changed",
+            dest="changed",
+            nargs="?",
+            const="HEAD",
+            default=None,
+            metavar="REF",
+            help=(
+                "Only run the test modules that import files changed since"
+                " git REF (defaults to uncommitted changes)"
+            ),
+        )
+
+        parser.add_argument(
+            "--changed-file",
+            dest="changed_files",
+            action="append",
+            default=[],
+            metavar="PATH",
+            help="Only run the test modules that import PATH",
+        )
+
+        parser.add_argument(
+            "--shard",
+            dest="shard",
+            type=self._parse_shard,
+            default=None,
+            metavar="I/N",
+            help=(
+                "Split the tests into N shards and only run shard I"
+                " (1 to N), shards are balanced using the test history"
+            ),
+        )
+
+        parser.add_argument(
+            "--watch",
+            dest="watch",
+            action="store_true",
+            help=(
+                "Keep running and rerun the tests affected by every change to"
+                " the project's python files"
+            ),
+        )
+
+        parser.add_argument(
+            "--timeout",
+            dest="timeout",
+            type=float,
+            default=0.0,
+            metavar="SECONDS",
+            help=(
+                "Stop any test that runs longer than SECONDS and print the"
+                " stack of every thread"
+            ),
+        )
+
+        parser.add_argument(
+            "--memory",
+            dest="memory",
+            type=int,
+            nargs="?",
+            const=10,
+            default=0,
+            metavar="N",
+            help=(
+                "Measure the peak memory and RSS growth of every test and"
+                " print the N (default 10) tests that used the most"
+            ),
+        )
+
+        parser.add_argument(
+            "--profile",
+            dest="profile",
+            nargs="?",
+            const="",
+            default=None,
+            metavar="DIR",
+            help=(
+                "Profile every test with cProfile and save the stats of each"
+                " test, class, module, and the whole run in DIR (defaults to"
+                " .pyt/profile)"
+            ),
+        )
+
+        parser.add_argument(
+            "--sample-profile",
+            dest="sample_profile",
+            nargs="?",
+            const="",
+            default=None,
+            metavar="PATH",
+            help=(
+                "Sample the stacks of the whole run and write them to PATH"
+                " (defaults to .pyt/sample-profile.txt) in the collapsed"
+                " format flamegraph tools read"
+            ),
+        )
+
+        parser.add_argument(
+            "--junit-xml",
+            dest="junit_xml",
+            default=None,
+            metavar="PATH",
+            help="Write the result of every test to PATH as JUnit XML",
+        )
+
+        parser.add_argument(
+            "--jsonl",
+            dest="jsonl",
+            default=None,
+            metavar="PATH",
+            help="Write the result of every test to PATH as JSON Lines",
+        )
+
+        parser.add_argument(
+            "--progress",
+            dest="progress",
+            action="store_true",
+            help=(
+                "Instead of a line (or a dot) for every test, redraw one line"
+                " with the progress, failures, tests per second, and time left"
+            ),
+        )
+
+        parser.add_argument(
+            "--cache-results",
+            dest="cache_results",
+            action="store_true",
+            help=(
+                "Skip the tests that passed in an earlier run if their code"
+                " and the project code they import hasn't changed"
+            ),
+        )
+
+        parser.add_argument(
+            "--no-history",
+            dest="history",
+            action="store_false",
+            help="Don't record the test durations and outcomes of this run",
+        )
+
         return parser
 
+    def _parse_shard(self, value: str) -> tuple[int, int]:
+        """Parse the --shard flag's I/N value"""
+        try:
+            index, count = (int(v) for v in value.split("/"))
+
+        except ValueError:
+            raise argparse.ArgumentTypeError(
+                f"Shard should be formatted I/N, got: {value}"
+            )
+
+        if count < 1 or not (1 <= index <= count):
+            raise argparse.ArgumentTypeError(
+                f"Shard should be between 1/{count} and {count}/{count}"
+            )
+
+        return index, count
+
     def _getMainArgParser(
         self,
         parent: argparse.ArgumentParser,
@@ -637,6 +1730,18 @@ class TestProgram(TestProgram):
             if self.exit:
                 self._main_parser.exit()
 
+        elif self.daemon:
+            from .daemon import DaemonServer # avoid circular dependency
+            DaemonServer(self.testLoader._top_level_dir or "").serve(
+                self.testRunner().stream,
+            )
+
+        elif self.watch:
+            from .watcher import Watcher # avoid circular dependency
+            Watcher(self, self.testLoader._top_level_dir or "").watch(
+                self.testRunner().stream,
+            )
+
         else:
             return super().runTests()
 
@@ -104,3 +104,87 @@ def loghandler_members():
             for member_name, member in members:
                 yield Members(logger_name, handler, member_name, member)
 
+
+class LogHandlerStreams(object):
+    """Remembers which logging handler attributes point at the streams that
+    get buffered so they don't have to be found for every test
+
+    Finding them means calling `loghandler_members`, which inspects every
+    member of every handler, so that is only done again when the handlers of
+    any logger have changed
+    """
+    def __init__(self, *streams):
+        """
+        :param *streams: the streams (eg, sys.stdout) to look for
+        """
+        self.streams = streams
+        self.key = None
+        self.members = []
+
+    def get_key(self):
+        """This changes whenever a handler is added to, or removed from, any
+        logger
+
+        The key holds the handlers themselves, not their ids, since a removed
+        handler's id can be reused by the handler that replaced it
+        """
+        log_manager = logging.Logger.manager
+        return tuple(
+            handler
+            for logger in [log_manager.root, *log_manager.loggerDict.values()]
+            for handler in getattr(logger, "handlers", [])
+        )
+
+    def is_stale(self):
+        return self.key != self.get_key()
+
+    def scan(self):
+        """Find every handler attribute that points at one of the streams"""
+        self.members = [
+            (r.handler, r.member_name)
+            for r in loghandler_members()
+            if any(r.member is stream for stream in self.streams)
+        ]
+        self.key = self.get_key()
+
+    def swap(self, replacements):
+        """Point the handler attributes at replacement streams
+
+        :param replacements: list[tuple], (stream, replacement) tuples
+        :returns: list[tuple], the swapped (handler, member_name, stream,
+            replacement), pass this to `.restore`
+        """
+        if self.is_stale():
+            self.scan()
+
+        swapped = []
+        for handler, member_name in self.members:
+            member = getattr(handler, member_name, None)
+            for stream, replacement in replacements:
+                if member is stream:
+                    setattr(handler, member_name, replacement)
+                    swapped.append((handler, member_name, stream, replacement))
+                    break
+
+        return swapped
+
+    def restore(self, swapped, replacements):
+        """Undo a `.swap`
+
+        :param swapped: list[tuple], the return value of `.swap`
+        :param replacements: list[tuple], the value passed to `.swap`
+        """
+        if self.is_stale():
+            # handlers were created while the streams were swapped (eg, a test
+            # configured logging) and they could be holding a replacement so
+            # every handler has to be checked
+            streams = {id(r): s for s, r in replacements}
+            for r in loghandler_members():
+                if stream := streams.get(id(r.member), None):
+                    setattr(r.handler, r.member_name, stream)
+
+        else:
+            for handler, member_name, stream, replacement in swapped:
+                if getattr(handler, member_name, None) is replacement:
+                    setattr(handler, member_name, stream)
+
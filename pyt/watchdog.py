@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+import time
+import signal
+import logging
+import tempfile
+import threading
+import faulthandler
+
+from .compat import *
+
+
+logger = logging.getLogger(__name__)
+
+
+def timeout(seconds):
+    """Decorator that sets how many seconds a test method, or every test
+    method of a TestCase class, can run before it is stopped, this overrides
+    the --timeout flag
+
+    :Example:
+        @pyt.timeout(30)
+        def test_slow(self):
+            ...
+
+    :param seconds: float, 0 means the test can run forever
+    """
+    def decorator(o):
+        o.__pyt_timeout__ = seconds
+        return o
+    return decorator
+
+
+class TestTimeoutError(Exception):
+    """Raised in a test that ran longer than its timeout, the message has the
+    stack of every thread when the test timed out"""
+    pass
+
+
+class Watchdog(object):
+    """A thread that watches the running test and stops it if it runs longer
+    than its timeout
+
+    When a test times out the stack of every thread is dumped with
+    faulthandler and then `callback` is called, by default that interrupts
+    the thread running the test (by sending it SIGALRM) so TestTimeoutError is
+    raised in the test and it is reported as an error like any other
+    exception
+
+    https://docs.python.org/3/library/faulthandler.html
+    """
+    signum = getattr(signal, "SIGALRM", None)
+
+    def __init__(self, timeout=0.0, callback=None):
+        """
+        :param timeout: float, the default timeout of every test in seconds,
+            0 means tests without a @timeout can run forever
+        :param callback: Callable[[TestCase, str], None], called from the
+            watchdog thread with the test that timed out and the error
+            message
+        """
+        self.timeout = timeout
+        self.callback = callback or self.interrupt
+        self.condition = threading.Condition()
+        self.thread = None
+        self.stopped = False
+
+        self.test = None
+        self.seconds = 0.0
+        self.deadline = None
+        self.expired = None
+        self.message = ""
+        self.thread_id = None
+        self.handler = None
+
+    def get_timeout(self, test) -> float:
+        """Get the seconds test can run, set with the @timeout decorator on
+        the test method or its class, or the default timeout"""
+        method = getattr(test, getattr(test, "_testMethodName", ""), None)
+        for o in [method, type(test)]:
+            seconds = getattr(o, "__pyt_timeout__", None)
+            if seconds is not None:
+                return seconds
+
+        return self.timeout
+
+    def start_test(self, test):
+        if (seconds := self.get_timeout(test)) <= 0:
+            return
+
+        if not self.thread:
+            self.thread = threading.Thread(
+                target=self.run,
+                name="pyt-watchdog",
+                daemon=True,
+            )
+            self.thread.start()
+
+        if (
+            self.callback == self.interrupt
+            and self.handler is None
+            and self.signum
+            and threading.current_thread() is threading.main_thread()
+        ):
+            self.handler = signal.signal(self.signum, self.handle_signal)
+
+        with self.condition:
+            self.test = test
+            self.seconds = seconds
+            self.deadline = time.monotonic() + seconds
+            self.expired = None
+            self.thread_id = threading.get_ident()
+            self.condition.notify()
+
+    def stop_test(self, test):
+        with self.condition:
+            self.test = None
+            self.deadline = None
+            self.expired = None
+            self.condition.notify()
+
+    def stop(self):
+        """Stop the watchdog thread and restore the signal handler"""
+        if self.thread:
+            with self.condition:
+                self.stopped = True
+                self.condition.notify()
+
+            self.thread.join()
+            self.thread = None
+            self.stopped = False
+
+        if self.handler is not None:
+            signal.signal(self.signum, self.handler)
+            self.handler = None
+
+    def run(self):
+        with self.condition:
+            while not self.stopped:
+                if self.deadline is None:
+                    self.condition.wait()
+
+                elif (remaining := self.deadline - time.monotonic()) > 0:
+                    self.condition.wait(remaining)
+
+                else:
+                    test = self.test
+                    self.deadline = None
+                    self.expired = test
+                    self.message = "{} timed out after {}s\n\n{}".format(
+                        test,
+                        self.seconds,
+                        self.get_stacks(),
+                    )
+                    logger.debug("Test {} timed out".format(test))
+                    self.callback(test, self.message)
+
+    def get_stacks(self) -> str:
+        """Get the stack of every thread"""
+        # faulthandler needs a real file descriptor
+        with tempfile.TemporaryFile(mode="w+") as fp:
+            faulthandler.dump_traceback(fp, all_threads=True)
+            fp.seek(0)
+            return fp.read()
+
+    def interrupt(self, test, message):
+        """The default callback, this sends a signal to the thread running
+        the test, which interrupts anything it is blocked on"""
+        if self.handler is None:
+            logger.warning(message)
+            logger.warning(
+                "Could not interrupt {}, it isn't running in the main"
+                " thread".format(test)
+            )
+            return
+
+        signal.pthread_kill(self.thread_id, self.signum)
+
+    def handle_signal(self, signum, frame):
+        # if the test finished before the signal was handled then there is
+        # nothing to interrupt
+        if self.expired is not None and self.expired is self.test:
+            self.expired = None
+            raise TestTimeoutError(self.message)
+
+        if callable(self.handler):
+            self.handler(signum, frame)
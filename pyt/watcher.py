@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+import logging
+import unittest
+import importlib
+
+from .compat import *
+from .path import DirectorySnapshot, PathFinder, TestMatcher
+from .graph import ImportGraph
+from .utils import testpath
+
+
+logger = logging.getLogger(__name__)
+
+
+class Watcher(object):
+    """Runs the tests and then keeps running the tests affected by any change
+    to the project's python files until interrupted
+
+    The modules stay imported between runs, only the changed modules and the
+    modules that transitively import them are removed from sys.modules. The
+    tests aren't discovered again, the affected test modules are imported
+    again and their tests are swapped into the suite the program loaded, so
+    after the first run the time it takes to load the tests is mostly the
+    time it takes to import the changed files
+    """
+    interval = 0.5
+    """How many seconds to wait between checking the files"""
+
+    def __init__(self, program, basedir=""):
+        """
+        :param program: TestProgram, the program that found the tests
+        :param basedir: str, the project directory
+        """
+        self.program = program
+        self.basedir = os.path.abspath(basedir or os.getcwd())
+        self.stats = {}
+
+        self.test = None
+        """The suite with every selected test, see .set_tests"""
+
+        self.testpaths = set()
+        """The testpaths of every selected test"""
+
+        self.matcher = None
+        """Matches the program's names, None if every test is selected"""
+
+    def set_tests(self, test):
+        """Set the suite the program loaded, the tests of changed modules are
+        swapped into this suite
+
+        This has to be called before test runs since running a suite removes
+        its tests
+
+        :param test: TestSuite
+        """
+        program = self.program
+        self.test = test.filter(lambda t: True)
+        self.testpaths = set(test.get_testpaths())
+        if cache := getattr(program, "result_cache", None):
+            # the cached tests were filtered out but they were selected
+            self.testpaths.update(cache.cached)
+
+        self.matcher = None
+        if names := [name for name in program.testNames if name]:
+            self.matcher = TestMatcher(
+                names,
+                self.basedir,
+                program.testLoader.testMethodPrefix,
+            )
+
+    def is_selected(self, test):
+        """Return True if the program's names select test, tests added to a
+        changed module are selected if a name matches them"""
+        if self.matcher is None or testpath(test) in self.testpaths:
+            return True
+
+        c = type(test)
+        return self.matcher.is_excluded(
+            c.__module__,
+            c.__qualname__,
+            test._testMethodName,
+        )
+
+    def stat(self, path):
+        try:
+            st = os.stat(path)
+            return (st.st_mtime_ns, st.st_size)
+
+        except OSError:
+            return None
+
+    def get_stats(self):
+        """Get the stat of every python file in the project
+
+        :returns: dict[str, tuple[int, int]]
+        """
+        finder = PathFinder(self.basedir, snapshot=DirectorySnapshot())
+        ret = {}
+        for root, dirs, files in finder.walk(self.basedir):
+            for basename in files:
+                if basename.lower().endswith(".py"):
+                    path = os.path.join(root, basename)
+                    if st := self.stat(path):
+                        ret[path] = st
+
+        return ret
+
+    def get_changed(self):
+        """Find the files that were modified, added, or deleted since the
+        last time this was called
+
+        :returns: list[str], the changed paths
+        """
+        stats = self.get_stats()
+        ret = [
+            path for path in stats.keys() | self.stats.keys()
+            if stats.get(path) != self.stats.get(path)
+        ]
+        self.stats = stats
+        return sorted(ret)
+
+    def evict(self, paths):
+        """Remove the modules of paths from sys.modules so they will be
+        imported again
+
+        :param paths: set[str]
+        :returns: dict[str, str], the removed module names keyed by their
+            paths
+        """
+        ret = {}
+        for name, module in list(sys.modules.items()):
+            if (path := getattr(module, "__file__", None)) in paths:
+                logger.debug("Evicting changed module {}".format(name))
+                sys.modules.pop(name, None)
+                ret[path] = name
+
+        return ret
+
+    def get_tests(self, paths, module_names=None):
+        """Import the test modules in paths again and swap their tests into
+        .test, nothing is discovered again
+
+        A test of a changed module is kept if it was selected before or if
+        one of the program's names matches it, so tests that were added to
+        the changed files are picked up also
+
+        :param paths: set[str], the test module paths
+        :param module_names: dict[str, str], the module names of paths that
+            were imported before, see .evict
+        :returns: TestSuite, only the tests of the modules in paths
+        """
+        program = self.program
+        loader = program.testLoader
+        finder = PathFinder(self.basedir, snapshot=DirectorySnapshot())
+        module_names = {
+            path: (module_names or {}).get(path) or finder.module_path(path)
+            for path in paths
+        }
+        names = set(module_names.values())
+        test = self.test.filter(lambda t: type(t).__module__ not in names)
+        changed = loader.suiteClass()
+        changed.program = program
+
+        sys.path.insert(0, self.basedir)
+        try:
+            for path, module_name in sorted(module_names.items()):
+                try:
+                    logger.debug("Importing {} ({})".format(module_name, path))
+                    module = importlib.import_module(module_name)
+
+                except Exception as e:
+                    logger.warning("Could not import {}: {}".format(
+                        module_name,
+                        e,
+                    ))
+                    changed.addTest(unittest.loader._make_failed_import_test(
+                        module_name,
+                        loader.suiteClass,
+                    ))
+                    continue
+
+                # a module's suite also has the classes it imported
+                suite = loader.loadTestsFromModule(module).filter(
+                    lambda t: (
+                        type(t).__module__ == module.__name__
+                        and self.is_selected(t)
+                    )
+                )
+                if suite.countTestCases():
+                    suite.name = module.__name__
+                    self.testpaths.update(suite.get_testpaths())
+                    test.addTest(suite)
+                    # running a suite removes its tests so a copy is ran
+                    changed.addTest(suite.filter(lambda t: True))
+
+        finally:
+            sys.path.remove(self.basedir)
+
+        self.test = test
+        program.environ.update_env_for_test(changed.countTestCases())
+
+        if cache := getattr(program, "result_cache", None):
+            changed = cache.filter(changed)
+
+        return changed
+
+    def run_tests(self, test):
+        """Run test with the program's runner
+
+        :returns: unittest.TestResult
+        """
+        program = self.program
+        program.test = test
+        exit = program.exit
+        program.exit = False
+        try:
+            unittest.TestProgram.runTests(program)
+
+        finally:
+            program.exit = exit
+
+        return program.result
+
+    def rerun(self, changed):
+        """Run the tests affected by changed
+
+        :param changed: list[str], the changed paths
+        :returns: unittest.TestResult|None, None if no tests were affected
+        """
+        graph = ImportGraph(self.basedir)
+        dependents = graph.get_dependents(changed)
+        graph.save()
+
+        module_names = self.evict(dependents | set(changed))
+
+        paths = set(p for p in dependents if graph.is_test_path(p))
+        if not paths:
+            logger.warning("No test modules import the changed files")
+            return None
+
+        return self.run_tests(self.get_tests(paths, module_names))
+
+    def watch(self, stream=None):
+        """Run the tests and then rerun the affected tests every time the
+        project's files change, this only returns when interrupted
+
+        :param stream: io.IOBase, where to write the status messages
+        """
+        self.stats = self.get_stats()
+        self.set_tests(self.program.test)
+        self.run_tests(self.program.test)
+
+        try:
+            while True:
+                if stream:
+                    stream.writeln("")
+                    stream.writeln(
+                        "Watching {} files for changes".format(
+                            len(self.stats),
+                        )
+                    )
+                    stream.flush()
+
+                while not (changed := self.get_changed()):
+                    time.sleep(self.interval)
+
+                if stream:
+                    for path in changed:
+                        stream.writeln("Changed {}".format(
+                            os.path.relpath(path, self.basedir),
+                        ))
+
+                self.rerun(changed)
+
+        except KeyboardInterrupt:
+            pass
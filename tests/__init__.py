@@ -59,7 +59,19 @@ class TestModule(object):
         tl.program = testdata.mock(
             environ=TestEnviron(),
             prefixes=[],
-            ignore_testpaths=None,
+            ignore_matcher=None,
+            list_found_tests=False,
+            jobs=1,
+            forkserver=False,
+            history=False,
+            result_cache=None,
+            timeout=0,
+            memory=0,
+            profile=None,
+            sampler=None,
+            jsonl=None,
+            junit_xml=None,
+            progress=False,
         )
         return tl
     tl = loader
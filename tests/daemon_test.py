@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+import subprocess
+import importlib
+
+import testdata
+
+from pyt.daemon import DaemonServer, DaemonSocket
+from . import TestCase, TestModule
+
+
+class DaemonSocketTest(TestCase):
+    def test_basedir(self):
+        cachedir = testdata.create_dir()
+        basedir = testdata.create_dir()
+        other_basedir = testdata.create_dir()
+
+        environ = dict(os.environ)
+        os.environ["PYT_CACHE_DIR"] = cachedir
+        try:
+            path = DaemonSocket(basedir)
+            other_path = DaemonSocket(other_basedir)
+
+        finally:
+            os.environ.clear()
+            os.environ.update(environ)
+
+        self.assertNotEqual(path, other_path)
+        self.assertEqual(cachedir, os.path.dirname(path))
+        self.assertEqual(cachedir, os.path.dirname(other_path))
+
+
+class DaemonServerTest(TestCase):
+    def test_evict(self):
+        m = TestModule({
+            "dmod": [
+                "VALUE = 1",
+            ],
+            "dmod_test": [
+                "from dmod import VALUE",
+                "class DmodTest(TestCase):",
+                "    def test_value(self): pass",
+            ],
+            "dother": [
+                "VALUE = 2",
+            ],
+        }, name="")
+
+        sys.path.insert(0, m.cwd)
+        try:
+            for name in ["dmod", "dmod_test", "dother"]:
+                importlib.import_module(name)
+
+            s = DaemonServer(m.cwd)
+            s.snapshot()
+            self.assertEqual([], s.evict())
+
+            path = os.path.join(m.cwd, "dmod.py")
+            with open(path, "a") as fp:
+                fp.write("OTHER = 3\n")
+
+            evicted = s.evict()
+            self.assertEqual(set(["dmod", "dmod_test"]), set(evicted))
+            self.assertFalse("dmod_test" in sys.modules)
+            self.assertTrue("dother" in sys.modules)
+
+            s.warm(evicted)
+            self.assertEqual(3, sys.modules["dmod"].OTHER)
+            self.assertEqual([], s.evict())
+
+        finally:
+            sys.path.remove(m.cwd)
+            for name in ["dmod", "dmod_test", "dother"]:
+                sys.modules.pop(name, None)
+
+    def test_client(self):
+        m = TestModule(
+            "import os",
+            "",
+            "class DaemonTest(TestCase):",
+            "    def test_daemon(self):",
+            "        print('daemon run 1')",
+            "        print('parent', os.getppid())",
+        )
+
+        environ = dict(os.environ)
+        environ["PYTHONPATH"] = os.pathsep.join(sys.path)
+        daemon = subprocess.Popen(
+            [sys.executable, "-m", "pyt", "--daemon"],
+            cwd=m.cwd,
+            env=environ,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+        try:
+            socket_path = DaemonSocket(m.cwd)
+            for _ in range(100):
+                if os.path.exists(socket_path):
+                    break
+                time.sleep(0.05)
+
+            parent = "parent {}".format(daemon.pid)
+            r = m.client.run([m.name])
+            self.assertTrue("daemon run 1" in r)
+            self.assertTrue(parent in r)
+
+            with open(m.path, "r+") as fp:
+                body = fp.read().replace("daemon run 1", "daemon run 2")
+                fp.seek(0)
+                fp.write(body)
+
+            r = m.client.run([m.name])
+            self.assertTrue("daemon run 2" in r)
+            self.assertTrue(parent in r)
+
+            r = m.client.run(["--no-daemon", m.name])
+            self.assertTrue("daemon run 2" in r)
+            self.assertFalse(parent in r)
+
+        finally:
+            daemon.terminate()
+            daemon.wait()
+
+        self.assertFalse(os.path.exists(socket_path))
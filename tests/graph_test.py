@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import os
+import subprocess
+
+from pyt.graph import ImportGraph
+from . import TestCase, TestModule
+
+
+class ImportGraphTest(TestCase):
+    def create_module(self):
+        return TestModule({
+            "gproj": [
+                "from .models import Model",
+            ],
+            "gproj.models": [
+                "class Model(object): pass",
+            ],
+            "gproj.views": [
+                "from gproj import models",
+            ],
+            "gproj.utils": [
+                "def helper(): pass",
+            ],
+            "tests.models_test": [
+                "from gproj.models import Model",
+                "class ModelTest(TestCase):",
+                "    def test_model(self): pass",
+            ],
+            "tests.views_test": [
+                "from gproj import views",
+                "class ViewTest(TestCase):",
+                "    def test_view(self): pass",
+            ],
+            "tests.utils_test": [
+                "def test_utils():",
+                "    from gproj.utils import helper",
+                "class UtilsTest(TestCase):",
+                "    def test_utils(self): pass",
+            ],
+        }, name="")
+
+    def test_get_test_paths(self):
+        m = self.create_module()
+
+        # files modified too recently aren't cached
+        for root, dirs, files in os.walk(m.cwd):
+            for basename in files:
+                os.utime(
+                    os.path.join(root, basename),
+                    (1000000000, 1000000000),
+                )
+
+        g = ImportGraph(m.cwd)
+
+        def get_test_paths(*paths):
+            ret = g.get_test_paths(
+                [os.path.join(m.cwd, *p.split("/")) for p in paths]
+            )
+            return [os.path.relpath(p, m.cwd) for p in ret]
+
+        self.assertEqual(
+            ["tests/utils_test.py"],
+            get_test_paths("gproj/utils.py"),
+        )
+
+        # views imports models through gproj/__init__.py
+        self.assertEqual(
+            [
+                "tests/models_test.py",
+                "tests/utils_test.py",
+                "tests/views_test.py",
+            ],
+            get_test_paths("gproj/models.py"),
+        )
+
+        self.assertEqual(
+            ["tests/views_test.py"],
+            get_test_paths("gproj/views.py", "README.md"),
+        )
+
+        # a deleted module
+        self.assertEqual([], get_test_paths("gproj/deleted.py"))
+
+        # the graph was cached and a new graph only parses changed files
+        g2 = ImportGraph(m.cwd)
+        self.assertEqual(len(g.entries), len(g2.entries))
+        g2.update()
+        self.assertFalse(g2.dirty)
+
+    def test_cli(self):
+        m = self.create_module()
+        r = m.client.run([
+            "--changed-file", os.path.join("gproj", "views.py"),
+        ])
+        self.assertTrue("Ran 1 test" in r)
+
+        # git fails since this isn't a git repo yet
+        r = m.client.run(["--changed"], code=2)
+        self.assertTrue("Could not find changed files" in r)
+        self.assertFalse("Traceback" in r)
+
+        git = [
+            "git",
+            "-c", "user.name=pyt",
+            "-c", "user.email=pyt@example.com",
+        ]
+        for args in [["init", "-q"], ["add", "."], ["commit", "-qm", "init"]]:
+            subprocess.run(git + args, cwd=m.cwd, check=True)
+
+        r = m.client.run(["--changed"], code=5)
+        self.assertTrue("Ran 0 tests" in r)
+
+        with open(os.path.join(m.cwd, "gproj", "models.py"), "a") as fp:
+            fp.write("\nclass Other(object): pass\n")
+
+        r = m.client.run(["--changed", "-v"])
+        self.assertTrue("Ran 3/3 tests" in r)
+
+        r = m.client.run(["--changed", "nope-ref"], code=2)
+        self.assertFalse("Traceback" in r)
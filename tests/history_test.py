@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+import os
+import unittest
+
+import testdata
+
+from pyt.history import TestHistory, ResultCache
+from . import TestCase, TestModule
+
+
+class TestHistoryTest(TestCase):
+    def test_add_result(self):
+        m = TestModule(
+            "import time",
+            "",
+            "class HistoryTest(TestCase):",
+            "    def test_sleep(self):",
+            "        time.sleep(0.1)",
+            "",
+            "    def test_fail(self):",
+            "        self.assertEqual(1, 2)",
+            "",
+            "    def test_subtest(self):",
+            "        with self.subTest(i=1):",
+            "            raise ValueError()",
+            "",
+            "    def test_skip(self):",
+            "        self.skipTest('skip')",
+        )
+
+        m.client.run([m.name], code=1)
+
+        h = TestHistory(m.cwd)
+        durations = h.get_durations()
+        self.assertEqual(4, len(durations))
+        tp = "{}.HistoryTest.test_sleep".format(m.name)
+        self.assertLess(0.1, durations[tp])
+
+        conn = h.connect()
+        outcomes = dict(conn.execute("SELECT testpath, outcome FROM results"))
+        conn.close()
+        self.assertEqual("success", outcomes[tp])
+        self.assertEqual("failure", outcomes[tp.replace("sleep", "fail")])
+        self.assertEqual("error", outcomes[tp.replace("sleep", "subtest")])
+        self.assertEqual("skip", outcomes[tp.replace("sleep", "skip")])
+
+        self.assertEqual(
+            [tp],
+            list(h.get_durations([tp, "does.not.Exist.test_foo"]).keys()),
+        )
+
+    def test_keep(self):
+        m = TestModule(
+            "class KeepTest(TestCase):",
+            "    def test_keep(self):",
+            "        pass",
+        )
+
+        h = TestHistory(m.cwd)
+        h.keep = 2
+        for _ in range(3):
+            m.client.run([m.name])
+
+        m.client.run([m.name, "--no-history"])
+
+        conn = h.connect()
+        count = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        conn.close()
+        self.assertEqual(3, count)
+
+        h.add_result(m.run().result)
+        conn = h.connect()
+        count = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        conn.close()
+        self.assertEqual(2, count)
+
+
+class ResultCacheTest(TestCase):
+    def test_cache_results(self):
+        m = TestModule({
+            "cmod": [
+                "VALUE = 1",
+            ],
+            "cmod_test": [
+                "from cmod import VALUE",
+                "class CmodTest(TestCase):",
+                "    def test_value(self):",
+                "        print('ran test_value')",
+            ],
+            "cother_test": [
+                "class CotherTest(TestCase):",
+                "    def test_fail(self):",
+                "        print('ran test_fail')",
+                "        self.fail()",
+            ],
+        }, name="")
+
+        r = m.client.run(["--cache-results"], code=1)
+        self.assertTrue("ran test_value" in r)
+        self.assertTrue("ran test_fail" in r)
+
+        r = m.client.run(["--cache-results"], code=1)
+        self.assertFalse("ran test_value" in r)
+        self.assertTrue("ran test_fail" in r)
+        self.assertTrue("Ran 2 tests" in r)
+        self.assertTrue("1 cached test" in r)
+
+        # changing a module the test imports invalidates the cache
+        with open(os.path.join(m.cwd, "cmod.py"), "a") as fp:
+            fp.write("OTHER = 2\n")
+
+        r = m.client.run(["--cache-results"], code=1)
+        self.assertTrue("ran test_value" in r)
+
+        r = m.client.run(["--cache-results", "cmod_test"])
+        self.assertFalse("ran test_value" in r)
+        self.assertTrue("Ran 1 test" in r)
+
+    def test_cache_results_counts(self):
+        m = TestModule({
+            "ccount_test": [
+                "class CcountTest(TestCase):",
+                "    def test_1(self): pass",
+                "    def test_2(self): pass",
+                "",
+                "class FailTest(TestCase):",
+                "    def test_fail(self):",
+                "        self.fail()",
+                "",
+                "class ErrorTest(TestCase):",
+                "    def test_error(self):",
+                "        raise ValueError()",
+            ],
+        }, name="")
+
+        m.client.run(["--cache-results"], code=1)
+
+        r = m.client.run(["--cache-results", "-v"], code=1)
+        self.assertTrue("2 cached tests" in r)
+        self.assertTrue("Ran 4/4 tests" in r)
+        self.assertTrue("Failed or errored 2/4 tests" in r)
+
+    def test_cache_results_corrupt(self):
+        m = TestModule(
+            "class CcorruptTest(TestCase):",
+            "    def test_1(self): pass",
+            "    def test_2(self): pass",
+        )
+        testdata.create_file(
+            "this is not a database",
+            os.path.join(".pyt", "history.sqlite3"),
+            m.cwd,
+        )
+
+        r = m.client.run([m.name, "--cache-results"])
+        self.assertTrue("Ran 2 tests" in r)
+        self.assertTrue("Could not read cached test results" in r)
+        self.assertFalse("Traceback" in r)
+
+    def test_max_size(self):
+        c = ResultCache(testdata.create_dir())
+        c.max_size = 2
+        c.digests = {"a": "1", "b": "2", "c": "3"}
+        c.cached = ["a", "b", "c"]
+        c.add_result(unittest.TestResult())
+
+        conn = c.connect()
+        try:
+            self.assertEqual(
+                2,
+                conn.execute("SELECT COUNT(*) FROM cached").fetchone()[0],
+            )
+
+        finally:
+            conn.close()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+from pyt.history import TestHistory
+from pyt.memory import format_bytes
+from . import TestCase, TestModule
+
+
+class MemoryTest(TestCase):
+    def test_memory(self):
+        m = TestModule(
+            "class MemoryTest(TestCase):",
+            "    def test_big(self):",
+            "        b = bytearray(20 * 1024 * 1024)",
+            "",
+            "    def test_small(self):",
+            "        s = [1, 2, 3]",
+        )
+
+        r = m.client.run([m.name, "--memory", "1"])
+        self.assertTrue("Top 1 memory consumers" in r)
+        self.assertTrue("test_big" in r)
+        self.assertFalse("test_small" in r)
+
+        conn = TestHistory(m.cwd).connect()
+        memory = dict(
+            (tp.rsplit(".", 1)[1], peak) for tp, peak in conn.execute(
+                "SELECT testpath, peak_memory FROM results"
+            )
+        )
+        conn.close()
+        self.assertLess(20 * 1024 * 1024, memory["test_big"])
+        self.assertGreater(1024 * 1024, memory["test_small"])
+
+    def test_memory_jobs(self):
+        m = TestModule(
+            "class BigTest(TestCase):",
+            "    def test_big(self):",
+            "        b = bytearray(20 * 1024 * 1024)",
+            "",
+            "class SmallTest(TestCase):",
+            "    def test_small(self):",
+            "        pass",
+        )
+
+        r = m.client.run([m.name, "--memory", "--jobs", "2"])
+        self.assertTrue("Top 2 memory consumers" in r)
+        self.assertRegex(r, r"\.BigTest\.test_big - 20\.\dMB peak")
+
+    def test_memory_rollup(self):
+        m = TestModule(
+            "class BigTest(TestCase):",
+            "    def test_big(self):",
+            "        b = bytearray(20 * 1024 * 1024)",
+            "",
+            "class SmallTest(TestCase):",
+            "    def test_small(self):",
+            "        pass",
+        )
+
+        r = m.client.run([m.name, "--memory", "-v"])
+        lines = r.splitlines()
+        start = lines.index("Top 2 memory consumers:")
+        self.assertTrue(lines[start - 1].startswith("  * SmallTest - 1 test"))
+        self.assertTrue(lines[start + 1].startswith(
+            f"* {m.name}.BigTest.test_big - 20."
+        ))
+        self.assertTrue(lines[start + 2].startswith(
+            f"* {m.name}.SmallTest.test_small - "
+        ))
+
+    def test_format_bytes(self):
+        self.assertEqual("10B", format_bytes(10))
+        self.assertEqual("1.5KB", format_bytes(1536))
+        self.assertEqual("20.0MB", format_bytes(20 * 1024 * 1024))
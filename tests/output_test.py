@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+import time
+from io import StringIO
+from unittest.runner import _WritelnDecorator
+
+from pyt.output import AsyncStream, Progress
+from . import TestCase, TestModule
+
+
+class SlowStream(StringIO):
+    def __init__(self, delay=0.0):
+        super().__init__()
+        self.delay = delay
+        self.writes = 0
+
+    def write(self, s):
+        time.sleep(self.delay)
+        self.writes += 1
+        return super().write(s)
+
+
+class AsyncStreamTest(TestCase):
+    def test_order(self):
+        stream = SlowStream(0.01)
+        s = AsyncStream(stream)
+
+        start = time.time()
+        for i in range(100):
+            s.write(f"{i} ")
+        s.writeln()
+        # writing didn't wait on the slow stream
+        self.assertLess(time.time() - start, 0.5)
+
+        s.close()
+        self.assertEqual(
+            " ".join(str(i) for i in range(100)) + " \n",
+            stream.getvalue(),
+        )
+        # the writes were batched
+        self.assertLess(stream.writes, 100)
+        self.assertIsNone(s.thread)
+
+    def test_wait(self):
+        stream = SlowStream(0.1)
+        s = AsyncStream(stream)
+        s.write("foo")
+        s.wait()
+        self.assertEqual("foo", stream.getvalue())
+
+        s.writeln("bar")
+        s.close()
+        self.assertEqual("foobar\n", stream.getvalue())
+
+        # nothing was written so there is nothing to wait on
+        s = AsyncStream(stream)
+        s.wait()
+        s.close()
+        self.assertIsNone(s.thread)
+
+    def test_run_order(self):
+        m = TestModule(
+            "class OrderTest(TestCase):",
+            "    def test_1(self):",
+            "        print('in test_1')",
+            "",
+            "    def test_2(self):",
+            "        self.assertTrue(False)",
+            "",
+            "    def test_3(self):",
+            "        print('in test_3')",
+        )
+
+        r = m.client.run([m.name, "--verbose"], code=1)
+        self.assertLess(r.index("1/3 test_1"), r.index("in test_1"))
+        self.assertLess(r.index("in test_1"), r.index("2/3 test_2"))
+        self.assertLess(r.index("2/3 test_2"), r.index("3/3 test_3"))
+        self.assertLess(r.index("3/3 test_3"), r.index("in test_3"))
+        self.assertLess(r.index("in test_3"), r.index("Ran 3 tests"))
+
+
+class ProgressTest(TestCase):
+    def test_line(self):
+        stream = StringIO()
+        p = Progress(_WritelnDecorator(stream), 4)
+        p.interval = 60
+
+        p.add(self, 1, 0)
+        self.assertRegex(stream.getvalue(), r"^\r1/4 tests, 0 failed, ")
+
+        # the line isn't redrawn until the interval has passed
+        p.add(self, 2, 1)
+        self.assertEqual(1, stream.getvalue().count("\r"))
+
+        p.clear()
+        self.assertTrue(stream.getvalue().endswith("\r"))
+        p.add(self, 3, 1)
+        self.assertIn("3/4 tests, 1 failed, ", stream.getvalue())
+
+        p.finish()
+        self.assertTrue(stream.getvalue().endswith("\n"))
+
+    def test_eta(self):
+        durations = {"foo": 60.0, "bar": 120.0}
+        p = Progress(StringIO(), 4, durations)
+        # the test without history gets the average
+        self.assertEqual(360.0, p.remaining)
+        self.assertIn("ETA 6m00s", p.get_line())
+
+        p = Progress(StringIO(), 4, durations, completed=2)
+        self.assertEqual(180.0, p.remaining)
+
+        p = Progress(StringIO(), 4)
+        self.assertIn("ETA ?", p.get_line())
+
+    def test_run(self):
+        m = TestModule(
+            "class ProgressTest(TestCase):",
+            "    def test_1(self):",
+            "        pass",
+            "",
+            "    def test_2(self):",
+            "        self.assertTrue(False)",
+            "",
+            "    def test_3(self):",
+            "        with self.subTest(i=1):",
+            "            raise ValueError('subtest')",
+        )
+
+        r = m.client.run([m.name, "--progress", "--verbose"], code=1)
+        self.assertIn("3/3 tests, 2 failed, ", r)
+        self.assertEqual(1, r.count("FAIL: test_2"))
+        self.assertEqual(1, r.count("ValueError: subtest"))
+        self.assertNotIn("1/3 test_1", r)
+        self.assertIn("Ran 3 tests", r)
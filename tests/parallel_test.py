@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+import re
+
+from pyt.path import RerunFile
+from . import TestCase, TestModule
+
+
+class ParallelTestSuiteTest(TestCase):
+    def test_jobs(self):
+        m = TestModule(
+            "import os",
+            "",
+            "class OneTest(TestCase):",
+            "    def test_pid(self):",
+            "        print('pid', os.getpid())",
+            "",
+            "    def test_fail(self):",
+            "        self.assertEqual(1, 2)",
+            "",
+            "class TwoTest(TestCase):",
+            "    def test_error(self):",
+            "        raise ValueError('two error')",
+            "",
+            "    def test_skip(self):",
+            "        self.skipTest('two skip')",
+            "",
+            "class ThreeTest(TestCase):",
+            "    def test_pid(self):",
+            "        print('pid', os.getpid())",
+        )
+
+        r = m.client.run([m.name, "--jobs", "2", "-v"], code=1)
+        self.assertTrue("Ran 5 tests" in r)
+        self.assertTrue("failures=1, errors=1, skipped=1" in r)
+        self.assertTrue("two error" in r)
+        self.assertTrue("Failed or errored 2/5 tests" in r)
+        self.assertTrue("OneTest.test_fail on line" in r)
+        self.assertTrue("Skipped 1/5 tests" in r)
+        self.assertTrue("5/5 " in r)
+
+    def test_skip_decorator(self):
+        """a method or class skipped with @skip is never started, see the
+        parallel.WorkerResult.add_event"""
+        m = TestModule(
+            "import unittest",
+            "",
+            "class OneTest(TestCase):",
+            "    @unittest.skip('one skip')",
+            "    def test_skip(self):",
+            "        pass",
+            "",
+            "    def test_one(self):",
+            "        pass",
+            "",
+            "@unittest.skip('two skip')",
+            "class TwoTest(TestCase):",
+            "    def test_two(self):",
+            "        pass",
+        )
+
+        for flags in [["--jobs", "2"], ["--forkserver"]]:
+            r = m.client.run([m.name, *flags], code=0)
+            self.assertTrue("skipped=2" in r, r)
+            self.assertFalse("Traceback" in r)
+
+    def test_skip_class(self):
+        """class level skips are output the same way, and in the same order,
+        as when the tests aren't ran in workers"""
+        m = TestModule(
+            "from unittest import skip, SkipTest",
+            "",
+            "class OneTest(TestCase):",
+            "    def test_one(self):",
+            "        pass",
+            "",
+            "@skip('whole')",
+            "class TwoTest(TestCase):",
+            "    def test_1(self):",
+            "        pass",
+            "    def test_2(self):",
+            "        pass",
+            "",
+            "class ThreeTest(TestCase):",
+            "    @classmethod",
+            "    def setUpClass(cls):",
+            "        raise SkipTest('fixture')",
+            "    def test_three(self):",
+            "        pass",
+            "",
+            "class FourTest(TestCase):",
+            "    def test_four(self):",
+            "        pass",
+        )
+
+        def get_lines(flags):
+            r = m.client.run([m.name, "-v", *flags])
+            return [
+                re.sub(r"\(\d+(\.\d+)?s\)$", "", line)
+                for line in r.splitlines()
+                if " ... " in line
+            ]
+
+        lines = get_lines([])
+        self.assertEqual(5, len(lines))
+        self.assertTrue(lines[2].startswith("setUpClass ("))
+        self.assertTrue(lines[3].startswith("test_1 ("))
+        self.assertTrue(lines[4].startswith("test_2 ("))
+        self.assertEqual(lines, get_lines(["--jobs", "2"]))
+        self.assertEqual(lines, get_lines(["--jobs", "2", "--buffer"]))
+
+    def test_subtest_rerun(self):
+        """subtest failures are listed and rerun as the test they are part
+        of, just like when the tests aren't ran in workers"""
+        m = TestModule(
+            "class OneTest(TestCase):",
+            "    def test_sub(self):",
+            "        for i in range(2):",
+            "            with self.subTest(i=i):",
+            "                self.assertTrue(False)",
+            "",
+            "class TwoTest(TestCase):",
+            "    def test_two(self):",
+            "        pass",
+        )
+
+        for flags in [[], ["--jobs", "2"]]:
+            r = m.client.run([m.name, "-v", *flags], code=1)
+            self.assertTrue(f"* {m.name}.OneTest.test_sub on line" in r)
+            self.assertFalse("_SubTest" in r)
+            self.assertFalse("RemoteSubTest" in r)
+            self.assertEqual(
+                [f"{m.name}.OneTest.test_sub"],
+                list(RerunFile()),
+            )
+
+    def test_crash(self):
+        m = TestModule(
+            "import os",
+            "",
+            "class OneTest(TestCase):",
+            "    def test_1(self):",
+            "        pass",
+            "",
+            "    def test_2_crash(self):",
+            "        os._exit(2)",
+            "",
+            "    def test_3(self):",
+            "        pass",
+            "",
+            "class TwoTest(TestCase):",
+            "    def test_two(self):",
+            "        pass",
+        )
+
+        r = m.client.run([m.name, "-j", "2"], code=1)
+        self.assertTrue("Ran 4 tests" in r)
+        self.assertTrue("errors=1" in r)
+        self.assertTrue("exited with code 2" in r)
+
+    def test_fixtures(self):
+        m = TestModule(
+            "import os",
+            "",
+            "def setUpModule():",
+            "    print('setUpModule', os.getpid())",
+            "",
+            "class OneTest(TestCase):",
+            "    @classmethod",
+            "    def setUpClass(cls):",
+            "        print('one class setup', os.getpid())",
+            "",
+            "    def test_1(self):",
+            "        pass",
+            "",
+            "    def test_2(self):",
+            "        pass",
+            "",
+            "class TwoTest(TestCase):",
+            "    @classmethod",
+            "    def setUpClass(cls):",
+            "        raise ValueError('class setup')",
+            "",
+            "    def test_two(self):",
+            "        pass",
+        )
+
+        r = m.client.run([m.name, "-j", "2"], code=1)
+        self.assertEqual(1, r.count("one class setup"))
+        self.assertTrue("ERROR: setUpClass" in r)
+
+    def test_local(self):
+        """tests that a worker can't import are ran in the parent process"""
+        m = TestModule(
+            "def create():",
+            "    class LocalTest(TestCase):",
+            "        def test_local(self):",
+            "            pass",
+            "    return LocalTest",
+            "",
+            "LocalTest = create()",
+            "",
+            "class OneTest(TestCase):",
+            "    def test_one(self):",
+            "        pass",
+            "",
+            "class TwoTest(TestCase):",
+            "    def test_two(self):",
+            "        pass",
+        )
+
+        r = m.client.run([m.name, "-j", "2"])
+        self.assertTrue("Ran 3 tests" in r)
+
+    def test_forkserver(self):
+        m = TestModule({
+            "fsmod": [
+                "LOADED = True",
+            ],
+            "fs_test": [
+                "import os",
+                "import sys",
+                "",
+                "def setUpModule():",
+                "    print('module setup', os.getpid())",
+                "",
+                "class OneTest(TestCase):",
+                "    def test_one(self):",
+                "        self.assertTrue('fsmod' in sys.modules)",
+                "",
+                "class TwoTest(TestCase):",
+                "    def test_two(self):",
+                "        pass",
+            ],
+            "fs2_test": [
+                "import os",
+                "",
+                "def setUpModule():",
+                "    print('module setup', os.getpid())",
+                "",
+                "class ThreeTest(TestCase):",
+                "    def test_three(self):",
+                "        pass",
+            ],
+        }, name="")
+
+        r = m.client.run(["--forkserver", "--preload", "fsmod"])
+        self.assertTrue("Ran 3 tests" in r)
+
+        # each module ran in its own forked process, and both classes of
+        # fs_test ran in the same process
+        pids = re.findall(r"module setup (\d+)", r)
+        self.assertEqual(2, len(pids))
+        self.assertEqual(2, len(set(pids)))
+
+        r = m.client.run(["--forkserver", "--preload", "nosuchmod"], code=2)
+        self.assertTrue("Could not preload nosuchmod" in r)
+        self.assertFalse("Traceback" in r)
@@ -1,10 +1,20 @@
 # -*- coding: utf-8 -*-
 import os
 import inspect
+from unittest import mock
 
 import testdata
 
-from pyt.path import PathFinder, PathGuesser, RerunFile, SitePackagesDir
+from pyt.path import (
+    PathFinder,
+    PathGuesser,
+    RerunFile,
+    SitePackagesDir,
+    DiscoveryIndex,
+    DirectorySnapshot,
+    ModuleScanner,
+    TestMatcher,
+)
 from . import TestCase, TestModule
 
 
@@ -559,6 +569,92 @@ class PathGuesserTest(TestCase):
         r = m.client.run("-v", code=1)
         self.assertTrue(r.strip().endswith("line 6"))
 
+    def test_exact(self):
+        m = TestModule(
+            "class ExactTest(TestCase):",
+            "    def test_che(self): pass",
+            "    def test_che_two(self): pass",
+            "    def test_other(self): pass",
+            "",
+            "class ExactTestTwo(TestCase):",
+            "    def test_che(self): pass",
+        )
+        index = DiscoveryIndex(m.cwd, scanner=ModuleScanner(m.cwd))
+
+        pg = PathGuesser(f"{m.name}.ExactTest.test_che", m.cwd, index=index)
+        self.assertEqual(1, len(pg.possible))
+        pf = pg.possible[0]
+        self.assertEqual(m.name, pf.module.__name__)
+
+        # the walk never happens
+        with mock.patch.object(PathFinder, "paths") as paths:
+            # names are still matched like the normal search matches them
+            self.assertEqual(
+                [
+                    "ExactTest.test_che",
+                    "ExactTest.test_che_two",
+                    "ExactTestTwo.test_che",
+                ],
+                [f"{c.__name__}.{n}" for c, n in pf.method_names()],
+            )
+            self.assertEqual(0, paths.call_count)
+
+        pg = PathGuesser(f"{m.name}.ExactTest", m.cwd, index=index)
+        self.assertEqual(
+            ["ExactTest", "ExactTestTwo"],
+            [c.__name__ for c in pg.possible[0].classes()],
+        )
+
+        # names that aren't exact test paths are guessed like normal
+        for name in [
+            f"{m.name}.ExactTest.test_nope",
+            f"{m.name}.NopeTest",
+            m.name,
+            "ExactTest.test_che",
+        ]:
+            pg = PathGuesser(name, m.cwd, index=index)
+            self.assertFalse(
+                any(hasattr(pf, "module") for pf in pg.possible),
+                name,
+            )
+
+        # static mode never imports
+        pg = PathGuesser(
+            f"{m.name}.ExactTest.test_che",
+            m.cwd,
+            index=index,
+            static=True,
+        )
+        self.assertFalse(hasattr(pg.possible[0], "module"))
+
+        r = m.client.run([f"{m.name}.ExactTest.test_che_two"])
+        self.assertTrue("Ran 1 test" in r)
+
+    def test_exact_not_test_module(self):
+        """only test modules the index knows about are imported"""
+        m = TestModule({
+            "exactapp": [
+                "from unittest import TestCase",
+                "class ExactAppTest(TestCase):",
+                "    def test_che(self): pass",
+            ],
+            "exactapp_test": [
+                "class ExactAppTest(TestCase):",
+                "    def test_che(self): pass",
+            ],
+        }, name="")
+        index = DiscoveryIndex(m.cwd, scanner=ModuleScanner(m.cwd))
+
+        for name in ["exactapp.ExactAppTest", "exactapp_test.NopeTest"]:
+            pg = PathGuesser(name, m.cwd, index=index)
+            self.assertFalse(
+                any(hasattr(pf, "module") for pf in pg.possible),
+                name,
+            )
+
+        pg = PathGuesser("exactapp_test.ExactAppTest", m.cwd, index=index)
+        self.assertEqual("exactapp_test", pg.possible[0].module.__name__)
+
 
 class RerunFileTest(TestCase):
     def test_rerun(self):
@@ -589,3 +685,224 @@ class RerunFileTest(TestCase):
             self.assertTrue(line)
             self.assertTrue(line in rf)
 
+
+
+class DiscoveryIndexTest(TestCase):
+    def test_index(self):
+        m = TestModule({
+            "indexfoo_test": [
+                "class FooTest(TestCase):",
+                "    def test_bar(self): pass",
+            ],
+            "indexche_test": [
+                "class CheTest(TestCase):",
+                "    def test_baz(self): pass",
+            ],
+        }, name="")
+
+        # files modified too recently aren't indexed
+        for path in [os.path.join(m.cwd, n) for n in os.listdir(m.cwd)]:
+            os.utime(path, (1000000000, 1000000000))
+
+        tl = m.loader
+        s = tl.loadTestsFromNames(["Foo.bar"])
+        self.assertEqual(1, s.countTestCases())
+
+        index = DiscoveryIndex(m.cwd)
+        self.assertEqual(2, len(index.entries))
+        foo_path = os.path.join(m.cwd, "indexfoo_test.py")
+        che_path = os.path.join(m.cwd, "indexche_test.py")
+        self.assertEqual(
+            ["test_bar"],
+            index.get(foo_path)["classes"]["FooTest"]["methods"],
+        )
+
+        pf = PathFinder(m.cwd, class_name="Che", index=index)
+        self.assertFalse(pf.is_candidate(foo_path))
+        self.assertTrue(pf.is_candidate(che_path))
+
+        pf = PathFinder(m.cwd, method_name="baz", index=index)
+        self.assertFalse(pf.is_candidate(foo_path))
+
+        # a changed file is invalidated without touching the other entries
+        with open(foo_path, mode="a") as fp:
+            fp.write("\n")
+        index = DiscoveryIndex(m.cwd)
+        self.assertIsNone(index.get(foo_path))
+        self.assertIsNotNone(index.get(che_path))
+        self.assertTrue(index.dirty)
+
+
+class TestMatcherTest(TestCase):
+    def test_is_excluded(self):
+        m = TestMatcher([
+            "foo.bar",
+            "Che.test_baz",
+            "boo:Far",
+            "/base/moo/far_test.py",
+        ], "/base")
+
+        self.assertTrue(m.is_excluded_module("prefix.foo.bar_test"))
+        self.assertTrue(m.is_excluded_module("foo.bar_test.sub_test"))
+        self.assertTrue(m.is_excluded_module("foo_test.test_bar"))
+        self.assertFalse(m.is_excluded_module("foo.che_test"))
+        self.assertTrue(m.is_excluded_module("moo.far_test"))
+
+        # foo.bar can also be the bar method of the foo module
+        self.assertTrue(m.is_excluded("foo_test", "FooTest", "test_bar"))
+        self.assertFalse(m.is_excluded("foo_test", "FooTest", "test_che"))
+
+        self.assertTrue(m.is_excluded("any_test", "CheTest", "test_baz_1"))
+        self.assertFalse(m.is_excluded("any_test", "CheTest", "test_boo"))
+        self.assertFalse(m.is_excluded("any_test", "BooTest", "test_baz"))
+
+        self.assertTrue(m.is_excluded("boo_test", "FarTest", "test_1"))
+        self.assertFalse(m.is_excluded("other_test", "FarTest", "test_1"))
+        self.assertFalse(m.is_excluded_module("boo_test"))
+
+        # a single part can be a method in any module
+        m = TestMatcher(["bar"], "/base")
+        self.assertTrue(m.is_excluded_module("foo.bar_test"))
+        self.assertTrue(m.is_excluded("foo_test", "FooTest", "test_bar"))
+        self.assertFalse(m.is_excluded("foo_test", "FooTest", "test_che"))
+
+
+class DirectorySnapshotTest(TestCase):
+    def test_walk(self):
+        path = testdata.create_modules({
+            "snapfoo_test": [],
+            "snapfoo_test.bar.che_test": [],
+            "snapfoo_test.baz_test": [],
+        })
+
+        snapshot = DirectorySnapshot()
+        r = [
+            (root, sorted(dirs), sorted(files))
+            for root, dirs, files in snapshot.walk(path)
+        ]
+        r2 = [
+            (root, sorted(dirs), sorted(files))
+            for root, dirs, files in os.walk(path)
+        ]
+        self.assertEqual(sorted(r2), sorted(r))
+
+        with mock.patch("os.scandir", wraps=os.scandir) as scandir:
+            list(snapshot.walk(path))
+            for root, dirs, files in snapshot.walk(path):
+                dirs[:] = []
+            self.assertEqual(0, scandir.call_count)
+
+        self.assertTrue(
+            snapshot.isfile(os.path.join(path, "snapfoo_test", "__init__.py"))
+        )
+        self.assertFalse(
+            snapshot.isfile(os.path.join(path, "snapfoo_test", "nope.py"))
+        )
+
+    def test_shared(self):
+        """all the interpretations of an ambiguous name should only read each
+        directory once"""
+        m = TestModule({
+            "snapshared.foo.bar_test": [
+                "class BarTest(TestCase):",
+                "    def test_che(self): pass",
+            ],
+            "snapshared.foo.baz.boo_test": [
+                "class BooTest(TestCase):",
+                "    def test_che(self): pass",
+            ],
+        }, name="")
+
+        with mock.patch("os.scandir", wraps=os.scandir) as scandir:
+            s = m.loader.loadTestsFromNames(["foo.bar", "foo.boo", "che"])
+            self.assertEqual(2, len(set(s.get_testpaths())))
+            dirs = [c.args[0] for c in scandir.call_args_list]
+            self.assertEqual(len(dirs), len(set(dirs)))
+
+
+class ModuleScannerTest(TestCase):
+    def test_scan(self):
+        m = TestModule({
+            "scanfoo": [
+                "class BaseMixin(object):",
+                "    def test_mixin(self): pass",
+                "",
+                "class BaseTCase(TestCase):",
+                "    def test_base(self): pass",
+            ],
+            "scanfoo.bar_test": [
+                "import heavy_library_that_does_not_exist",
+                "from . import BaseTCase, BaseMixin",
+                "from heavy_library_that_does_not_exist import Model",
+                "",
+                "class CheTest(BaseMixin, BaseTCase):",
+                "    def test_che(self): pass",
+                "    def helper(self): pass",
+                "",
+                "class ModelTest(Model):",
+                "    def test_model(self): pass",
+                "",
+                "class NotATest(object):",
+                "    def test_nope(self): pass",
+            ],
+        }, name="")
+
+        scanner = ModuleScanner(m.cwd)
+        r = scanner.scan(
+            os.path.join(m.cwd, "scanfoo", "bar_test.py"),
+            "scanfoo.bar_test",
+        )
+        classes = r["classes"]
+
+        self.assertEqual(
+            ["test_base", "test_che", "test_mixin"],
+            classes["CheTest"]["methods"],
+        )
+        self.assertEqual(["test_base"], classes["BaseTCase"]["methods"])
+        self.assertEqual("scanfoo", classes["BaseTCase"]["module"])
+
+        # Model can't be followed so we don't know if it's a TestCase
+        self.assertIsNone(classes["ModelTest"]["methods"])
+        self.assertIsNone(classes["Model"]["methods"])
+
+        self.assertFalse("NotATest" in classes)
+        self.assertFalse("BaseMixin" in classes)
+        self.assertFalse(r["dynamic"])
+        self.assertTrue(
+            os.path.join(m.cwd, "scanfoo", "__init__.py") in r["depends"]
+        )
+
+    def test_dynamic(self):
+        m = TestModule(
+            "from somewhere import *",
+            "",
+            "class FooTest(TestCase):",
+            "    locals()['test_bar'] = lambda self: None",
+            "",
+            "def load_tests(*args, **kwargs): pass",
+        )
+
+        r = ModuleScanner(m.cwd).scan(m.path, m.name)
+        self.assertTrue(r["dynamic"])
+        self.assertTrue(r["load_tests"])
+        self.assertIsNone(r["classes"]["FooTest"]["methods"])
+
+    def test_list_without_import(self):
+        m = TestModule(
+            "import heavy_library_that_does_not_exist",
+            "",
+            "class _BaseTCase(TestCase):",
+            "    def test_base(self): pass",
+            "",
+            "class FooTest(_BaseTCase):",
+            "    def test_bar(self): pass",
+        )
+
+        r = m.client.run("--list")
+        self.assertTrue("{}.FooTest.test_bar".format(m.name) in r)
+        self.assertTrue("{}.FooTest.test_base".format(m.name) in r)
+        self.assertFalse("heavy_library_that_does_not_exist" in r)
+
+        r = m.client.run(["--list", "Foo.bar"])
+        self.assertTrue("{}.FooTest.test_bar".format(m.name) in r)
+        self.assertFalse("test_base" in r)
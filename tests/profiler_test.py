@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import os
+import pstats
+
+import testdata
+
+from . import TestCase, TestModule
+
+
+class ProfilerTest(TestCase):
+    def assertProfiled(self, directory, module_name):
+        for path in [
+            ["tests", module_name, "FooTest.test_foo.pstats"],
+            ["tests", module_name, "BarTest.test_bar.pstats"],
+            ["classes", f"{module_name}.FooTest.pstats"],
+            ["modules", f"{module_name}.pstats"],
+            ["suite.pstats"],
+        ]:
+            self.assertTrue(os.path.isfile(os.path.join(directory, *path)))
+
+        stats = pstats.Stats(os.path.join(directory, "suite.pstats"))
+        functions = set(f[2] for f in stats.stats.keys())
+        self.assertTrue("foo_helper" in functions)
+        self.assertTrue("bar_helper" in functions)
+        # setUp is profiled with its test
+        self.assertTrue("setUp" in functions)
+
+    def get_module(self):
+        return TestModule(
+            "def foo_helper():",
+            "    return sum(range(100))",
+            "",
+            "def bar_helper():",
+            "    return sum(range(100))",
+            "",
+            "class FooTest(TestCase):",
+            "    def setUp(self):",
+            "        pass",
+            "",
+            "    def test_foo(self):",
+            "        foo_helper()",
+            "",
+            "class BarTest(TestCase):",
+            "    def test_bar(self):",
+            "        bar_helper()",
+        )
+
+    def test_profile(self):
+        m = self.get_module()
+
+        r = m.client.run([m.name, "--profile"])
+        self.assertTrue("Profiled 2 tests" in r)
+        self.assertProfiled(os.path.join(m.cwd, ".pyt", "profile"), m.name)
+
+    def test_profile_jobs(self):
+        m = self.get_module()
+        directory = testdata.create_dir()
+
+        r = m.client.run([m.name, "--profile", directory, "--jobs", "2"])
+        self.assertTrue("Profiled 2 tests" in r)
+        self.assertProfiled(directory, m.name)
+
+        # only the stats of the latest run are kept
+        r = m.client.run([
+            f"{m.name}.FooTest",
+            "--profile",
+            directory,
+        ])
+        self.assertTrue("Profiled 1 tests" in r)
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import os
+import signal
+
+import testdata
+
+from pyt.tester import TestProgram
+from . import TestCase, TestModule
+
+
+class SamplerTest(TestCase):
+    def get_module(self):
+        return TestModule(
+            "def spin():",
+            "    total = 0",
+            "    for i in range(3000000):",
+            "        total += i",
+            "    return total",
+            "",
+            "class FooTest(TestCase):",
+            "    def test_spin(self):",
+            "        spin()",
+            "",
+            "class BarTest(TestCase):",
+            "    def test_spin(self):",
+            "        spin()",
+        )
+
+    def get_stacks(self, path):
+        stacks = {}
+        with open(path) as fp:
+            for line in fp:
+                stack, count = line.rstrip().rsplit(" ", 1)
+                stacks[stack] = int(count)
+        return stacks
+
+    def test_sample_profile(self):
+        m = self.get_module()
+
+        r = m.client.run([m.name, "--sample-profile"])
+        self.assertTrue("collapsed stacks are in" in r)
+
+        path = os.path.join(m.cwd, ".pyt", "sample-profile.txt")
+        stacks = self.get_stacks(path)
+        for name in ["FooTest", "BarTest"]:
+            prefix = f"pyt;run;{m.name}.{name}.test_spin;"
+            self.assertTrue(any(
+                s.startswith(prefix) and "spin (" in s for s in stacks
+            ))
+
+    def test_sample_profile_jobs(self):
+        m = self.get_module()
+        path = os.path.join(testdata.create_dir(), "stacks.txt")
+
+        m.client.run([m.name, "--sample-profile", path, "--jobs", "2"])
+        stacks = self.get_stacks(path)
+        for name in ["FooTest", "BarTest"]:
+            prefix = f"pyt;run;{m.name}.{name}.test_spin;"
+            self.assertTrue(any(s.startswith(prefix) for s in stacks))
+
+        # the worker stacks were merged into path
+        self.assertEqual(["stacks.txt"], os.listdir(os.path.dirname(path)))
+
+    def test_sample_profile_list(self):
+        """--list doesn't run anything so nothing is sampled"""
+        m = self.get_module()
+        path = os.path.join(testdata.create_dir(), "stacks.txt")
+
+        try:
+            TestProgram(
+                module=None,
+                argv=[
+                    "pyt",
+                    m.name,
+                    "--sample-profile",
+                    path,
+                    "--list",
+                ],
+                testLoader=m.loader,
+                exit=False,
+            )
+            self.assertEqual((0.0, 0.0), signal.getitimer(signal.ITIMER_PROF))
+
+        finally:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+
+        self.assertFalse(os.path.exists(path))
@@ -1,9 +1,15 @@
 # -*- coding: utf-8 -*-
+import os
 import sys
+import json
+import inspect
+from unittest import mock
+from xml.etree import ElementTree
 
 import testdata
 
 from pyt.tester import TestProgram
+from pyt.path import TestMatcher
 from pyt import __version__
 from . import TestCase, TestModule
 
@@ -215,6 +221,137 @@ class TestProgramTest(TestCase):
         self.assertTrue("che_test" in r)
         self.assertTrue("Found 2 total tests" in r)
 
+    def get_report_module(self, *body):
+        return TestModule(
+            "import os",
+            "import signal",
+            "",
+            "class ReportTest(TestCase):",
+            "    def test_1_success(self):",
+            "        print('success output')",
+            "",
+            "    def test_2_fail(self):",
+            "        self.assertEqual(1, 2)",
+            "",
+            "    def test_3_error(self):",
+            "        raise ValueError('bad <value> &')",
+            "",
+            "    def test_4_skip(self):",
+            "        self.skipTest('skip reason')",
+            "",
+            "    def test_5_subtest(self):",
+            "        with self.subTest(i=1):",
+            "            self.assertTrue(False)",
+            *body,
+        )
+
+    def test_jsonl(self):
+        m = self.get_report_module()
+        path = os.path.join(testdata.create_dir(), "report", "results.jsonl")
+
+        m.client.run([m.name, "--buffer", "--jsonl", path], code=1)
+        with open(path) as fp:
+            events = {
+                e["testpath"].rsplit(".", 1)[1]: e
+                for e in map(json.loads, fp)
+            }
+
+        self.assertEqual(5, len(events))
+        self.assertEqual("success", events["test_1_success"]["outcome"])
+        self.assertEqual(
+            "success output\n",
+            events["test_1_success"]["stdout"],
+        )
+        self.assertLess(0.0, events["test_1_success"]["duration"])
+        self.assertEqual("failure", events["test_2_fail"]["outcome"])
+        self.assertTrue("AssertionError" in events["test_2_fail"]["traceback"])
+        self.assertEqual("error", events["test_3_error"]["outcome"])
+        self.assertEqual(
+            "ValueError: bad <value> &",
+            events["test_3_error"]["message"],
+        )
+        self.assertEqual("skip", events["test_4_skip"]["outcome"])
+        self.assertEqual("skip reason", events["test_4_skip"]["message"])
+        self.assertEqual("failure", events["test_5_subtest"]["outcome"])
+
+    def test_junit_xml(self):
+        m = self.get_report_module()
+        path = os.path.join(testdata.create_dir(), "results.xml")
+
+        for flags in [["--buffer"], ["--buffer", "--jobs", "2"]]:
+            m.client.run([m.name, "--junit-xml", path, *flags], code=1)
+            root = ElementTree.parse(path).getroot()
+            testcases = {tc.get("name"): tc for tc in root.iter("testcase")}
+            self.assertEqual(5, len(testcases))
+            self.assertEqual(
+                ["system-out"],
+                [e.tag for e in testcases["test_1_success"]],
+            )
+            self.assertEqual(
+                "ValueError: bad <value> &",
+                testcases["test_3_error"].find("error").get("message"),
+            )
+            self.assertEqual(
+                "AssertionError: 1 != 2",
+                testcases["test_2_fail"].find("failure").get("message"),
+            )
+            self.assertEqual(
+                "AssertionError: False is not true",
+                testcases["test_5_subtest"].find("failure").get("message"),
+            )
+            self.assertEqual(
+                "skip reason",
+                testcases["test_4_skip"].find("skipped").get("message"),
+            )
+
+    def test_reporters_killed(self):
+        """A run that is killed still leaves readable files"""
+        m = self.get_report_module(
+            "",
+            "    def test_6_kill(self):",
+            "        os.kill(os.getpid(), signal.SIGKILL)",
+        )
+        basedir = testdata.create_dir()
+        xml_path = os.path.join(basedir, "results.xml")
+        jsonl_path = os.path.join(basedir, "results.jsonl")
+
+        m.client.run(
+            [m.name, "--junit-xml", xml_path, "--jsonl", jsonl_path],
+            code=-9,
+        )
+
+        root = ElementTree.parse(xml_path).getroot()
+        self.assertEqual(5, len(list(root.iter("testcase"))))
+
+        with open(jsonl_path) as fp:
+            self.assertEqual(5, len([json.loads(line) for line in fp]))
+
+    def test_rollup(self):
+        m = TestModule({
+            "rollup_test": "",
+            "rollup_test.foo_test": [
+                "class FooTest(TestCase):",
+                "   def test_1(self): pass",
+                "   def test_2(self): pass",
+                "",
+                "class FooTestTwo(TestCase):",
+                "   def test_1(self): pass",
+            ],
+            "rollup_test.bar_test": [
+                "class BarTest(TestCase):",
+                "   def test_1(self): pass",
+            ]
+        }, name="")
+
+        r = m.client.run(["--verbose", "rollup_test"])
+        self.assertTrue("across 3 classes in 2 modules" in r)
+        self.assertRegex(r, r"\* rollup_test - 4 tests in")
+        self.assertRegex(r, r"\n  \* foo_test - 3 tests in")
+        self.assertRegex(r, r"\n    \* FooTest - 2 tests in")
+        self.assertRegex(r, r"\n    \* FooTestTwo - 1 test in")
+        # a module with one class only prints the class
+        self.assertRegex(r, r"\n  \* bar_test.BarTest - 1 test in")
+
     def test_double_counting_and_pyc(self):
         """Make sure packages don't get double counted"""
         # https://github.com/Jaymon/pyt/issues/18
@@ -961,13 +1098,47 @@ class TestLoaderTest(TestCase):
             "   def test_foo(self): pass"
         )
         tl = m.loader
-        tl.program.ignore_testpaths = set([
-            "{}.CheTest.test_foo".format(m.name),
-        ])
+        tl.program.ignore_matcher = TestMatcher(
+            ["{}.CheTest.test_foo".format(m.name)],
+            m.cwd,
+        )
 
         s = tl.loadTestsFromName(m.name)
         self.assertEqual(0, len(list(s.get_testpaths())))
 
+    def test_negative_module(self):
+        m = TestModule({
+            "negmod_test": [
+                "class NegModTest(TestCase):",
+                "    def test_foo(self): pass",
+            ],
+            "negother_test": [
+                "raise ValueError('this should never be imported')",
+            ],
+        }, name="")
+
+        r = m.client.run(["--not", "negother"])
+        self.assertTrue("Ran 1 test" in r)
+
+        r = m.client.run(
+            ["--not", "NegModTest.foo", "--not", "negother"],
+            code=5,
+        )
+        self.assertTrue("Ran 0 tests" in r)
+
+    def test_negative_method(self):
+        m = TestModule(
+            "class NegMethodTest(TestCase):",
+            "    def test_a(self): pass",
+            "    def test_b(self): pass",
+        )
+
+        for name in ["test_a", "a"]:
+            r = m.client.run([m.name, "--not", name, "-v"])
+            self.assertTrue("Ran 1 test" in r)
+            self.assertTrue("test_b" in r)
+            self.assertFalse("test_a" in r)
+
     def test_private_class(self):
         m = TestModule(
             "class _CheTest(TestCase):",
@@ -978,3 +1149,114 @@ class TestLoaderTest(TestCase):
         s = tl.loadTestsFromName(m.name)
         self.assertEqual(0, s.countTestCases())
 
+    def test_names_grouped(self):
+        m = TestModule(
+            "class FooTest(TestCase):",
+            "    def test_x(self): pass",
+            "    def test_y(self): pass",
+            "",
+            "class BarTest(TestCase):",
+            "    def test_z(self): pass",
+        )
+        tl = m.loader
+
+        with mock.patch(
+            "pyt.path.inspect.getmembers",
+            wraps=inspect.getmembers,
+        ) as getmembers:
+            s = tl.loadTestsFromNames([
+                f"{m.name}.FooTest.test_x",
+                f"{m.name}.BarTest",
+                f"{m.name}.FooTest.test_y",
+                f"{m.name}.FooTest.test_x",
+                m.name,
+            ])
+
+        module = sys.modules[m.name]
+        self.assertEqual(
+            1,
+            len([c for c in getmembers.call_args_list if c.args[0] is module]),
+        )
+        self.assertEqual(
+            [
+                f"{m.name}.FooTest.test_x",
+                f"{m.name}.FooTest.test_y",
+                f"{m.name}.BarTest.test_z",
+            ],
+            list(s.get_testpaths()),
+        )
+
+
+
+class TestSuiteTest(TestCase):
+    def test_shard(self):
+        m = TestModule(
+            "class OneTest(TestCase):",
+            "    def test_1(self): pass",
+            "    def test_2(self): pass",
+            "    def test_3(self): pass",
+            "",
+            "class TwoTest(TestCase):",
+            "    def test_1(self): pass",
+            "",
+            "class ThreeTest(TestCase):",
+            "    def test_1(self): pass",
+            "    def test_2(self): pass",
+        )
+        s = m.loader.loadTestsFromName(m.name)
+
+        # without durations the shards are balanced by test count
+        s1 = s.shard(1, 2)
+        s2 = s.shard(2, 2)
+        self.assertEqual(3, s1.countTestCases())
+        self.assertEqual(3, s2.countTestCases())
+        self.assertEqual(
+            set(s.get_testpaths()),
+            set(s1.get_testpaths()) | set(s2.get_testpaths()),
+        )
+
+        # classes are never split
+        for tp in s1.get_testpaths():
+            self.assertTrue(".OneTest." in tp)
+
+        # ThreeTest has no durations so it gets the average (3.25s per test)
+        durations = {
+            "{}.TwoTest.test_1".format(m.name): 10.0,
+            "{}.OneTest.test_1".format(m.name): 1.0,
+            "{}.OneTest.test_2".format(m.name): 1.0,
+            "{}.OneTest.test_3".format(m.name): 1.0,
+        }
+        s1 = s.shard(1, 2, durations)
+        self.assertEqual(
+            ["{}.TwoTest.test_1".format(m.name)],
+            list(s1.get_testpaths()),
+        )
+        self.assertEqual(5, s.shard(2, 2, durations).countTestCases())
+        self.assertEqual(0, s.shard(4, 4, durations).countTestCases())
+
+    def test_shard_cli(self):
+        m = TestModule(
+            "class OneTest(TestCase):",
+            "    def test_1(self): pass",
+            "",
+            "class TwoTest(TestCase):",
+            "    def test_1(self): pass",
+        )
+
+        r1 = m.client.run([m.name, "--shard", "1/2"])
+        r2 = m.client.run([m.name, "--shard", "2/2"])
+        self.assertTrue("Ran 1 test" in r1)
+        self.assertTrue("Ran 1 test" in r2)
+
+        with self.assertRaises(RuntimeError):
+            m.client.run([m.name, "--shard", "3/2"])
+
+        # a corrupt history falls back to sharding by test count
+        testdata.create_file(
+            "this is not a database",
+            os.path.join(".pyt", "history.sqlite3"),
+            m.cwd,
+        )
+        r1 = m.client.run([m.name, "--shard", "1/2"])
+        self.assertTrue("Ran 1 test" in r1)
+        self.assertTrue("Could not read test history" in r1)
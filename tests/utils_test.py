@@ -1,6 +1,16 @@
 # -*- coding: utf-8 -*-
+import io
+import logging
+from unittest import mock
 
-from pyt.utils import classpath, testpath
+import testdata
+
+from pyt.utils import (
+    classpath,
+    testpath,
+    loghandler_members,
+    LogHandlerStreams,
+)
 from . import TestCase
 
 
@@ -13,3 +23,64 @@ class UtilsTest(TestCase):
         r = classpath(UtilsTest)
         self.assertEqual(s, r)
 
+
+
+class LogHandlerStreamsTest(TestCase):
+    def test_swap(self):
+        stream = io.StringIO()
+        buffer = io.StringIO()
+
+        logger = logging.getLogger(testdata.get_ascii(8))
+        handler = logging.StreamHandler(stream=stream)
+        logger.addHandler(handler)
+
+        s = LogHandlerStreams(stream)
+        replacements = [(stream, buffer)]
+
+        with mock.patch("pyt.utils.loghandler_members") as m:
+            m.side_effect = loghandler_members
+            swapped = s.swap(replacements)
+            self.assertEqual(1, len(swapped))
+            self.assertIs(buffer, handler.stream)
+            s.restore(swapped, replacements)
+            self.assertIs(stream, handler.stream)
+
+            # nothing changed so the handlers aren't inspected again
+            s.restore(s.swap(replacements), replacements)
+            self.assertEqual(1, m.call_count)
+
+            # a handler created while swapped is restored
+            swapped = s.swap(replacements)
+            handler2 = logging.StreamHandler(stream=buffer)
+            logger.addHandler(handler2)
+            s.restore(swapped, replacements)
+            self.assertIs(stream, handler2.stream)
+            self.assertEqual(2, m.call_count)
+
+            s.swap(replacements)
+            self.assertIs(buffer, handler2.stream)
+            self.assertEqual(3, m.call_count)
+
+    def test_replaced_handler(self):
+        """a handler replaced by another handler is found even though the
+        number of handlers didn't change"""
+        stream = io.StringIO()
+        buffer = io.StringIO()
+
+        logger = logging.getLogger(testdata.get_ascii(8))
+        handler = logging.StreamHandler(stream=io.StringIO())
+        logger.addHandler(handler)
+
+        s = LogHandlerStreams(stream)
+        replacements = [(stream, buffer)]
+        s.restore(s.swap(replacements), replacements)
+
+        logger.removeHandler(handler)
+        del handler
+        handler2 = logging.StreamHandler(stream=stream)
+        logger.addHandler(handler2)
+
+        swapped = s.swap(replacements)
+        self.assertIs(buffer, handler2.stream)
+        s.restore(swapped, replacements)
+        self.assertIs(stream, handler2.stream)
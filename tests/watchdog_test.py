@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+from . import TestCase, TestModule
+
+
+class WatchdogTest(TestCase):
+    def test_timeout(self):
+        m = TestModule(
+            "import time",
+            "",
+            "class TimeoutTest(TestCase):",
+            "    @pyt.timeout(0.5)",
+            "    def test_1_hang(self):",
+            "        time.sleep(30)",
+            "",
+            "    def test_2_flag(self):",
+            "        time.sleep(30)",
+            "",
+            "    def test_3_ok(self):",
+            "        print('ran test_3_ok')",
+            "",
+            "@pyt.timeout(0)",
+            "class NoTimeoutTest(TestCase):",
+            "    def test_sleep(self):",
+            "        time.sleep(0.8)",
+        )
+
+        r = m.client.run([m.name, "--timeout", "0.6"], code=1)
+        self.assertEqual(2, r.count("timed out after"))
+        self.assertTrue("TestTimeoutError" in r)
+        self.assertTrue("timed out after 0.5s" in r)
+        self.assertTrue("timed out after 0.6s" in r)
+        # the stack of the hung test was dumped
+        self.assertTrue("in test_1_hang" in r)
+        self.assertTrue("ran test_3_ok" in r)
+        self.assertTrue("Ran 4 tests" in r)
+
+    def test_timeout_jobs(self):
+        m = TestModule(
+            "import time",
+            "",
+            "class TimeoutTest(TestCase):",
+            "    def test_1_hang(self):",
+            "        time.sleep(30)",
+            "",
+            "    def test_2_ok(self):",
+            "        print('ran test_2_ok')",
+            "",
+            "class OtherTest(TestCase):",
+            "    def test_ok(self):",
+            "        print('ran test_ok')",
+        )
+
+        r = m.client.run([m.name, "--timeout", "0.5", "--jobs", "2"], code=1)
+        self.assertEqual(1, r.count("timed out after"))
+        self.assertTrue("in test_1_hang" in r)
+        self.assertTrue("ran test_2_ok" in r)
+        self.assertTrue("ran test_ok" in r)
+        self.assertTrue("Ran 3 tests" in r)
+        self.assertFalse("exited with code" in r)
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+from unittest import mock
+
+from pyt.watcher import Watcher
+from . import TestCase, TestModule
+
+
+class WatcherTest(TestCase):
+    def test_rerun(self):
+        m = TestModule({
+            "wmod": [
+                "VALUE = 1",
+            ],
+            "wmod_test": [
+                "from wmod import VALUE",
+                "class WmodTest(TestCase):",
+                "    def test_value(self): pass",
+            ],
+            "wother_test": [
+                "class WotherTest(TestCase):",
+                "    def test_other(self): pass",
+            ],
+            "wunused": [
+                "VALUE = 3",
+            ],
+        }, name="")
+
+        try:
+            p = m.run("")
+            self.assertEqual(2, p.result.testsRun)
+
+            w = Watcher(p, m.cwd)
+            w.stats = w.get_stats()
+            w.set_tests(p.testLoader.loadTestsFromNames(p.testNames))
+            self.assertEqual([], w.get_changed())
+
+            with open(os.path.join(m.cwd, "wmod.py"), "a") as fp:
+                fp.write("OTHER = 2\n")
+
+            with open(os.path.join(m.cwd, "wmod_test.py"), "a") as fp:
+                fp.write("    def test_added(self): pass\n")
+
+            changed = w.get_changed()
+            self.assertEqual(2, len(changed))
+            with mock.patch.object(
+                p.testLoader,
+                "loadTestsFromNames",
+            ) as load:
+                r = w.rerun(changed)
+                # the tests aren't discovered again
+                self.assertEqual(0, load.call_count)
+            self.assertEqual(2, r.testsRun)
+            self.assertEqual(2, sys.modules["wmod"].OTHER)
+            self.assertEqual(3, w.test.countTestCases())
+
+            with open(os.path.join(m.cwd, "wother_test.py"), "a") as fp:
+                fp.write("    def test_added(self): pass\n")
+
+            r = w.rerun(w.get_changed())
+            self.assertEqual(2, r.testsRun)
+            self.assertTrue("wmod_test" in sys.modules)
+
+            with open(os.path.join(m.cwd, "wunused.py"), "a") as fp:
+                fp.write("OTHER = 4\n")
+
+            self.assertIsNone(w.rerun(w.get_changed()))
+
+        finally:
+            for name in ["wmod", "wmod_test", "wother_test", "wunused"]:
+                sys.modules.pop(name, None)
+
+    def test_rerun_names(self):
+        """only the tests the names select are swapped in"""
+        m = TestModule({
+            "wnames_test": [
+                "class WnamesTest(TestCase):",
+                "    def test_value(self): pass",
+                "    def test_other(self): pass",
+            ],
+        }, name="")
+
+        try:
+            p = m.run("wnames_test.WnamesTest.test_value")
+            self.assertEqual(1, p.result.testsRun)
+
+            w = Watcher(p, m.cwd)
+            w.stats = w.get_stats()
+            w.set_tests(p.testLoader.loadTestsFromNames(p.testNames))
+
+            with open(os.path.join(m.cwd, "wnames_test.py"), "a") as fp:
+                fp.write("    def test_value_added(self): pass\n")
+
+            r = w.rerun(w.get_changed())
+            self.assertEqual(2, r.testsRun)
+            self.assertEqual(
+                [
+                    "wnames_test.WnamesTest.test_value",
+                    "wnames_test.WnamesTest.test_value_added",
+                ],
+                sorted(w.test.get_testpaths()),
+            )
+
+        finally:
+            sys.modules.pop("wnames_test", None)